@@ -0,0 +1,168 @@
+"""
+Brewing-method affinity: how well each product is liked by reviewers
+who brew a particular way.
+
+Review brewing methods are free text ("Espresso Machine", "Mokapot",
+"Chemex, Aeropress, Clever Dripper"). They are split and mapped to a
+small set of canonical methods, then aggregated at prep time into a
+dense method x product table of smoothed liked ratios. At request time
+ranking by brewing method is a single row lookup in that table.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import PROCESSED_DIR, product_key_by_name
+
+
+BREWING_AFFINITY_PATH = PROCESSED_DIR / "brewing_affinity.csv"
+
+BREWING_METHODS = [
+    "Espresso",
+    "Pour Over",
+    "Drip",
+    "French Press",
+    "Aeropress",
+    "Cold Brew",
+    "Moka Pot",
+    "Percolator",
+    "Pod Machine",
+]
+
+# Lowercase spellings seen in reviews -> canonical method.
+BREWING_METHOD_ALIASES = {
+    "espresso": "Espresso",
+    "espresso machine": "Espresso",
+    "superautomatic espresso machine": "Espresso",
+    "pour over": "Pour Over",
+    "pourover": "Pour Over",
+    "chemex": "Pour Over",
+    "clever dripper": "Pour Over",
+    "v60": "Pour Over",
+    "drip": "Drip",
+    "moccamaster": "Drip",
+    "french press": "French Press",
+    "aeropress": "Aeropress",
+    "cold brew": "Cold Brew",
+    "clod brew": "Cold Brew",
+    "moka pot": "Moka Pot",
+    "mokapot": "Moka Pot",
+    "percolator": "Percolator",
+    "keurig": "Pod Machine",
+}
+
+# Pseudo-reviews pulling a product's per-method ratio toward its overall
+# liked ratio (which is itself pulled toward the catalog-wide ratio).
+METHOD_SMOOTHING = 3.0
+PRODUCT_SMOOTHING = 5.0
+
+
+def canonical_brewing_method(method: Optional[str]) -> Optional[str]:
+    """
+    Map a user- or review-supplied method to its canonical name.
+
+    Parameters
+    ----------
+    method : Optional[str]
+        Free-text method, e.g. 'espresso machine'.
+
+    Returns
+    -------
+    Optional[str]
+        Canonical method, or None if it is not recognised.
+    """
+    if not method:
+        return None
+    text = method.strip().lower()
+    if text in BREWING_METHOD_ALIASES:
+        return BREWING_METHOD_ALIASES[text]
+    return next((m for m in BREWING_METHODS if m.lower() == text), None)
+
+
+def explode_brewing_methods(reviews_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (review, canonical method).
+
+    Multi-method entries such as 'Pour over and Espresso' are split;
+    unrecognised methods are dropped.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Reviews with product_name, sentiment and brewing_method.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_name, liked (bool) and brewing_method columns.
+    """
+    methods = (
+        reviews_df["brewing_method"].astype("string").str.lower()
+        .str.split(r"\s*(?:,|/|;|&|\band\b)\s*", regex=True)
+        .explode()
+        .str.strip()
+        .map(BREWING_METHOD_ALIASES)
+    )
+    exploded = pd.DataFrame({
+        "product_name": reviews_df["product_name"].reindex(methods.index),
+        "liked": (reviews_df["sentiment"] == "liked").reindex(methods.index),
+        "brewing_method": methods,
+    })
+    exploded = exploded.dropna(subset=["brewing_method"])
+    # A review naming the same method twice still counts once.
+    pairs = pd.MultiIndex.from_arrays([exploded.index, exploded["brewing_method"]])
+    return exploded[~pairs.duplicated()]
+
+
+def brewing_affinity(reviews_df: pd.DataFrame, products_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the dense product x method table of smoothed liked ratios.
+
+    ratio(product, method) = (liked + a * prior) / (reviews + a), where
+    the prior is the product's own smoothed liked ratio over all methods.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+    products_df : pd.DataFrame
+        Cleaned products with product_key.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key plus one column per method in ``BREWING_METHODS``,
+        covering every product.
+    """
+    key_by_name = product_key_by_name(products_df)
+    all_keys = pd.Index(products_df["product_key"].unique(), name="product_key")
+
+    liked = (reviews_df["sentiment"] == "liked")
+    overall = pd.DataFrame({
+        "product_key": reviews_df["product_name"].map(key_by_name),
+        "liked": liked,
+    }).groupby("product_key")["liked"].agg(["sum", "count"]).reindex(all_keys, fill_value=0)
+    global_ratio = float(liked.mean()) if len(liked) else 0.5
+    product_prior = (
+        (overall["sum"] + PRODUCT_SMOOTHING * global_ratio)
+        / (overall["count"] + PRODUCT_SMOOTHING)
+    ).to_numpy()[:, None]
+
+    exploded = explode_brewing_methods(reviews_df)
+    exploded["product_key"] = exploded["product_name"].map(key_by_name)
+    counts = exploded.pivot_table(
+        index="product_key", columns="brewing_method", values="liked",
+        aggfunc=["sum", "count"], fill_value=0,
+    )
+    method_liked = counts["sum"].reindex(index=all_keys, columns=BREWING_METHODS,
+                                         fill_value=0).to_numpy(dtype=np.float64)
+    method_total = counts["count"].reindex(index=all_keys, columns=BREWING_METHODS,
+                                           fill_value=0).to_numpy(dtype=np.float64)
+
+    ratio = (method_liked + METHOD_SMOOTHING * product_prior) / (method_total + METHOD_SMOOTHING)
+
+    table = pd.DataFrame(ratio.round(4), columns=BREWING_METHODS)
+    table.insert(0, "product_key", all_keys)
+    return table
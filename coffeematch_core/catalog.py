@@ -0,0 +1,608 @@
+"""
+Loads the processed CoffeeMatch datasets and builds the columnar catalog
+index used by the recommendation engine.
+
+The products CSV has one row per product *and* size. The index keeps
+that row layout, sorted so all sizes of a product are contiguous, and
+stores every column as a NumPy array. String columns are stored as
+integer codes plus a label array, which keeps the index compact and
+lets the engine evaluate filters and scores on whole arrays.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+PROCESSED_DIR = Path("data/processed")
+PRODUCTS_PATH = PROCESSED_DIR / "products_clean.csv"
+REVIEWS_PATH = PROCESSED_DIR / "reviews_clean.csv"
+
+# Per-product signals precomputed by scripts/prepare_data.py, keyed by
+# product_key. Missing files are skipped.
+PRODUCT_FEATURE_FILES = [
+    PROCESSED_DIR / "product_sentiment.csv",
+    PROCESSED_DIR / "product_popularity.csv",
+    PROCESSED_DIR / "product_price_trend.csv",
+]
+
+# Wide product x label tables (e.g. brewing method affinity), loaded as
+# one 2-D product column each, with the labels kept as categories.
+PRODUCT_MATRIX_FILES = {
+    "brewing_method": PROCESSED_DIR / "brewing_affinity.csv",
+}
+
+# Top-N similar products per product (see coffeematch_core.collaborative).
+PRODUCT_NEIGHBORS_PATH = PROCESSED_DIR / "product_neighbors.npz"
+
+# Per-product lists (tags, tasting notes), interned at prep time into
+# CSR offsets and int32 codes (see coffeematch_core.tags).
+PRODUCT_LISTS_PATH = PROCESSED_DIR / "product_lists.npz"
+
+# Option lists for the front ends (see coffeematch_core.tags).
+OPTIONS_PATH = PROCESSED_DIR / "options.json"
+
+CATEGORICAL_COLUMNS = [
+    "product_key",
+    "roaster",
+    "product_name",
+    "origin",
+    "roast_type",
+    "size",
+    "url",
+]
+NUMERIC_COLUMNS = [
+    "size_oz",
+    "price_numeric",
+    "price_per_oz",
+    "hearts",
+    "total_reviews",
+    "heart_percentage",
+]
+BOOL_COLUMNS = [
+    "decaf",
+    "blend",
+    "single_origin",
+    "available_ground",
+    "has_reviews",
+]
+
+# (column, value) pairs the hard filters test, kept as sorted row lists.
+FILTER_ROW_LISTS = [
+    ("decaf", True),
+    ("decaf", False),
+    ("available_ground", True),
+    ("single_origin", True),
+    ("blend", True),
+]
+
+
+def load_products(path: Path = PRODUCTS_PATH) -> pd.DataFrame:
+    """
+    Load the cleaned products CSV.
+
+    The file is validated at prep time, so no coercion happens here.
+
+    Parameters
+    ----------
+    path : Path
+        Location of products_clean.csv.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per product and size.
+    """
+    return pd.read_csv(path)
+
+
+def load_reviews(path: Path = REVIEWS_PATH) -> pd.DataFrame:
+    """
+    Load the cleaned reviews CSV.
+
+    Parameters
+    ----------
+    path : Path
+        Location of reviews_clean.csv.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per review.
+    """
+    return pd.read_csv(path)
+
+
+def product_key_by_name(products_df: pd.DataFrame) -> pd.Series:
+    """
+    Map product_name to product_key, for attaching reviews to products.
+
+    Reviews carry a product_name but no roaster, so a name shared by two
+    roasters' products cannot be told apart; the first product with the
+    name wins.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products.
+
+    Returns
+    -------
+    pd.Series
+        product_key indexed by product_name.
+    """
+    return products_df.drop_duplicates("product_name").set_index("product_name")["product_key"]
+
+
+@dataclass
+class CatalogIndex:
+    """
+    Read-only columnar view of the products catalog.
+
+    Attributes
+    ----------
+    columns : Dict[str, np.ndarray]
+        Per-row arrays. Categorical columns hold integer codes into
+        ``categories``; 'product_key' codes double as product ids.
+    categories : Dict[str, np.ndarray]
+        Label arrays for the categorical columns.
+    product_offsets : np.ndarray
+        Rows of product ``i`` are ``product_offsets[i]:product_offsets[i + 1]``.
+    product_columns : Dict[str, np.ndarray]
+        Per-product feature arrays (precomputed signals), indexed by
+        product id along their last axis.
+    list_offsets : Dict[str, np.ndarray]
+        Variable-length per-product lists (tags, tasting notes) in CSR layout:
+        product ``i`` owns ``list_codes[name][list_offsets[name][i]:list_offsets[name][i + 1]]``.
+    list_codes : Dict[str, np.ndarray]
+        int32 codes of those lists, into ``categories[name]``.
+    filter_stats : Dict[str, np.ndarray]
+        Hard-filter statistics for the query planner (see
+        ``build_filter_stats``).
+    """
+
+    columns: Dict[str, np.ndarray]
+    categories: Dict[str, np.ndarray]
+    product_offsets: np.ndarray
+    product_columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    list_offsets: Dict[str, np.ndarray] = field(default_factory=dict)
+    list_codes: Dict[str, np.ndarray] = field(default_factory=dict)
+    filter_stats: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        """Number of product/size rows."""
+        return int(self.product_offsets[-1])
+
+    @property
+    def n_products(self) -> int:
+        """Number of distinct products."""
+        return len(self.product_offsets) - 1
+
+    def labels(self, column: str, rows) -> np.ndarray:
+        """
+        Decode a categorical column for the given rows.
+
+        Parameters
+        ----------
+        column : str
+            Name of a categorical column.
+        rows : int, slice or array of int
+            Row positions to decode.
+
+        Returns
+        -------
+        np.ndarray
+            String labels.
+        """
+        return self.categories[column][self.columns[column][rows]]
+
+
+def product_id_of(index: CatalogIndex, product_key: str) -> Optional[int]:
+    """
+    Look up the product id of a product_key.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    product_key : str
+        Key to find.
+
+    Returns
+    -------
+    Optional[int]
+        Product id, or None if the key is not in the catalog.
+    """
+    keys = index.categories["product_key"]
+    product_id = int(np.searchsorted(keys, product_key))
+    if product_id >= len(keys) or keys[product_id] != product_key:
+        return None
+    return product_id
+
+
+def build_catalog_index(products_df: pd.DataFrame) -> CatalogIndex:
+    """
+    Build the columnar index from a cleaned products DataFrame.
+
+    Normalized score components are compiled from these columns by
+    ``coffeematch_core.scoring`` on first use.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Output of ``load_products``.
+
+    Returns
+    -------
+    CatalogIndex
+        Index with rows sorted by product_key, then size_oz.
+    """
+    df = products_df.sort_values(
+        ["product_key", "size_oz"], kind="stable"
+    ).reset_index(drop=True)
+
+    columns: Dict[str, np.ndarray] = {}
+    categories: Dict[str, np.ndarray] = {}
+
+    for col in CATEGORICAL_COLUMNS:
+        codes, labels = pd.factorize(df[col].fillna(""), sort=True)
+        columns[col] = codes.astype(np.int32)
+        categories[col] = np.asarray(labels, dtype=object)
+
+    for col in NUMERIC_COLUMNS:
+        columns[col] = df[col].to_numpy(dtype=np.float64)
+
+    for col in BOOL_COLUMNS:
+        columns[col] = df[col].to_numpy(dtype=bool)
+
+    n_products = len(categories["product_key"])
+    product_offsets = np.searchsorted(
+        columns["product_key"], np.arange(n_products + 1)
+    ).astype(np.int64)
+
+    return CatalogIndex(
+        columns=columns,
+        categories=categories,
+        product_offsets=product_offsets,
+        filter_stats=build_filter_stats(columns),
+    )
+
+
+def build_filter_stats(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Precompute what the query planner needs to order and run the filters.
+
+    - '<column>=<value>': sorted rows where a flag column has that value
+      (see ``FILTER_ROW_LISTS``); its length is the predicate's count.
+    - 'price_per_oz:order' / 'price_per_oz:sorted': rows by ascending
+      price and the prices in that order (NaN last), so a price cap's
+      count and rows are a binary search away.
+    - 'roast_type:counts': rows per roast_type code, so a roast filter's
+      count is a sum over its matching categories.
+
+    Parameters
+    ----------
+    columns : Dict[str, np.ndarray]
+        Per-row arrays of an index.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Statistics by name.
+    """
+    stats = {
+        f"{col}={value}": np.flatnonzero(columns[col] == value)
+        for col, value in FILTER_ROW_LISTS
+    }
+    order = np.argsort(columns["price_per_oz"], kind="stable")
+    stats["price_per_oz:order"] = order
+    stats["price_per_oz:sorted"] = columns["price_per_oz"][order]
+    stats["roast_type:counts"] = np.bincount(columns["roast_type"])
+    return stats
+
+
+def attach_product_features(
+    index: CatalogIndex,
+    features_df: pd.DataFrame,
+    fill_value: float = 0.0,
+) -> None:
+    """
+    Add per-product feature columns to an index.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    features_df : pd.DataFrame
+        product_key plus one or more numeric feature columns.
+    fill_value : float
+        Value for products missing from ``features_df``.
+    """
+    keys = index.categories["product_key"]
+    product_ids = np.searchsorted(keys, features_df["product_key"].to_numpy())
+    product_ids = np.minimum(product_ids, len(keys) - 1)
+    known = keys[product_ids] == features_df["product_key"].to_numpy()
+
+    for col in features_df.columns.drop("product_key"):
+        values = np.full(index.n_products, fill_value, dtype=np.float64)
+        values[product_ids[known]] = features_df[col].to_numpy(dtype=np.float64)[known]
+        index.product_columns[col] = values
+
+
+def attach_product_matrix(
+    index: CatalogIndex,
+    name: str,
+    table_df: pd.DataFrame,
+    fill_value: float = 0.0,
+) -> None:
+    """
+    Add a label x product matrix to an index.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    name : str
+        Key for the matrix in ``product_columns`` and for its row labels
+        in ``categories``.
+    table_df : pd.DataFrame
+        product_key plus one numeric column per label.
+    fill_value : float
+        Value for products missing from ``table_df``.
+    """
+    labels = table_df.columns.drop("product_key")
+    table = table_df.set_index("product_key")[labels]
+    matrix = (
+        table.reindex(index.categories["product_key"], fill_value=fill_value)
+        .to_numpy(dtype=np.float64)
+    )
+    index.product_columns[name] = np.ascontiguousarray(matrix.T)
+    index.categories[name] = np.asarray(labels, dtype=object)
+
+
+def attach_product_neighbors(index: CatalogIndex, path: Path = PRODUCT_NEIGHBORS_PATH) -> None:
+    """
+    Add saved neighbor lists to an index.
+
+    Stored as 'neighbors' (int32 product ids, -1 for empty slots) and
+    'neighbor_similarity' (float32), both of shape (top_n, n_products).
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    path : Path
+        .npz file written by ``collaborative.save_neighbors``.
+    """
+    with np.load(path, allow_pickle=False) as saved:
+        saved_keys = saved["product_keys"].astype(object)
+        neighbors, similarity = saved["neighbors"], saved["similarity"]
+
+    keys = index.categories["product_key"]
+    # Map saved product positions to index ids; -1 for unknown products.
+    remap = np.minimum(np.searchsorted(keys, saved_keys), len(keys) - 1)
+    remap = np.where(keys[remap] == saved_keys, remap, -1).astype(np.int32)
+    remap = np.append(remap, np.int32(-1))
+
+    top_n = neighbors.shape[1]
+    index_neighbors = np.full((top_n, index.n_products), -1, dtype=np.int32)
+    index_similarity = np.zeros((top_n, index.n_products), dtype=np.float32)
+    known = remap[:-1] >= 0
+    index_neighbors[:, remap[:-1][known]] = remap[neighbors[known]].T
+    index_similarity[:, remap[:-1][known]] = similarity[known].T
+    index_similarity[index_neighbors < 0] = 0.0
+
+    index.product_columns["neighbors"] = index_neighbors
+    index.product_columns["neighbor_similarity"] = index_similarity
+
+
+def intern_product_list(
+    product_keys: np.ndarray,
+    long_df: pd.DataFrame,
+    value_column: str,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intern a long product_key/value table into a CSR list per product.
+
+    Parameters
+    ----------
+    product_keys : np.ndarray
+        Sorted product keys; their positions are the product ids.
+    long_df : pd.DataFrame
+        product_key plus ``value_column``, one row per list entry.
+        Entries of unknown products are dropped.
+    value_column : str
+        Column holding the list values.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        int64 offsets (product ``i`` owns ``codes[offsets[i]:offsets[i + 1]]``),
+        int32 codes sorted within each product, and the sorted labels.
+    """
+    entry_keys = long_df["product_key"].to_numpy()
+    product_ids = np.minimum(np.searchsorted(product_keys, entry_keys), len(product_keys) - 1)
+    known = product_keys[product_ids] == entry_keys
+
+    codes, labels = pd.factorize(long_df.loc[known, value_column], sort=True)
+    product_ids = product_ids[known]
+    order = np.lexsort((codes, product_ids))
+
+    offsets = np.searchsorted(
+        product_ids[order], np.arange(len(product_keys) + 1)
+    ).astype(np.int64)
+    return offsets, codes[order].astype(np.int32), np.asarray(labels, dtype=object)
+
+
+def attach_product_list(
+    index: CatalogIndex,
+    name: str,
+    long_df: pd.DataFrame,
+    value_column: str,
+) -> None:
+    """
+    Add a per-product list from a long product_key/value table.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    name : str
+        Key for the list in ``list_offsets``, ``list_codes`` and
+        ``categories``.
+    long_df : pd.DataFrame
+        product_key plus ``value_column``, one row per list entry.
+    value_column : str
+        Column holding the list values.
+    """
+    offsets, codes, labels = intern_product_list(
+        index.categories["product_key"], long_df, value_column
+    )
+    index.list_offsets[name] = offsets
+    index.list_codes[name] = codes
+    index.categories[name] = labels
+
+
+def attach_product_lists(index: CatalogIndex, path: Path = PRODUCT_LISTS_PATH) -> None:
+    """
+    Add the per-product lists interned at prep time.
+
+    The saved arrays are used as they are when the catalog has the same
+    products as at prep time; otherwise each list is decoded and
+    re-interned against the index's product ids.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    path : Path
+        .npz file written by ``tags.save_product_lists``.
+    """
+    keys = index.categories["product_key"]
+    with np.load(path, allow_pickle=False) as saved:
+        saved_keys = saved["product_keys"].astype(object)
+        same_products = np.array_equal(saved_keys, keys)
+        for name in saved["names"].tolist():
+            offsets = saved[f"{name}_offsets"]
+            codes = saved[f"{name}_codes"]
+            labels = saved[f"{name}_labels"].astype(object)
+            if same_products:
+                index.list_offsets[name] = offsets
+                index.list_codes[name] = codes
+                index.categories[name] = labels
+                continue
+            long_df = pd.DataFrame({
+                "product_key": np.repeat(saved_keys, np.diff(offsets)),
+                name: labels[codes],
+            })
+            attach_product_list(index, name, long_df, name)
+
+
+def list_overlap(index: CatalogIndex, name: str, values) -> np.ndarray:
+    """
+    Count, per product, how many of ``values`` appear in its list.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    name : str
+        List to search, e.g. 'tag'.
+    values : iterable of str
+        Requested labels; unknown ones never match.
+
+    Returns
+    -------
+    np.ndarray
+        int64 match count per product id.
+    """
+    labels = index.categories[name]
+    wanted = np.asarray(sorted(set(values)), dtype=object)
+    if len(labels) == 0 or len(wanted) == 0:
+        return np.zeros(index.n_products, dtype=np.int64)
+    codes = np.minimum(np.searchsorted(labels, wanted), len(labels) - 1)
+    codes = codes[labels[codes] == wanted]
+
+    hits = np.isin(index.list_codes[name], codes)
+    cumulative = np.concatenate([[0], np.cumsum(hits)])
+    offsets = index.list_offsets[name]
+    return cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+
+def product_list(index: CatalogIndex, name: str, product_id: int) -> List[str]:
+    """
+    Decode one product's list.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    name : str
+        List name, e.g. 'tag'.
+    product_id : int
+        Product to decode.
+
+    Returns
+    -------
+    List[str]
+        Labels, sorted.
+    """
+    if name not in index.list_offsets:
+        return []
+    offsets = index.list_offsets[name]
+    codes = index.list_codes[name][offsets[product_id]:offsets[product_id + 1]]
+    return [str(label) for label in index.categories[name][codes]]
+
+
+def product_feature(index: CatalogIndex, name: str, rows: slice) -> np.ndarray:
+    """
+    Broadcast a per-product feature to a range of rows.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    name : str
+        Key in ``index.product_columns``.
+    rows : slice
+        Row range.
+
+    Returns
+    -------
+    np.ndarray
+        Feature value of each row's product.
+    """
+    return index.product_columns[name][index.columns["product_key"][rows]]
+
+
+def load_catalog_index(path: Path = PRODUCTS_PATH) -> CatalogIndex:
+    """
+    Load products_clean.csv, build its index and attach any precomputed
+    product features found next to it.
+
+    Parameters
+    ----------
+    path : Path
+        Location of products_clean.csv.
+
+    Returns
+    -------
+    CatalogIndex
+        Index ready for the engine.
+    """
+    index = build_catalog_index(load_products(path))
+    for feature_path in PRODUCT_FEATURE_FILES:
+        if feature_path.exists():
+            attach_product_features(index, pd.read_csv(feature_path))
+    for name, matrix_path in PRODUCT_MATRIX_FILES.items():
+        if matrix_path.exists():
+            attach_product_matrix(index, name, pd.read_csv(matrix_path))
+    if PRODUCT_NEIGHBORS_PATH.exists():
+        attach_product_neighbors(index)
+    if PRODUCT_LISTS_PATH.exists():
+        attach_product_lists(index)
+    return index
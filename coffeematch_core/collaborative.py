@@ -0,0 +1,287 @@
+"""
+Item-item collaborative model built offline from review co-occurrence.
+
+Reviews carry no reviewer ids, so products are linked through the
+review contexts they share instead: the brewing methods and tasting
+notes reviewers mention. Each review adds +1 (liked) or -1 (disliked) to
+its product's count for each of its contexts, giving a context x product
+matrix. Products are similar when they are liked, and disliked, in the
+same contexts: cosine similarity between their columns.
+
+The matrix is assembled with one ``np.bincount`` over (context, product)
+coordinates, and similarities come from blocked matrix products, so
+building it never loops over reviews or product pairs in Python. Only
+the top-N neighbors of each product are kept and saved as two compact
+arrays; ``also_liked`` and ``collaborative_scores`` serve them.
+"""
+
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.brewing import explode_brewing_methods
+from coffeematch_core.catalog import (
+    PRODUCT_NEIGHBORS_PATH,
+    CatalogIndex,
+    product_id_of,
+    product_key_by_name,
+)
+
+
+TOP_N_NEIGHBORS = 10
+
+# Products per block of the similarity product; bounds peak memory at
+# BLOCK_SIZE x n_products floats.
+BLOCK_SIZE = 2048
+
+
+def review_contexts(reviews_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    List the contexts each review mentions.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (review, context), indexed by review, with a
+        'context' column such as 'method:Espresso' or 'note:berry'.
+    """
+    methods = explode_brewing_methods(reviews_df)["brewing_method"]
+    notes = (
+        reviews_df["tasting_notes"].astype("string").str.lower()
+        .str.split(",").explode().str.strip()
+    )
+    notes = notes[notes.fillna("") != ""]
+    contexts = pd.concat([
+        "method:" + methods.astype(str),
+        "note:" + notes.astype(str),
+    ])
+    # A review naming the same note twice still counts once.
+    pairs = pd.MultiIndex.from_arrays([contexts.index, contexts])
+    return contexts[~pairs.duplicated()].rename("context").to_frame()
+
+
+def context_product_matrix(
+    reviews_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the signed context x product count matrix.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+    products_df : pd.DataFrame
+        Cleaned products with product_key.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        float32 matrix of shape (contexts, products), the context labels
+        and the sorted product keys its columns belong to.
+    """
+    product_keys = np.sort(products_df["product_key"].unique().astype(str))
+    key_by_name = product_key_by_name(products_df)
+    sign = np.where(reviews_df["sentiment"] == "liked", 1.0, -1.0)
+    review_keys = reviews_df["product_name"].map(key_by_name)
+
+    contexts = review_contexts(reviews_df)
+    keys = review_keys.reindex(contexts.index)
+    known = keys.notna().to_numpy()
+    context_codes, context_labels = pd.factorize(contexts["context"][known], sort=True)
+    product_ids = np.searchsorted(product_keys, keys[known].to_numpy(dtype=str))
+    weights = pd.Series(sign, index=reviews_df.index).reindex(contexts.index)[known]
+
+    n_contexts, n_products = len(context_labels), len(product_keys)
+    counts = np.bincount(
+        context_codes.astype(np.int64) * n_products + product_ids,
+        weights=weights.to_numpy(),
+        minlength=n_contexts * n_products,
+    )
+    matrix = counts.reshape(n_contexts, n_products).astype(np.float32)
+    return matrix, np.asarray(context_labels, dtype=object), product_keys
+
+
+def item_neighbors(
+    matrix: np.ndarray,
+    top_n: int = TOP_N_NEIGHBORS,
+    block_size: int = BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find each product's most similar products by cosine similarity.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Context x product matrix from ``context_product_matrix``.
+    top_n : int
+        Neighbors kept per product.
+    block_size : int
+        Products per block of the similarity product.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        int32 neighbor ids and float32 similarities, both of shape
+        (products, top_n), most similar first. Slots without a positively
+        similar neighbor hold id -1 and similarity 0.
+    """
+    n_products = matrix.shape[1]
+    top_n = min(top_n, max(n_products - 1, 0))
+    norms = np.linalg.norm(matrix, axis=0)
+    unit = matrix / np.where(norms > 0, norms, 1.0)
+
+    neighbors = np.full((n_products, top_n), -1, dtype=np.int32)
+    similarity = np.zeros((n_products, top_n), dtype=np.float32)
+    if top_n == 0:
+        return neighbors, similarity
+
+    for start in range(0, n_products, block_size):
+        stop = min(start + block_size, n_products)
+        sims = unit[:, start:stop].T @ unit
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(-sims, top_n - 1, axis=1)[:, :top_n]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        positive = top_sims > 0
+        neighbors[start:stop] = np.where(positive, top, -1)
+        similarity[start:stop] = np.where(positive, top_sims, 0.0)
+
+    return neighbors, similarity
+
+
+def save_neighbors(
+    product_keys: np.ndarray,
+    neighbors: np.ndarray,
+    similarity: np.ndarray,
+    path: Path = PRODUCT_NEIGHBORS_PATH,
+) -> None:
+    """
+    Save neighbor lists for ``catalog.attach_product_neighbors``.
+
+    Parameters
+    ----------
+    product_keys : np.ndarray
+        Keys of the products the rows belong to; neighbor ids index it.
+    neighbors, similarity : np.ndarray
+        Output of ``item_neighbors``.
+    path : Path
+        Destination .npz file.
+    """
+    np.savez_compressed(
+        path,
+        product_keys=np.asarray(product_keys, dtype=str),
+        neighbors=neighbors,
+        similarity=similarity,
+    )
+
+
+def build_product_neighbors(
+    reviews_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+    path: Path = PRODUCT_NEIGHBORS_PATH,
+    top_n: int = TOP_N_NEIGHBORS,
+) -> None:
+    """
+    Build and save the neighbor lists from cleaned data.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+    products_df : pd.DataFrame
+        Cleaned products with product_key.
+    path : Path
+        Destination .npz file.
+    top_n : int
+        Neighbors kept per product.
+    """
+    matrix, _, product_keys = context_product_matrix(reviews_df, products_df)
+    neighbors, similarity = item_neighbors(matrix, top_n)
+    save_neighbors(product_keys, neighbors, similarity, path)
+
+
+def also_liked(
+    index: CatalogIndex,
+    product_key: str,
+    n: int = 5,
+) -> List[Tuple[str, float]]:
+    """
+    People who liked this product also liked...
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index with neighbor lists attached.
+    product_key : str
+        Product to look up.
+    n : int
+        Maximum number of products to return.
+
+    Returns
+    -------
+    List[Tuple[str, float]]
+        ``(product_key, similarity)`` pairs, most similar first. Empty if
+        the product is unknown or no neighbors were precomputed.
+    """
+    if "neighbors" not in index.product_columns:
+        return []
+    product_id = product_id_of(index, product_key)
+    if product_id is None:
+        return []
+    keys = index.categories["product_key"]
+
+    ids = index.product_columns["neighbors"][:n, product_id]
+    sims = index.product_columns["neighbor_similarity"][:n, product_id]
+    return [(str(keys[i]), float(s)) for i, s in zip(ids, sims) if i >= 0]
+
+
+def collaborative_scores(
+    index: CatalogIndex,
+    liked_products: Sequence[str],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score every product by its similarity to the user's liked products.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index with neighbor lists attached.
+    liked_products : Sequence[str]
+        Product keys the user liked.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Per-product score (the best similarity to any liked product, 0
+        if none) and the id of that liked product (-1 if none).
+    """
+    scores = np.zeros(index.n_products)
+    sources = np.full(index.n_products, -1, dtype=np.int64)
+    if "neighbors" not in index.product_columns:
+        return scores, sources
+
+    keys = index.categories["product_key"]
+    liked = np.asarray(list(liked_products), dtype=object)
+    liked_ids = np.minimum(np.searchsorted(keys, liked), len(keys) - 1)
+    liked_ids = np.unique(liked_ids[keys[liked_ids] == liked])
+
+    for liked_id in liked_ids:
+        ids = index.product_columns["neighbors"][:, liked_id]
+        sims = index.product_columns["neighbor_similarity"][:, liked_id]
+        better = (ids >= 0) & (sims > scores[ids])
+        scores[ids[better]] = sims[better]
+        sources[ids[better]] = liked_id
+
+    return scores, sources
@@ -0,0 +1,107 @@
+"""
+Diversity-aware re-ranking with maximal marginal relevance (MMR).
+
+Plain top-k often returns several sizes or near-identical blends from the
+same roaster. MMR picks products one at a time, trading relevance against
+similarity to what has already been picked:
+
+    pick = argmax  lambda * relevance - (1 - lambda) * max_sim_to_picked
+
+Products are described by their categorical profile codes (roaster,
+roast type, origin, blend), so similarity to one product is a handful of
+vectorized code comparisons. The running ``max_sim_to_picked`` vector is
+updated once per pick, which makes the whole re-rank O(k * n).
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from coffeematch_core.catalog import CatalogIndex
+
+
+DEFAULT_DIVERSITY_LAMBDA = 0.7
+
+# Similarity contributed by each shared attribute; sums to 1.0 for
+# products with the same roaster and profile.
+PROFILE_SIMILARITY_WEIGHTS: Dict[str, float] = {
+    "roaster": 0.5,
+    "roast_type": 0.2,
+    "origin": 0.2,
+    "blend": 0.1,
+}
+
+
+def product_profiles(index: CatalogIndex, product_ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Gather the profile codes of a set of products.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    product_ids : np.ndarray
+        Products to describe.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        One code array per attribute in ``PROFILE_SIMILARITY_WEIGHTS``.
+    """
+    first_rows = index.product_offsets[product_ids]
+    return {col: index.columns[col][first_rows] for col in PROFILE_SIMILARITY_WEIGHTS}
+
+
+def mmr_rerank(
+    index: CatalogIndex,
+    ranked: List[Tuple[float, int]],
+    k: int,
+    diversity_lambda: float = DEFAULT_DIVERSITY_LAMBDA,
+) -> List[Tuple[float, int]]:
+    """
+    Re-rank candidates with maximal marginal relevance.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    ranked : List[Tuple[float, int]]
+        ``(score, product_id)`` candidates from the ranking stage.
+    k : int
+        Number of products to select.
+    diversity_lambda : float
+        1.0 keeps the original order; lower values favour variety.
+
+    Returns
+    -------
+    List[Tuple[float, int]]
+        Selected ``(score, product_id)`` pairs in pick order, with the
+        original relevance scores.
+    """
+    if not ranked:
+        return []
+
+    scores = np.array([score for score, _ in ranked])
+    product_ids = np.array([pid for _, pid in ranked])
+
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    profiles = product_profiles(index, product_ids)
+
+    max_sim = np.zeros(len(ranked))
+    available = np.ones(len(ranked), dtype=bool)
+    picks = []
+
+    for _ in range(min(k, len(ranked))):
+        mmr = diversity_lambda * relevance - (1.0 - diversity_lambda) * max_sim
+        mmr[~available] = -np.inf
+        pick = int(np.argmax(mmr))
+        picks.append(pick)
+        available[pick] = False
+
+        sim = np.zeros(len(ranked))
+        for col, weight in PROFILE_SIMILARITY_WEIGHTS.items():
+            sim += weight * (profiles[col] == profiles[col][pick])
+        np.maximum(max_sim, sim, out=max_sim)
+
+    return [(float(scores[i]), int(product_ids[i])) for i in picks]
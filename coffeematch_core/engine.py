@@ -0,0 +1,789 @@
+"""
+Recommendation engine: hard filters, scoring and top-k selection over a
+``CatalogIndex``.
+
+All stages work on whole column arrays. For large catalogs the ranking
+stage splits the products into contiguous shards, scores them on a
+thread pool (NumPy releases the GIL inside its array kernels), keeps a
+local top-k per shard and finishes with a k-way merge.
+"""
+
+import heapq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from coffeematch_core.brewing import canonical_brewing_method
+from coffeematch_core.catalog import CatalogIndex, list_overlap, product_feature, product_list
+from coffeematch_core.collaborative import collaborative_scores
+from coffeematch_core.diversity import mmr_rerank
+from coffeematch_core.pareto import dominance_reasons, product_objectives, skyline
+from coffeematch_core.planner import Predicate, filter_rows, plan_filters, roast_matches
+from coffeematch_core.request_log import log_request, request_logger
+from coffeematch_core.schemas import Recommendation, SizeOption, UserPreferences
+from coffeematch_core.scoring import (
+    ScoringVariant,
+    assign_variant,
+    column_weights,
+    component_row,
+    load_scoring_config,
+    resolve_weight,
+    score_components,
+    variant_preferences,
+)
+
+
+DEFAULT_TOP_K = 5
+
+# Default worker count; -1 uses every core. Overridable per call.
+N_JOBS = int(os.environ.get("COFFEEMATCH_N_JOBS", "1"))
+
+# Shards smaller than this cost more in dispatch than they save.
+MIN_ROWS_PER_SHARD = 25_000
+
+# With diversity re-ranking on, MMR chooses among this many times k of
+# the best-scoring products.
+DIVERSITY_POOL_FACTOR = 10
+
+# 'score' ranks by the weighted score; 'pareto' returns the best-value
+# frontier over price, rating and review count.
+RANKING_MODES = ("score", "pareto")
+
+# Shards whose filtered rows are at most this share of their rows are
+# scored row by row instead of as whole columns.
+SPARSE_SCORING_FRACTION = 0.1
+
+# Recent price drops at least this large are called out in the reasons.
+PRICE_DROP_REASON = 0.05
+
+# (score, product id) pairs, best first.
+RankedProducts = List[Tuple[float, int]]
+
+# A request-dependent score component over the whole catalog: the name of
+# the column whose codes index it, and its values.
+QueryTable = Tuple[str, np.ndarray]
+
+
+def resolve_n_jobs(n_jobs: Optional[int] = None) -> int:
+    """
+    Turn an ``n_jobs`` setting into a positive worker count.
+
+    Parameters
+    ----------
+    n_jobs : Optional[int]
+        Requested workers. None uses ``N_JOBS``; negative values count
+        back from the number of cores (-1 = all cores).
+
+    Returns
+    -------
+    int
+        Number of workers, at least 1.
+    """
+    if n_jobs is None:
+        n_jobs = N_JOBS
+    if n_jobs < 0:
+        n_jobs = (os.cpu_count() or 1) + 1 + n_jobs
+    return max(1, n_jobs)
+
+
+@lru_cache(maxsize=None)
+def _thread_pool(n_workers: int) -> ThreadPoolExecutor:
+    """Process-wide pool per worker count, created on first use."""
+    return ThreadPoolExecutor(max_workers=n_workers,
+                              thread_name_prefix="coffeematch-score")
+
+
+def brewing_affinity_row(
+    index: CatalogIndex,
+    brewing_method: Optional[str],
+) -> Optional[np.ndarray]:
+    """
+    Look up the per-product affinity for a brewing method.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index, with the precomputed 'brewing_method' matrix.
+    brewing_method : Optional[str]
+        User's brewing method.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        Smoothed liked ratio per product, or None if no method is set,
+        it is unknown, or the matrix was not precomputed.
+    """
+    method = canonical_brewing_method(brewing_method)
+    if method is None or "brewing_method" not in index.product_columns:
+        return None
+    labels = list(index.categories["brewing_method"])
+    if method not in labels:
+        return None
+    return index.product_columns["brewing_method"][labels.index(method)]
+
+
+def apply_filters(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    rows: slice = slice(None),
+) -> np.ndarray:
+    """
+    Evaluate the hard filters for a range of rows.
+
+    The filters are planned and run by ``coffeematch_core.planner``;
+    see ``planner.plan_filters`` for their semantics.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections.
+    rows : slice
+        Contiguous row range to evaluate.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask over the selected rows.
+    """
+    start, stop, _ = rows.indices(index.n_rows)
+    mask = np.zeros(stop - start, dtype=bool)
+    mask[filter_rows(index, prefs, rows) - start] = True
+    return mask
+
+
+def _query_table(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    kind: str,
+) -> Optional[QueryTable]:
+    """Evaluate one request-dependent component; None if it does not apply."""
+    if kind == "roast_match":
+        if not prefs.roast_type:
+            return None
+        return "roast_type", roast_matches(index, prefs.roast_type)
+    if kind == "brewing_affinity":
+        affinity = brewing_affinity_row(index, prefs.brewing_method)
+        return None if affinity is None else ("product_key", affinity)
+    if kind == "collaborative":
+        if not prefs.liked_products:
+            return None
+        similar, _ = collaborative_scores(index, prefs.liked_products)
+        return "product_key", similar
+    if kind == "tag_share":
+        if not prefs.tags or "tag" not in index.list_codes:
+            return None
+        return "product_key", list_overlap(index, "tag", prefs.tags) / len(set(prefs.tags))
+    if kind == "note_share":
+        if not prefs.tasting_notes or "note" not in index.list_codes:
+            return None
+        notes = list_overlap(index, "note", prefs.tasting_notes)
+        return "product_key", notes / len(set(prefs.tasting_notes))
+    raise ValueError(f"Unknown query component kind {kind!r}")
+
+
+def query_tables(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+) -> Dict[str, QueryTable]:
+    """
+    Evaluate the request-dependent components the user's weights use.
+
+    Each component is computed once over the whole catalog (per product,
+    or per roast level for 'roast_match'); scoring a range of rows then
+    only gathers from it, so shards share one evaluation per request.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+
+    Returns
+    -------
+    Dict[str, QueryTable]
+        By component kind; kinds that do not apply are left out.
+    """
+    tables = {}
+    for component in load_scoring_config().queries:
+        if component.kind in tables or not resolve_weight(component.weight, prefs):
+            continue
+        table = _query_table(index, prefs, component.kind)
+        if table is not None:
+            tables[component.kind] = table
+    return tables
+
+
+def _query_values(index: CatalogIndex, table: QueryTable, rows) -> np.ndarray:
+    """Gather a query component for a range of rows."""
+    column, values = table
+    return values[index.columns[column][rows]]
+
+
+def score_products(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    rows: slice = slice(None),
+    tables: Optional[Dict[str, QueryTable]] = None,
+) -> np.ndarray:
+    """
+    Score a range of rows with the user's weights.
+
+    The formula comes from the scoring config (``config/scoring.toml``,
+    see ``coffeematch_core.scoring``). With the default config:
+
+    score = roast_weight * roast match
+          + price_weight * value_score
+          + popularity_weight * popularity_score
+          + sentiment_weight * sentiment_score   (if precomputed)
+          + trending_weight * trend_score        (if precomputed)
+          + brewing_weight * brewing affinity    (if a method is set)
+          + collaborative_weight * similarity to liked_products
+          + tag_weight * share of requested tags matched
+          + note_weight * share of requested tasting notes matched
+          + price_drop_weight * recent price drop  (if price history exists)
+
+    Column components are one matrix-vector product over the compiled
+    component matrix; query components are evaluated only when their
+    weight is non-zero.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+    rows : slice or np.ndarray
+        Contiguous row range, or sorted row positions, to score.
+    tables : Optional[Dict[str, QueryTable]]
+        ``query_tables(index, prefs)``, when the caller scores several
+        ranges for one request; evaluated here otherwise.
+
+    Returns
+    -------
+    np.ndarray
+        Float scores for the selected rows (filters not applied).
+    """
+    config = load_scoring_config()
+    components = score_components(index, config)
+    scores = column_weights(index, config, prefs) @ components[:, rows]
+
+    if tables is None:
+        tables = query_tables(index, prefs)
+    for component in config.queries:
+        weight = resolve_weight(component.weight, prefs)
+        if weight and component.kind in tables:
+            scores += weight * _query_values(index, tables[component.kind], rows)
+
+    return scores
+
+
+def score_variants(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    variants: Sequence[ScoringVariant],
+    rows: slice = slice(None),
+) -> np.ndarray:
+    """
+    Score rows under several weight variants at once.
+
+    Variants differ only in weights, so the column components are read
+    once: stacking the variants' weight vectors turns scoring into one
+    (variants x components) @ (components x rows) product. Each query
+    component is evaluated once and added with per-variant weights.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections; the variants override its weights.
+    variants : Sequence[ScoringVariant]
+        Weight variants.
+    rows : slice or np.ndarray
+        Contiguous row range, or sorted row positions, to score.
+
+    Returns
+    -------
+    np.ndarray
+        (variants x rows) float scores (filters not applied).
+    """
+    config = load_scoring_config()
+    components = score_components(index, config)
+    variant_prefs = [variant_preferences(prefs, variant) for variant in variants]
+    weights = np.vstack([column_weights(index, config, p) for p in variant_prefs])
+    scores = weights @ components[:, rows]
+
+    for component in config.queries:
+        query_weights = np.array([resolve_weight(component.weight, p) for p in variant_prefs])
+        if not query_weights.any():
+            continue
+        table = _query_table(index, prefs, component.kind)
+        if table is not None:
+            scores += query_weights[:, None] * _query_values(index, table, rows)
+
+    return scores
+
+
+def _top_k(product_scores: np.ndarray, k: int, product_ids: np.ndarray) -> RankedProducts:
+    """Select the k best finite scores, ordered by score then product id."""
+    candidates = np.flatnonzero(np.isfinite(product_scores))
+    if len(candidates) > k:
+        # Keep every score tied with the k-th, so ties are broken by id
+        # below rather than arbitrarily by the partition.
+        kth = -np.partition(-product_scores[candidates], k - 1)[k - 1]
+        candidates = candidates[product_scores[candidates] >= kth]
+
+    order = np.lexsort((candidates, -product_scores[candidates]))[:k]
+    return [
+        (float(product_scores[i]), int(product_ids[i]))
+        for i in candidates[order]
+    ]
+
+
+def _rank_shard(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    first_product: int,
+    last_product: int,
+    k: int,
+    plan: List[Predicate],
+    tables: Dict[str, QueryTable],
+) -> RankedProducts:
+    """Filter, score and keep a local top-k for products in one shard."""
+    offsets = index.product_offsets
+    rows = slice(int(offsets[first_product]), int(offsets[last_product]))
+
+    candidates = filter_rows(index, prefs, rows, plan)
+    if len(candidates) == 0:
+        return []
+    if len(candidates) <= SPARSE_SCORING_FRACTION * (rows.stop - rows.start):
+        # Few rows left: score just those, grouped by their product.
+        scores = score_products(index, prefs, candidates, tables)
+        product_ids = index.columns["product_key"][candidates]
+        starts = np.flatnonzero(np.diff(product_ids, prepend=-1))
+        return _top_k(np.maximum.reduceat(scores, starts), k, product_ids[starts])
+
+    scores = score_products(index, prefs, rows, tables)
+    keep = np.zeros(len(scores), dtype=bool)
+    keep[candidates - rows.start] = True
+    scores[~keep] = -np.inf
+
+    # Product score = best size; segments are never empty.
+    segment_starts = offsets[first_product:last_product] - rows.start
+    product_scores = np.maximum.reduceat(scores, segment_starts)
+    return _top_k(product_scores, k, np.arange(first_product, last_product))
+
+
+def shard_bounds(index: CatalogIndex, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Split products into contiguous shards with roughly equal row counts.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    n_shards : int
+        Desired number of shards.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        ``(first_product, last_product)`` half-open ranges.
+    """
+    targets = np.linspace(0, index.n_rows, n_shards + 1)
+    cuts = np.searchsorted(index.product_offsets, targets)
+    cuts[0], cuts[-1] = 0, index.n_products
+    cuts = np.unique(cuts)
+    return [(int(a), int(b)) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def rank_products(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    k: int = DEFAULT_TOP_K,
+    n_jobs: Optional[int] = None,
+) -> RankedProducts:
+    """
+    Return the k best products for a user.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+    k : int
+        Number of products to return.
+    n_jobs : Optional[int]
+        Worker threads; see ``resolve_n_jobs``.
+
+    Returns
+    -------
+    RankedProducts
+        ``(score, product_id)`` pairs, best first.
+    """
+    if index.n_products == 0 or k <= 0:
+        return []
+
+    n_shards = min(resolve_n_jobs(n_jobs),
+                   max(1, index.n_rows // MIN_ROWS_PER_SHARD))
+    # Planned and evaluated once: shards share the predicates, their row
+    # lists and the whole-catalog query components.
+    plan = plan_filters(index, prefs)
+    tables = query_tables(index, prefs)
+    if n_shards == 1:
+        return _rank_shard(index, prefs, 0, index.n_products, k, plan, tables)
+
+    pool = _thread_pool(n_shards)
+    futures = [
+        pool.submit(_rank_shard, index, prefs, first, last, k, plan, tables)
+        for first, last in shard_bounds(index, n_shards)
+    ]
+    shard_results = [future.result() for future in futures]
+    merged = heapq.merge(*shard_results, key=lambda item: (-item[0], item[1]))
+    return list(islice(merged, k))
+
+
+def rank_variants(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    variants: Sequence[ScoringVariant],
+    k: int = DEFAULT_TOP_K,
+) -> Dict[str, RankedProducts]:
+    """
+    Return the k best products under each weight variant, in one pass.
+
+    Filters do not depend on weights, so they run once; scores come from
+    ``score_variants``.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+    variants : Sequence[ScoringVariant]
+        Weight variants.
+    k : int
+        Number of products per variant.
+
+    Returns
+    -------
+    Dict[str, RankedProducts]
+        ``(score, product_id)`` pairs, best first, by variant name.
+    """
+    candidates = filter_rows(index, prefs)
+    if index.n_products == 0 or k <= 0 or len(candidates) == 0:
+        return {variant.name: [] for variant in variants}
+
+    if len(candidates) <= SPARSE_SCORING_FRACTION * index.n_rows:
+        scores = score_variants(index, prefs, variants, candidates)
+        row_products = index.columns["product_key"][candidates]
+    else:
+        scores = score_variants(index, prefs, variants)
+        keep = np.zeros(index.n_rows, dtype=bool)
+        keep[candidates] = True
+        scores[:, ~keep] = -np.inf
+        row_products = index.columns["product_key"]
+
+    # A product scores its best row, so the k best products all own one
+    # of the k * (most sizes per product) best rows. Selecting those rows
+    # first (ties included) avoids a per-product reduction per variant.
+    n_best = min(k * int(np.diff(index.product_offsets).max()), scores.shape[1])
+    ranked = {}
+    for variant, row_scores in zip(variants, scores):
+        threshold = np.partition(row_scores, scores.shape[1] - n_best)[scores.shape[1] - n_best]
+        best_rows = np.flatnonzero(row_scores >= threshold)
+        product_ids = row_products[best_rows]
+        starts = np.flatnonzero(np.diff(product_ids, prepend=-1))
+        product_scores = np.maximum.reduceat(row_scores[best_rows], starts)
+        ranked[variant.name] = _top_k(product_scores, k, product_ids[starts])
+    return ranked
+
+
+def rank_pareto(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    k: int = DEFAULT_TOP_K,
+) -> Tuple[RankedProducts, List[List[str]]]:
+    """
+    Return up to k products from the price/rating/reviews Pareto front.
+
+    Frontier products are ordered by the user's weighted score, so the
+    weights still decide which trade-offs are shown first.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+    k : int
+        Maximum number of products to return.
+
+    Returns
+    -------
+    Tuple[RankedProducts, List[List[str]]]
+        ``(score, product_id)`` pairs, best first, and the dominance
+        reasons of each.
+    """
+    if index.n_products == 0 or k <= 0:
+        return [], []
+
+    keep = apply_filters(index, prefs)
+    product_ids, price, hearts, reviews = product_objectives(index, keep)
+    frontier = skyline(price, hearts, reviews)
+    reasons = dominance_reasons(price, hearts, reviews, frontier)
+
+    scores = score_products(index, prefs)
+    scores[~keep] = -np.inf
+    product_scores = np.maximum.reduceat(scores, index.product_offsets[:-1])
+    frontier_ids = product_ids[frontier]
+    order = np.lexsort((frontier_ids, -product_scores[frontier_ids]))[:k]
+    return (
+        [(float(product_scores[frontier_ids[i]]), int(frontier_ids[i])) for i in order],
+        [reasons[i] for i in order],
+    )
+
+
+def _match_reasons(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    row: int,
+) -> List[str]:
+    """Explain why one row scored the way it did."""
+    cols = index.columns
+    reasons = []
+
+    if prefs.decaf is not None:
+        reasons.append("Decaf." if prefs.decaf else "Caffeinated.")
+    if prefs.roast_type and roast_matches(index, prefs.roast_type)[cols["roast_type"][row]]:
+        reasons.append(f"Roast match: {index.labels('roast_type', row)}.")
+    if prefs.ground_required:
+        reasons.append("Available ground.")
+    score_components(index)
+    value, popularity = component_row(index, "value"), component_row(index, "popularity")
+    if prefs.max_price_per_oz is not None:
+        reasons.append(f"Within budget (${cols['price_per_oz'][row]:.2f}/oz).")
+    elif value is not None and value[row] >= 0.5:
+        reasons.append(f"Good value (${cols['price_per_oz'][row]:.2f}/oz).")
+    if cols["has_reviews"][row] and popularity is not None and popularity[row] >= 0.5:
+        reasons.append(
+            f"Popular: {cols['heart_percentage'][row]:.0f}% hearts from "
+            f"{int(cols['total_reviews'][row])} reviews."
+        )
+    if (prefs.sentiment_weight and "sentiment_score" in index.product_columns
+            and product_feature(index, "sentiment_score", row) >= 0.6):
+        reasons.append("Reviewers rave about it.")
+    if (prefs.trending_weight and "trend_score" in index.product_columns
+            and product_feature(index, "trend_score", row) >= 0.5):
+        reasons.append("Trending with recent reviewers.")
+    affinity = brewing_affinity_row(index, prefs.brewing_method)
+    if affinity is not None and affinity[cols["product_key"][row]] >= 0.75:
+        reasons.append(
+            f"Liked by {canonical_brewing_method(prefs.brewing_method)} brewers "
+            f"({affinity[cols['product_key'][row]]:.0%})."
+        )
+    if prefs.liked_products and prefs.collaborative_weight:
+        similar, sources = collaborative_scores(index, prefs.liked_products)
+        product_id = cols["product_key"][row]
+        if similar[product_id] >= 0.3:
+            source_row = index.product_offsets[sources[product_id]]
+            reasons.append(
+                f"People who liked {index.labels('product_name', source_row)} "
+                "also liked this."
+            )
+    if prefs.tags and "tag" in index.list_codes:
+        matched = sorted(set(prefs.tags) & set(product_list(index, "tag", cols["product_key"][row])))
+        if matched:
+            reasons.append(f"Tags: {', '.join(matched)}.")
+    if prefs.tasting_notes and "note" in index.list_codes:
+        matched = sorted(set(prefs.tasting_notes)
+                         & set(product_list(index, "note", cols["product_key"][row])))
+        if matched:
+            reasons.append(f"Reviewers taste {', '.join(matched)}.")
+    if ("price_drop" in index.product_columns
+            and product_feature(index, "price_drop", row) >= PRICE_DROP_REASON):
+        reasons.append(
+            f"Price dropped {product_feature(index, 'price_drop', row):.0%} "
+            f"(was ${product_feature(index, 'previous_price_per_oz', row):.2f}/oz)."
+        )
+
+    return reasons
+
+
+def build_recommendation(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    product_id: int,
+    score: float,
+    extra_reasons: Optional[List[str]] = None,
+) -> Recommendation:
+    """
+    Materialize one ranked product as a ``Recommendation``.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections, used for sizes and reasons.
+    product_id : int
+        Product to materialize.
+    score : float
+        Product score from the ranking stage.
+    extra_reasons : Optional[List[str]]
+        Reasons from the ranking stage, listed before the match reasons.
+
+    Returns
+    -------
+    Recommendation
+        Product details, the sizes that pass the filters and reasons.
+    """
+    cols = index.columns
+    rows = slice(int(index.product_offsets[product_id]),
+                 int(index.product_offsets[product_id + 1]))
+
+    row_scores = score_products(index, prefs, rows)
+    keep = apply_filters(index, prefs, rows)
+    row_scores[~keep] = -np.inf
+    best = rows.start + int(np.argmax(row_scores))
+    size_rows = np.arange(rows.start, rows.stop)[keep]
+
+    return Recommendation(
+        product_key=str(index.labels("product_key", best)),
+        roaster=str(index.labels("roaster", best)),
+        product_name=str(index.labels("product_name", best)),
+        origin=str(index.labels("origin", best)) or None,
+        roast_type=str(index.labels("roast_type", best)) or None,
+        decaf=bool(cols["decaf"][best]),
+        blend=bool(cols["blend"][best]),
+        single_origin=bool(cols["single_origin"][best]),
+        available_ground=bool(cols["available_ground"][best]),
+        reference_price_per_oz=float(cols["price_per_oz"][best]),
+        score=round(float(score), 4),
+        match_reasons=(extra_reasons or []) + _match_reasons(index, prefs, best),
+        available_sizes=[
+            SizeOption(
+                size=str(index.labels("size", r)),
+                size_oz=float(cols["size_oz"][r]),
+                price_numeric=float(cols["price_numeric"][r]),
+                price_per_oz=float(cols["price_per_oz"][r]),
+            )
+            for r in size_rows
+        ],
+        total_reviews=int(cols["total_reviews"][best]),
+        heart_percentage=float(cols["heart_percentage"][best]),
+        has_reviews=bool(cols["has_reviews"][best]),
+        url=str(index.labels("url", best)) or None,
+        tags=product_list(index, "tag", product_id),
+        tasting_notes=product_list(index, "note", product_id),
+    )
+
+
+def recommend(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    k: int = DEFAULT_TOP_K,
+    n_jobs: Optional[int] = None,
+    diversity_lambda: Optional[float] = None,
+    mode: str = "score",
+    user_id: Optional[str] = None,
+    variants: Optional[Sequence[ScoringVariant]] = None,
+) -> List[Recommendation]:
+    """
+    Run filters, scoring and top-k, and build the recommendations.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections and weights.
+    k : int
+        Number of recommendations.
+    n_jobs : Optional[int]
+        Worker threads for the ranking stage.
+    diversity_lambda : Optional[float]
+        If set, re-rank the top ``DIVERSITY_POOL_FACTOR * k`` products
+        with MMR (see ``coffeematch_core.diversity``) so picks from the
+        same roaster or profile are penalized. 1.0 means no penalty.
+        Ignored in 'pareto' mode.
+    mode : str
+        One of ``RANKING_MODES``.
+    user_id : Optional[str]
+        Stable user id. With experiment variants in 'score' mode, picks
+        the variant served (see ``scoring.assign_variant``).
+    variants : Optional[Sequence[ScoringVariant]]
+        Experiment arms; defaults to the scoring config's. All arms are
+        ranked in one pass (``rank_variants``).
+
+    Each call is appended to the request log when capture is enabled
+    (see ``coffeematch_core.request_log``). In an experiment the log
+    holds the served variant's preferences and every variant's top-k.
+
+    Returns
+    -------
+    List[Recommendation]
+        Best first; empty if nothing passes the filters.
+    """
+    if mode not in RANKING_MODES:
+        raise ValueError(f"Unknown ranking mode {mode!r}; expected one of {RANKING_MODES}")
+
+    logger = request_logger()
+    start = time.perf_counter()
+
+    config = load_scoring_config()
+    if variants is None:
+        variants = config.variants
+    served = None
+    variant_results = None
+
+    if mode == "pareto":
+        ranked, reasons = rank_pareto(index, prefs, k)
+    elif user_id is not None and variants:
+        served = assign_variant(user_id, variants, config.experiment_salt)
+        pool_k = k if diversity_lambda is None else DIVERSITY_POOL_FACTOR * k
+        by_variant = rank_variants(index, prefs, variants, pool_k)
+        if diversity_lambda is not None:
+            by_variant = {name: mmr_rerank(index, pool, k, diversity_lambda)
+                          for name, pool in by_variant.items()}
+        prefs = variant_preferences(prefs, served)
+        ranked = by_variant[served.name]
+        reasons = [None] * len(ranked)
+        if logger is not None:
+            keys = index.categories["product_key"]
+            variant_results = {name: [str(keys[product_id]) for _, product_id in pairs]
+                               for name, pairs in by_variant.items()}
+    elif diversity_lambda is None:
+        ranked = rank_products(index, prefs, k, n_jobs)
+        reasons = [None] * len(ranked)
+    else:
+        pool = rank_products(index, prefs, DIVERSITY_POOL_FACTOR * k, n_jobs)
+        ranked = mmr_rerank(index, pool, k, diversity_lambda)
+        reasons = [None] * len(ranked)
+
+    recommendations = [
+        build_recommendation(index, prefs, product_id, score, extra)
+        for (score, product_id), extra in zip(ranked, reasons)
+    ]
+
+    if logger is not None:
+        options = {"k": k, "mode": mode, "diversity_lambda": diversity_lambda}
+        if served is not None:
+            options["variant"] = served.name
+        log_request(
+            logger, prefs, options,
+            [rec.product_key for rec in recommendations],
+            (time.perf_counter() - start) * 1000,
+            variant_results,
+        )
+    return recommendations
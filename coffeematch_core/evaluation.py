@@ -0,0 +1,367 @@
+"""
+Offline evaluation of ranking quality against speed.
+
+A corpus of ``UserPreferences`` is replayed through two scorer
+implementations. For every request the harness records each scorer's
+latency and top-k, how much the two top-k lists agree, and the NDCG of
+each list against a review-derived relevance per product. Requests are
+split across a process pool; every worker builds its own copy of the
+catalog once, so only preferences and result rows cross process
+boundaries.
+
+Scorers share one signature, ``scorer(catalog, prefs, k)``, returning
+product keys best first, and are registered by name in ``SCORERS``.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import (
+    PRODUCTS_PATH,
+    REVIEWS_PATH,
+    CatalogIndex,
+    build_catalog_index,
+    load_catalog_index,
+    load_products,
+    load_reviews,
+    product_key_by_name,
+)
+from coffeematch_core.engine import apply_filters, rank_products, resolve_n_jobs
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+# Pseudo-reviews at the catalog-wide liked ratio added per product when
+# deriving relevance, so one glowing review is not a perfect score.
+RELEVANCE_SMOOTHING = 5.0
+
+
+@dataclass
+class EvalCatalog:
+    """
+    Everything a scorer or metric needs about one catalog.
+
+    Attributes
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products, one row per product and size.
+    index : CatalogIndex
+        Index built from products_df.
+    relevance : np.ndarray
+        Graded relevance per product id of ``index``.
+    """
+
+    products_df: pd.DataFrame
+    index: CatalogIndex
+    relevance: np.ndarray
+
+
+Scorer = Callable[[EvalCatalog, UserPreferences, int], List[str]]
+
+
+def review_relevance(
+    products_df: pd.DataFrame,
+    index: CatalogIndex,
+    reviews_df: Optional[pd.DataFrame] = None,
+) -> np.ndarray:
+    """
+    Derive a graded relevance per product from reviews.
+
+    With review rows, relevance is the smoothed share of 'liked'
+    reviews. Without them (e.g. synthetic catalogs) it falls back to
+    heart_percentage, zero for products without reviews.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products.
+    index : CatalogIndex
+        Index whose product ids the result is aligned to.
+    reviews_df : Optional[pd.DataFrame]
+        Cleaned reviews, if available.
+
+    Returns
+    -------
+    np.ndarray
+        Relevance in 0..1 per product id.
+    """
+    keys = pd.Index(index.categories["product_key"])
+    if reviews_df is None or reviews_df.empty:
+        hearts = products_df.groupby("product_key")["heart_percentage"].first()
+        return np.nan_to_num(hearts.reindex(keys).to_numpy(dtype=np.float64)) / 100.0
+
+    key_by_name = product_key_by_name(products_df)
+    liked = reviews_df["sentiment"] == "liked"
+    counts = pd.DataFrame({
+        "product_key": reviews_df["product_name"].map(key_by_name),
+        "liked": liked,
+    }).groupby("product_key")["liked"].agg(["sum", "count"]).reindex(keys, fill_value=0)
+    prior = float(liked.mean())
+    smoothed = (counts["sum"] + RELEVANCE_SMOOTHING * prior) / (counts["count"] + RELEVANCE_SMOOTHING)
+    return np.where(counts["count"] > 0, smoothed, 0.0)
+
+
+def reference_scorer(catalog: EvalCatalog, prefs: UserPreferences, k: int) -> List[str]:
+    """
+    Row-wise pandas implementation of the roast/price/popularity score.
+
+    Mirrors the original app logic: boolean filters over the frame,
+    catalog-wide value and popularity scaling, best size per product.
+    """
+    df = catalog.products_df
+    price = df["price_per_oz"]
+    spread = price.max() - price.min()
+    value = (price.max() - price) / spread if spread > 0 else pd.Series(1.0, index=df.index)
+    popularity = (df["heart_percentage"].fillna(0) / 100).clip(0, 1)
+
+    score = prefs.price_weight * value.fillna(0) + prefs.popularity_weight * popularity
+    if prefs.roast_type:
+        roast_hit = df["roast_type"].fillna("").str.contains(
+            prefs.roast_type.strip(), case=False, regex=False
+        )
+        score = score + prefs.roast_weight * roast_hit
+
+    keep = pd.Series(True, index=df.index)
+    if prefs.decaf is not None:
+        keep &= df["decaf"] == prefs.decaf
+    if prefs.ground_required:
+        keep &= df["available_ground"]
+    if prefs.single_origin_preference:
+        keep &= df["single_origin"]
+    if prefs.blend_preference:
+        keep &= df["blend"]
+    if prefs.max_price_per_oz is not None:
+        keep &= price <= prefs.max_price_per_oz
+
+    best = score[keep].groupby(df.loc[keep, "product_key"]).max().rename("score")
+    ranked = best.reset_index().sort_values(["score", "product_key"], ascending=[False, True])
+    return ranked["product_key"].head(k).tolist()
+
+
+def engine_scorer(catalog: EvalCatalog, prefs: UserPreferences, k: int) -> List[str]:
+    """Columnar engine ranking (``engine.rank_products``), single worker."""
+    keys = catalog.index.categories["product_key"]
+    return [str(keys[pid]) for _, pid in rank_products(catalog.index, prefs, k, n_jobs=1)]
+
+
+SCORERS: Dict[str, Scorer] = {
+    "reference": reference_scorer,
+    "engine": engine_scorer,
+}
+
+
+def ndcg_at_k(
+    ranked_ids: Sequence[int],
+    relevance: np.ndarray,
+    candidate_ids: np.ndarray,
+    k: int,
+) -> float:
+    """
+    Normalized discounted cumulative gain of one ranked list.
+
+    Parameters
+    ----------
+    ranked_ids : Sequence[int]
+        Product ids, best first.
+    relevance : np.ndarray
+        Relevance per product id.
+    candidate_ids : np.ndarray
+        Products that pass the filters; the ideal ranking is drawn from
+        them.
+    k : int
+        Cut-off.
+
+    Returns
+    -------
+    float
+        NDCG@k in 0..1; 1.0 when no candidate has any relevance.
+    """
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    gains = relevance[np.asarray(ranked_ids[:k], dtype=np.int64)]
+    dcg = float(np.sum(gains * discounts[:len(gains)]))
+    ideal = np.sort(relevance[candidate_ids])[::-1][:k]
+    idcg = float(np.sum(ideal * discounts[:len(ideal)]))
+    return dcg / idcg if idcg > 0 else 1.0
+
+
+def evaluate_request(
+    catalog: EvalCatalog,
+    prefs: UserPreferences,
+    scorers: Sequence[str],
+    k: int,
+) -> Dict[str, float]:
+    """
+    Run one request through two scorers and measure both.
+
+    Parameters
+    ----------
+    catalog : EvalCatalog
+        Catalog to rank.
+    prefs : UserPreferences
+        Request to replay.
+    scorers : Sequence[str]
+        Names of the baseline and candidate scorers in ``SCORERS``.
+    k : int
+        Top-k size.
+
+    Returns
+    -------
+    Dict[str, float]
+        One report row: per-scorer latency and NDCG, overlap@k and
+        whether the two lists are identical.
+    """
+    keys = catalog.index.categories["product_key"]
+    kept_rows = apply_filters(catalog.index, prefs)
+    candidate_ids = np.unique(catalog.index.columns["product_key"][kept_rows])
+
+    row: Dict[str, float] = {}
+    top = {}
+    for name in scorers:
+        start = time.perf_counter()
+        top[name] = SCORERS[name](catalog, prefs, k)
+        row[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+        ids = np.searchsorted(keys, np.asarray(top[name], dtype=object))
+        row[f"{name}_ndcg"] = ndcg_at_k(ids, catalog.relevance, candidate_ids, k)
+
+    baseline, candidate = (top[name] for name in scorers)
+    expected = min(k, len(candidate_ids))
+    row["overlap_at_k"] = len(set(baseline) & set(candidate)) / expected if expected else 1.0
+    row["identical"] = float(baseline == candidate)
+    return row
+
+
+def load_eval_catalog(synthetic_rows: Optional[int] = None, seed: int = 0) -> EvalCatalog:
+    """
+    Build the catalog to evaluate on.
+
+    Parameters
+    ----------
+    synthetic_rows : Optional[int]
+        If set, use a synthetic catalog of this many rows; otherwise the
+        processed CSVs.
+    seed : int
+        Seed of the synthetic catalog.
+
+    Returns
+    -------
+    EvalCatalog
+        Products, index and relevance.
+    """
+    if synthetic_rows:
+        products_df = make_synthetic_products(synthetic_rows, seed)
+        index = build_catalog_index(products_df)
+        return EvalCatalog(products_df, index, review_relevance(products_df, index))
+
+    products_df = load_products(PRODUCTS_PATH)
+    index = load_catalog_index(PRODUCTS_PATH)
+    reviews_df = load_reviews(REVIEWS_PATH) if Path(REVIEWS_PATH).exists() else None
+    return EvalCatalog(products_df, index, review_relevance(products_df, index, reviews_df))
+
+
+# Per-process catalog, built once by the pool initializer.
+_WORKER_CATALOG: Optional[EvalCatalog] = None
+
+
+def _init_worker(synthetic_rows: Optional[int], seed: int) -> None:
+    """Build this worker's catalog."""
+    global _WORKER_CATALOG
+    _WORKER_CATALOG = load_eval_catalog(synthetic_rows, seed)
+
+
+def _evaluate_chunk(
+    prefs_chunk: List[UserPreferences],
+    scorers: Sequence[str],
+    k: int,
+) -> List[Dict[str, float]]:
+    """Evaluate a slice of the corpus in a worker."""
+    return [evaluate_request(_WORKER_CATALOG, prefs, scorers, k) for prefs in prefs_chunk]
+
+
+def evaluate_corpus(
+    corpus: Sequence[UserPreferences],
+    scorers: Sequence[str] = ("reference", "engine"),
+    k: int = 5,
+    synthetic_rows: Optional[int] = None,
+    seed: int = 0,
+    n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Replay a corpus through two scorers, in parallel across processes.
+
+    Parameters
+    ----------
+    corpus : Sequence[UserPreferences]
+        Requests to replay.
+    scorers : Sequence[str]
+        Baseline and candidate scorer names in ``SCORERS``.
+    k : int
+        Top-k size.
+    synthetic_rows : Optional[int]
+        Synthetic catalog size, or None for the processed CSVs.
+    seed : int
+        Seed of the synthetic catalog.
+    n_jobs : Optional[int]
+        Worker processes; see ``engine.resolve_n_jobs``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per request, with the preferences and the metrics.
+    """
+    if len(scorers) != 2 or any(name not in SCORERS for name in scorers):
+        raise ValueError(f"Expected two scorers from {sorted(SCORERS)}, got {list(scorers)}")
+
+    corpus = list(corpus)
+    n_workers = min(resolve_n_jobs(n_jobs), max(1, len(corpus)))
+    # A few chunks per worker keeps the pool busy when requests vary in cost.
+    chunk_size = max(1, -(-len(corpus) // (n_workers * 4)))
+    chunks = [corpus[i:i + chunk_size] for i in range(0, len(corpus), chunk_size)]
+
+    if n_workers == 1:
+        _init_worker(synthetic_rows, seed)
+        results = [_evaluate_chunk(chunk, scorers, k) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker,
+                                 initargs=(synthetic_rows, seed)) as pool:
+            results = list(pool.map(_evaluate_chunk, chunks,
+                                    [scorers] * len(chunks), [k] * len(chunks)))
+
+    metrics = pd.DataFrame([row for chunk in results for row in chunk])
+    prefs_df = pd.DataFrame([asdict(prefs) for prefs in corpus])
+    return pd.concat([prefs_df, metrics], axis=1)
+
+
+def summarize(report: pd.DataFrame, scorers: Sequence[str] = ("reference", "engine")) -> pd.DataFrame:
+    """
+    Aggregate a per-request report into a side-by-side summary.
+
+    Parameters
+    ----------
+    report : pd.DataFrame
+        Output of ``evaluate_corpus``.
+    scorers : Sequence[str]
+        Scorer names used for the report.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per scorer: median and p95 latency, mean NDCG, and the
+        shared agreement metrics.
+    """
+    rows = []
+    for name in scorers:
+        rows.append({
+            "scorer": name,
+            "median_ms": report[f"{name}_ms"].median(),
+            "p95_ms": report[f"{name}_ms"].quantile(0.95),
+            "mean_ndcg": report[f"{name}_ndcg"].mean(),
+            "mean_overlap_at_k": report["overlap_at_k"].mean(),
+            "identical_share": report["identical"].mean(),
+        })
+    return pd.DataFrame(rows).set_index("scorer")
@@ -0,0 +1,272 @@
+"""
+Offline geocoding of cafe addresses and a grid index for "where can I
+buy this near me" queries.
+
+Cafe addresses come from address.py (data/raw/address_out.csv). They are
+geocoded against a local gazetteer CSV, never a network service: an exact
+address match is used when the gazetteer has one, otherwise the city
+centroid. The resulting points are bucketed into a fixed lat/lon grid
+and sorted by (roaster, cell), so a radius query only touches the
+handful of cells of one roaster that overlap the search circle.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.schemas import PurchaseLocation
+
+
+GAZETTEER_PATH = Path("data/raw/wa_gazetteer.csv")
+CAFES_PATH = Path("data/processed/cafes_geocoded.csv")
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Grid cell edge in degrees (~5.5 km north-south).
+CELL_DEGREES = 0.05
+_LON_CELLS = 1 << 16
+_CELLS_PER_ROASTER = 1 << 32
+
+
+def _normalize(text: pd.Series) -> pd.Series:
+    """Uppercase and collapse whitespace for gazetteer matching."""
+    return (
+        text.fillna("").astype(str).str.upper()
+        .str.replace(r"\s+", " ", regex=True).str.strip()
+    )
+
+
+def load_gazetteer(path: Path = GAZETTEER_PATH) -> pd.DataFrame:
+    """
+    Load the local gazetteer.
+
+    Rows with an empty address are city centroids; rows with an address
+    are exact street-level points.
+
+    Parameters
+    ----------
+    path : Path
+        CSV with address, city, lat and lon columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Gazetteer with normalized address/city keys.
+    """
+    gazetteer = pd.read_csv(path)
+    gazetteer["address"] = _normalize(gazetteer["address"])
+    gazetteer["city"] = _normalize(gazetteer["city"])
+    return gazetteer
+
+
+def geocode_cafes(addresses_df: pd.DataFrame, gazetteer: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attach coordinates to the cafe addresses produced by address.py.
+
+    Parameters
+    ----------
+    addresses_df : pd.DataFrame
+        address_out.csv rows: roaster 'name', cafe_name, cafe_address,
+        cafe_city.
+    gazetteer : pd.DataFrame
+        Output of ``load_gazetteer``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per located cafe with roaster, cafe_name, cafe_address,
+        cafe_city, lat, lon and geo_precision ('address' or 'city').
+        Cafes that cannot be located are dropped.
+    """
+    cafes = pd.DataFrame({
+        "roaster": addresses_df["name"].astype(str).str.strip(),
+        "cafe_name": addresses_df["cafe_name"],
+        "cafe_address": addresses_df["cafe_address"].fillna("").astype(str).str.strip(),
+        "cafe_city": addresses_df["cafe_city"].fillna("").astype(str).str.strip(),
+    })
+    address_key = _normalize(cafes["cafe_address"])
+    city_key = _normalize(cafes["cafe_city"])
+
+    streets = gazetteer[gazetteer["address"] != ""].set_index(["address", "city"])
+    centroids = gazetteer[gazetteer["address"] == ""].set_index("city")
+
+    street_hit = pd.MultiIndex.from_arrays([address_key, city_key])
+    street_lat = streets["lat"].reindex(street_hit).to_numpy()
+    street_lon = streets["lon"].reindex(street_hit).to_numpy()
+    city_lat = centroids["lat"].reindex(city_key).to_numpy()
+    city_lon = centroids["lon"].reindex(city_key).to_numpy()
+
+    has_street = ~np.isnan(street_lat)
+    cafes["lat"] = np.where(has_street, street_lat, city_lat)
+    cafes["lon"] = np.where(has_street, street_lon, city_lon)
+    cafes["geo_precision"] = np.where(has_street, "address", "city")
+
+    return cafes[cafes["lat"].notna()].reset_index(drop=True)
+
+
+@dataclass
+class CafeIndex:
+    """
+    Grid index over cafe points, sorted by (roaster, grid cell).
+
+    Attributes
+    ----------
+    keys : np.ndarray
+        Sorted int64 key per cafe: roaster code, grid row and grid column.
+    lat, lon : np.ndarray
+        Cafe coordinates in degrees, aligned with ``keys``.
+    roasters : np.ndarray
+        Roaster labels, sorted; a cafe's roaster code indexes this.
+    cafe_name, address, city, geo_precision : np.ndarray
+        Cafe details, aligned with ``keys``.
+    """
+
+    keys: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    roasters: np.ndarray
+    cafe_name: np.ndarray
+    address: np.ndarray
+    city: np.ndarray
+    geo_precision: np.ndarray
+
+
+def _cell(lat: np.ndarray, lon: np.ndarray):
+    """Grid row and column for coordinates."""
+    row = np.floor((np.asarray(lat) + 90.0) / CELL_DEGREES).astype(np.int64)
+    col = np.floor((np.asarray(lon) + 180.0) / CELL_DEGREES).astype(np.int64)
+    return row, col
+
+
+def build_cafe_index(cafes_df: pd.DataFrame) -> CafeIndex:
+    """
+    Build the grid index from geocoded cafes.
+
+    Parameters
+    ----------
+    cafes_df : pd.DataFrame
+        Output of ``geocode_cafes``.
+
+    Returns
+    -------
+    CafeIndex
+        Index ready for ``nearby``.
+    """
+    codes, roasters = pd.factorize(cafes_df["roaster"], sort=True)
+    row, col = _cell(cafes_df["lat"].to_numpy(), cafes_df["lon"].to_numpy())
+    keys = codes.astype(np.int64) * _CELLS_PER_ROASTER + row * _LON_CELLS + col
+    order = np.argsort(keys, kind="stable")
+
+    def column(name: str) -> np.ndarray:
+        return cafes_df[name].fillna("").astype(str).to_numpy(dtype=object)[order]
+
+    return CafeIndex(
+        keys=keys[order],
+        lat=cafes_df["lat"].to_numpy(dtype=np.float64)[order],
+        lon=cafes_df["lon"].to_numpy(dtype=np.float64)[order],
+        roasters=np.asarray(roasters, dtype=object),
+        cafe_name=column("cafe_name"),
+        address=column("cafe_address"),
+        city=column("cafe_city"),
+        geo_precision=column("geo_precision"),
+    )
+
+
+def load_cafe_index(path: Path = CAFES_PATH) -> CafeIndex:
+    """
+    Load cafes_geocoded.csv and build its index.
+
+    Parameters
+    ----------
+    path : Path
+        Output of the geocoding step in scripts/prepare_data.py.
+
+    Returns
+    -------
+    CafeIndex
+        Index ready for ``nearby``.
+    """
+    return build_cafe_index(pd.read_csv(path))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in kilometres (vectorized).
+
+    Returns
+    -------
+    np.ndarray
+        Distances between each pair of points.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def nearby(
+    index: CafeIndex,
+    product_key: str,
+    lat: float,
+    lon: float,
+    radius_km: float = 10.0,
+) -> List[PurchaseLocation]:
+    """
+    Find cafes selling a product's roaster within a radius.
+
+    Parameters
+    ----------
+    index : CafeIndex
+        Cafe grid index.
+    product_key : str
+        'roaster | product_name' key of the product.
+    lat, lon : float
+        Search centre in degrees.
+    radius_km : float
+        Search radius in kilometres.
+
+    Returns
+    -------
+    List[PurchaseLocation]
+        Matching cafes, nearest first.
+    """
+    roaster = product_key.split(" | ", 1)[0].strip()
+    code = np.searchsorted(index.roasters, roaster)
+    if code >= len(index.roasters) or index.roasters[code] != roaster:
+        return []
+
+    lat_span = radius_km / KM_PER_DEGREE_LAT
+    lon_span = radius_km / (KM_PER_DEGREE_LAT * max(np.cos(np.radians(lat)), 1e-6))
+    row_lo, col_lo = _cell(lat - lat_span, lon - lon_span)
+    row_hi, col_hi = _cell(lat + lat_span, lon + lon_span)
+
+    # Within a roaster, each grid row is one contiguous run of sorted keys.
+    rows = code * _CELLS_PER_ROASTER + np.arange(row_lo, row_hi + 1) * _LON_CELLS
+    starts = np.searchsorted(index.keys, rows + col_lo, side="left")
+    stops = np.searchsorted(index.keys, rows + col_hi, side="right")
+    lengths = stops - starts
+    candidates = (np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                  + np.arange(lengths.sum()))
+
+    distances = haversine_km(lat, lon, index.lat[candidates], index.lon[candidates])
+    within = distances <= radius_km
+    candidates, distances = candidates[within], distances[within]
+    order = np.argsort(distances, kind="stable")
+
+    return [
+        PurchaseLocation(
+            roaster=roaster,
+            cafe_name=index.cafe_name[i],
+            address=index.address[i],
+            city=index.city[i],
+            lat=float(index.lat[i]),
+            lon=float(index.lon[i]),
+            distance_km=round(float(d), 3),
+            geo_precision=index.geo_precision[i],
+        )
+        for i, d in zip(candidates[order], distances[order])
+    ]
@@ -0,0 +1,342 @@
+"""
+Memory accounting for the prep pipeline and the apps.
+
+Enabled with ``--profile-memory`` on ``scripts/prepare_data.py``,
+``streamlit run streamlit_poc.py -- --profile-memory`` or
+``python old_versions/app_dash.py --profile-memory``. It reports:
+
+- per-structure sizes: DataFrames with ``memory_usage(deep=True)``,
+  catalog index arrays by group, and any other object (caches, session
+  state) by a recursive ``sys.getsizeof`` walk;
+- per-stage ``tracemalloc`` deltas, peaks and top allocating lines;
+- for string columns, bytes as stored versus as pandas categoricals,
+  to help set per-worker memory budgets.
+"""
+
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import CatalogIndex
+
+
+PROFILE_MEMORY_FLAG = "--profile-memory"
+
+# Allocating source lines listed per stage.
+TOP_ALLOCATORS = 5
+
+MB = 1024 * 1024
+
+# Snapshots themselves allocate; keep tracemalloc and import machinery
+# out of the allocator lists.
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def profile_memory_requested(argv: Optional[Sequence[str]] = None) -> bool:
+    """
+    Check the command line for ``--profile-memory``.
+
+    Parameters
+    ----------
+    argv : Optional[Sequence[str]]
+        Arguments to search; defaults to ``sys.argv``.
+
+    Returns
+    -------
+    bool
+        Whether memory profiling was requested.
+    """
+    return PROFILE_MEMORY_FLAG in (sys.argv if argv is None else argv)
+
+
+def deep_sizeof(obj: object, _seen: Optional[set] = None) -> int:
+    """
+    Approximate the memory held by an object and everything it references.
+
+    NumPy arrays count their buffer, DataFrames their deep memory usage;
+    containers and dataclasses are walked. Shared objects count once.
+
+    Parameters
+    ----------
+    obj : object
+        Object to measure.
+
+    Returns
+    -------
+    int
+        Size in bytes.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes if obj.base is None else 0
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return sys.getsizeof(obj) + size
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def frame_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deep memory per column of a DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to measure.
+
+    Returns
+    -------
+    pd.DataFrame
+        column, dtype and bytes, largest first.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({
+        "column": usage.index,
+        "dtype": [str(df[col].dtype) for col in usage.index],
+        "bytes": usage.to_numpy(),
+    }).sort_values("bytes", ascending=False, ignore_index=True)
+
+
+def index_memory(index: CatalogIndex) -> pd.DataFrame:
+    """
+    Memory per array of a catalog index.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to measure.
+
+    Returns
+    -------
+    pd.DataFrame
+        group, name, dtype and bytes, largest first.
+    """
+    groups = {
+        "columns": index.columns,
+        "categories": index.categories,
+        "product_columns": index.product_columns,
+        "list_offsets": index.list_offsets,
+        "list_codes": index.list_codes,
+        "filter_stats": index.filter_stats,
+        "offsets": {"product_offsets": index.product_offsets},
+    }
+    rows = [
+        {"group": group, "name": name, "dtype": str(arr.dtype), "bytes": deep_sizeof(arr)}
+        for group, arrays in groups.items()
+        for name, arr in arrays.items()
+    ]
+    return pd.DataFrame(rows).sort_values("bytes", ascending=False, ignore_index=True)
+
+
+def structure_sizes(structures: Dict[str, object]) -> pd.DataFrame:
+    """
+    Size of each named structure.
+
+    Parameters
+    ----------
+    structures : Dict[str, object]
+        Name -> DataFrame, index, array, cache or any other object.
+
+    Returns
+    -------
+    pd.DataFrame
+        structure, type and MB, largest first.
+    """
+    rows = []
+    for name, obj in structures.items():
+        if isinstance(obj, CatalogIndex):
+            size = int(index_memory(obj)["bytes"].sum())
+        else:
+            size = deep_sizeof(obj)
+        rows.append({"structure": name, "type": type(obj).__name__, "MB": size / MB})
+    return pd.DataFrame(rows).sort_values("MB", ascending=False, ignore_index=True)
+
+
+def categorical_comparison(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Compare string columns as stored against the same data as categoricals.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to analyse.
+    columns : Optional[List[str]]
+        Columns to compare; defaults to every object/string column.
+
+    Returns
+    -------
+    pd.DataFrame
+        column, distinct values, bytes before and after, and the ratio.
+    """
+    if columns is None:
+        columns = [c for c in df.columns
+                   if df[c].dtype == object or pd.api.types.is_string_dtype(df[c])]
+    rows = []
+    for col in columns:
+        before = int(df[col].memory_usage(deep=True, index=False))
+        after = int(df[col].astype("category").memory_usage(deep=True, index=False))
+        rows.append({
+            "column": col,
+            "distinct": int(df[col].nunique(dropna=True)),
+            "bytes_before": before,
+            "bytes_categorical": after,
+            "ratio": before / after if after else np.nan,
+        })
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    total = table[["bytes_before", "bytes_categorical"]].sum()
+    table.loc[len(table)] = {
+        "column": "TOTAL", "distinct": np.nan,
+        "bytes_before": total["bytes_before"],
+        "bytes_categorical": total["bytes_categorical"],
+        "ratio": total["bytes_before"] / total["bytes_categorical"],
+    }
+    return table
+
+
+@dataclass
+class StageStats:
+    """
+    tracemalloc measurements of one pipeline stage.
+
+    Attributes
+    ----------
+    name : str
+        Stage label.
+    allocated_mb : float
+        Net traced memory change over the stage.
+    peak_mb : float
+        Peak traced memory reached during the stage.
+    top_allocators : List[str]
+        Largest net allocations by source line.
+    """
+
+    name: str
+    allocated_mb: float
+    peak_mb: float
+    top_allocators: List[str] = field(default_factory=list)
+
+
+class MemoryProfiler:
+    """
+    Per-stage tracemalloc accounting; a no-op when disabled.
+
+    Parameters
+    ----------
+    enabled : bool
+        Whether to trace. Tracing slows Python allocations, so it is off
+        unless ``--profile-memory`` is given.
+    top : int
+        Allocating lines listed per stage.
+    """
+
+    def __init__(self, enabled: bool = False, top: int = TOP_ALLOCATORS):
+        self.enabled = enabled
+        self.top = top
+        self.stages: List[StageStats] = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measure the enclosed block as one stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage label in the report.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            diff = after.compare_to(before, "lineno")
+            self.stages.append(StageStats(
+                name=name,
+                allocated_mb=(current - start) / MB,
+                peak_mb=peak / MB,
+                top_allocators=[str(stat) for stat in diff[:self.top]],
+            ))
+
+    def stage_table(self) -> pd.DataFrame:
+        """
+        Stage measurements as a table.
+
+        Returns
+        -------
+        pd.DataFrame
+            stage, allocated_mb and peak_mb in run order.
+        """
+        return pd.DataFrame(
+            [{"stage": s.name, "allocated_mb": s.allocated_mb, "peak_mb": s.peak_mb}
+             for s in self.stages]
+        )
+
+    def report(
+        self,
+        structures: Optional[Dict[str, object]] = None,
+        frames: Optional[Dict[str, pd.DataFrame]] = None,
+    ) -> str:
+        """
+        Render the full memory report.
+
+        Parameters
+        ----------
+        structures : Optional[Dict[str, object]]
+            Structures to size (see ``structure_sizes``).
+        frames : Optional[Dict[str, pd.DataFrame]]
+            Frames to include in the categorical comparison.
+
+        Returns
+        -------
+        str
+            Plain-text report.
+        """
+        parts = ["== Memory profile =="]
+        if structures:
+            parts += ["", "-- Structures --",
+                      structure_sizes(structures).round(3).to_string(index=False)]
+        if self.stages:
+            parts += ["", "-- Stages (tracemalloc) --",
+                      self.stage_table().round(3).to_string(index=False)]
+            for stats in self.stages:
+                parts += ["", f"Top allocators: {stats.name}"]
+                parts += [f"  {line}" for line in stats.top_allocators]
+        for name, df in (frames or {}).items():
+            parts += ["", f"-- {name}: strings vs categoricals --",
+                      categorical_comparison(df).round(2).to_string(index=False)]
+        return "\n".join(parts)
@@ -0,0 +1,152 @@
+"""
+Pareto-front ("best value") selection over price, rating and review count.
+
+A product is on the frontier when no other candidate is at least as
+cheap, at least as well rated and at least as reviewed, and strictly
+better on one of the three. Products are compared on the price_per_oz
+of their cheapest size that passes the filters.
+
+The skyline runs in O(n log n): products are first collapsed to the
+cheapest product per distinct (hearts, reviews) pair, the pairs are
+swept in increasing price order, and a Fenwick tree over hearts ranks
+holding the most reviews seen at or above each hearts level answers
+each dominance test in O(log n).
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from coffeematch_core.catalog import CatalogIndex
+
+
+def product_objectives(
+    index: CatalogIndex,
+    row_mask: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collect the three objectives for products with at least one kept row.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    row_mask : np.ndarray
+        Boolean mask over all rows, True for rows that pass the filters.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        Product ids, best price_per_oz, heart_percentage (0 when there
+        are no reviews) and total_reviews.
+    """
+    cols = index.columns
+    prices = np.where(row_mask, cols["price_per_oz"], np.inf)
+    best_price = np.minimum.reduceat(prices, index.product_offsets[:-1])
+    product_ids = np.flatnonzero(np.isfinite(best_price))
+
+    first_rows = index.product_offsets[product_ids]
+    hearts = np.nan_to_num(cols["heart_percentage"][first_rows])
+    reviews = np.nan_to_num(cols["total_reviews"][first_rows])
+    return product_ids, best_price[product_ids], hearts, reviews
+
+
+def skyline(price: np.ndarray, hearts: np.ndarray, reviews: np.ndarray) -> np.ndarray:
+    """
+    Find the Pareto frontier minimizing price and maximizing the others.
+
+    Products with identical objectives are either all on the frontier or
+    all off it.
+
+    Parameters
+    ----------
+    price : np.ndarray
+        Price per ounce, lower is better.
+    hearts : np.ndarray
+        Heart percentage, higher is better.
+    reviews : np.ndarray
+        Review count, higher is better.
+
+    Returns
+    -------
+    np.ndarray
+        Positions of the frontier products, in increasing price order.
+    """
+    if len(price) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Cheapest product per distinct (hearts, reviews) pair; only these
+    # can be on the frontier.
+    order = np.lexsort((price, reviews, hearts))
+    pair_start = np.ones(len(order), dtype=bool)
+    pair_start[1:] = (np.diff(hearts[order]) != 0) | (np.diff(reviews[order]) != 0)
+    pair_id = np.cumsum(pair_start) - 1
+    first = order[pair_start]
+    pair_price, pair_hearts, pair_reviews = price[first], hearts[first], reviews[first]
+
+    # Hearts ranks, best first, so "hearts >= h" is a prefix of ranks;
+    # tree holds prefix maxima of reviews over the pairs swept so far.
+    levels = np.unique(pair_hearts)
+    ranks = (len(levels) - np.searchsorted(levels, pair_hearts)).tolist()
+    size = len(levels) + 1
+    tree = [-np.inf] * size
+    front: List[int] = []
+
+    reviews_list = pair_reviews.tolist()
+    for p in np.lexsort((-pair_reviews, -pair_hearts, pair_price)).tolist():
+        r = reviews_list[p]
+        i = ranks[p]
+        while i and tree[i] < r:
+            i &= i - 1
+        if i:
+            continue  # a cheaper-or-equal pair has hearts >= h and reviews >= r
+        front.append(p)
+        i = ranks[p]
+        while i < size:
+            if tree[i] < r:
+                tree[i] = r
+            i += i & -i
+
+    on_front = np.zeros(len(first), dtype=bool)
+    on_front[front] = True
+    members = order[on_front[pair_id] & (price[order] == pair_price[pair_id])]
+    return members[np.argsort(price[members], kind="stable")]
+
+
+def dominance_reasons(
+    price: np.ndarray,
+    hearts: np.ndarray,
+    reviews: np.ndarray,
+    frontier: np.ndarray,
+) -> List[List[str]]:
+    """
+    Explain, for each frontier product, which dimension it wins on.
+
+    Parameters
+    ----------
+    price, hearts, reviews : np.ndarray
+        Objectives of all candidates.
+    frontier : np.ndarray
+        Output of ``skyline``.
+
+    Returns
+    -------
+    List[List[str]]
+        One list of reasons per frontier product.
+    """
+    reasons = []
+    for i in frontier:
+        lines = []
+        if price[i] == price.min():
+            lines.append(f"Best value: lowest price of all matches (${price[i]:.2f}/oz).")
+        if hearts[i] == hearts.max():
+            lines.append(f"Best value: highest rated of all matches ({hearts[i]:.0f}% hearts).")
+        if reviews[i] == reviews.max():
+            lines.append(f"Best value: most reviewed of all matches ({int(reviews[i])} reviews).")
+        if not lines:
+            lines.append(
+                f"Best value: no cheaper match has as many hearts ({hearts[i]:.0f}%) "
+                f"and reviews ({int(reviews[i])}) at ${price[i]:.2f}/oz."
+            )
+        reasons.append(lines)
+    return reasons
@@ -0,0 +1,217 @@
+"""
+Query planner for the hard filters.
+
+Each active filter of a request becomes a predicate. Exact match counts
+come from the statistics built with the index (sorted row lists per
+flag value, rows sorted by price, rows per roast; see
+``catalog.build_filter_stats``), so predicates run most selective first.
+
+The first predicate produces the candidate rows: an index lookup (a
+slice of a precomputed row list) when it is selective, a column scan
+otherwise. A plan is built once per request and shared by its shards,
+so a row list derived per request (the rows under a price cap) is
+computed at most once. Every later predicate is tested only on the surviving
+candidates, and evaluation stops as soon as none remain, so filtering
+cost follows the size of the result rather than the catalog.
+"""
+
+from dataclasses import dataclass
+from functools import cache
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from coffeematch_core.catalog import CatalogIndex
+from coffeematch_core.schemas import UserPreferences
+
+
+# Candidates come from a row list when the most selective predicate
+# keeps at most this share of the catalog; above it a scan is cheaper.
+INDEX_LOOKUP_FRACTION = 0.25
+
+
+@dataclass
+class Predicate:
+    """
+    One hard filter of a request.
+
+    Attributes
+    ----------
+    name : str
+        Readable form, e.g. 'decaf=True' or 'price_per_oz<=1.5'.
+    column : str
+        Row column the predicate tests.
+    count : int
+        Matching rows in the whole catalog.
+    test : Callable[[np.ndarray], np.ndarray]
+        Column values -> boolean mask.
+    rows : Callable[[], np.ndarray]
+        Sorted matching rows, from the precomputed statistics; computed
+        on the first call and reused after that.
+    """
+
+    name: str
+    column: str
+    count: int
+    test: Callable[[np.ndarray], np.ndarray]
+    rows: Callable[[], np.ndarray]
+
+
+def _flag_predicate(index: CatalogIndex, column: str, value: bool) -> Predicate:
+    """Predicate ``column == value`` on a boolean column."""
+    name = f"{column}={value}"
+    matching = index.filter_stats.get(name)
+    if matching is None:
+        matching = np.flatnonzero(index.columns[column] == value)
+    return Predicate(
+        name=name,
+        column=column,
+        count=len(matching),
+        test=lambda values: values == value,
+        rows=lambda: matching,
+    )
+
+
+def _price_cap_predicate(index: CatalogIndex, cap: float) -> Predicate:
+    """Predicate ``price_per_oz <= cap``."""
+    order = index.filter_stats.get("price_per_oz:order")
+    prices = index.filter_stats.get("price_per_oz:sorted")
+    if order is None or prices is None:
+        order = np.argsort(index.columns["price_per_oz"], kind="stable")
+        prices = index.columns["price_per_oz"][order]
+    count = int(np.searchsorted(prices, cap, side="right"))
+    return Predicate(
+        name=f"price_per_oz<={cap}",
+        column="price_per_oz",
+        count=count,
+        test=lambda values: values <= cap,
+        rows=cache(lambda: np.sort(order[:count])),
+    )
+
+
+def roast_matches(index: CatalogIndex, roast_type: Optional[str]) -> np.ndarray:
+    """
+    Flag which roast_type categories match the requested roast.
+
+    Matching is a case-insensitive substring test, so 'Light' matches
+    both 'Light Roast' and 'Light-Medium Roast'. Only the category labels
+    are compared; rows are resolved through their codes.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    roast_type : Optional[str]
+        Requested roast, or None for no preference.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array with one entry per roast_type category.
+    """
+    labels = index.categories["roast_type"]
+    if not roast_type:
+        return np.zeros(len(labels), dtype=bool)
+    needle = roast_type.strip().lower()
+    return np.array([needle in str(label).lower() for label in labels],
+                    dtype=bool)
+
+
+def _roast_predicate(index: CatalogIndex, roast_type: str) -> Predicate:
+    """Predicate ``roast_type`` matches the requested roast."""
+    matches = roast_matches(index, roast_type)
+    counts = index.filter_stats.get("roast_type:counts")
+    if counts is None:
+        counts = np.bincount(index.columns["roast_type"], minlength=len(matches))
+    return Predicate(
+        name=f"roast_type~{roast_type}",
+        column="roast_type",
+        count=int(counts[matches[:len(counts)]].sum()),
+        test=lambda values: matches[values],
+        rows=cache(lambda: np.flatnonzero(matches[index.columns["roast_type"]])),
+    )
+
+
+def plan_filters(index: CatalogIndex, prefs: UserPreferences) -> List[Predicate]:
+    """
+    List the request's hard filters, most selective first.
+
+    Decaf must match exactly when set; ground availability, single
+    origin and blend are required only when the preference is True; the
+    roast must match only when roast_required is set; the price cap
+    applies per size.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections.
+
+    Returns
+    -------
+    List[Predicate]
+        Active predicates ordered by match count.
+    """
+    plan = []
+    if prefs.decaf is not None:
+        plan.append(_flag_predicate(index, "decaf", bool(prefs.decaf)))
+    if prefs.ground_required:
+        plan.append(_flag_predicate(index, "available_ground", True))
+    if prefs.single_origin_preference:
+        plan.append(_flag_predicate(index, "single_origin", True))
+    if prefs.blend_preference:
+        plan.append(_flag_predicate(index, "blend", True))
+    if prefs.roast_required and prefs.roast_type:
+        plan.append(_roast_predicate(index, prefs.roast_type))
+    if prefs.max_price_per_oz is not None:
+        plan.append(_price_cap_predicate(index, prefs.max_price_per_oz))
+    return sorted(plan, key=lambda predicate: predicate.count)
+
+
+def filter_rows(
+    index: CatalogIndex,
+    prefs: UserPreferences,
+    rows: slice = slice(None),
+    plan: Optional[List[Predicate]] = None,
+) -> np.ndarray:
+    """
+    Rows in a range that pass every hard filter.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    prefs : UserPreferences
+        User selections.
+    rows : slice
+        Contiguous row range to evaluate.
+    plan : Optional[List[Predicate]]
+        ``plan_filters(index, prefs)``, when the caller filters several
+        ranges of one request; planned here if None.
+
+    Returns
+    -------
+    np.ndarray
+        Sorted absolute row positions.
+    """
+    start, stop, _ = rows.indices(index.n_rows)
+    if plan is None:
+        plan = plan_filters(index, prefs)
+    if not plan:
+        return np.arange(start, stop)
+
+    first = plan[0]
+    if first.count == 0:
+        return np.empty(0, dtype=np.int64)
+    if first.count <= INDEX_LOOKUP_FRACTION * index.n_rows:
+        matching = first.rows()
+        candidates = matching[np.searchsorted(matching, start):np.searchsorted(matching, stop)]
+    else:
+        candidates = start + np.flatnonzero(first.test(index.columns[first.column][start:stop]))
+
+    for predicate in plan[1:]:
+        if len(candidates) == 0:
+            break
+        candidates = candidates[predicate.test(index.columns[predicate.column][candidates])]
+    return candidates
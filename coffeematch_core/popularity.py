@@ -0,0 +1,271 @@
+"""
+Time-decayed popularity computed incrementally from review dates.
+
+Each product keeps two exponentially-decayed counters, liked reviews and
+all reviews, valid as of a reference date. Folding in a new batch decays
+the counters to the batch's date (one multiply per product) and adds
+each new review with weight ``exp(-lambda * age)``, so an update costs
+O(products + new reviews) and never rescans the review history.
+
+The cleaned reviews are append-only, so the state records how many rows
+it has folded in and the hash of the last one; an update reads only the
+rows after that offset. If the last folded row no longer matches (the
+history was rewritten rather than appended to), the counters are rebuilt
+from scratch. Reviews of products not yet in the catalog are kept
+pending and folded in once the product appears.
+
+The counters are turned into a normalized 0..1 'trend_score' per product
+that the ranker reads as a precomputed feature.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import PROCESSED_DIR, product_key_by_name
+from coffeematch_core.sentiment import review_hashes
+
+
+POPULARITY_STATE_PATH = PROCESSED_DIR / "popularity_state.npz"
+PRODUCT_POPULARITY_PATH = PROCESSED_DIR / "product_popularity.csv"
+
+HALF_LIFE_DAYS = 180.0
+DECAY_PER_DAY = np.log(2.0) / HALF_LIFE_DAYS
+
+# Decayed liked reviews at which trend_score reaches 0.5.
+TREND_SATURATION = 2.0
+
+REVIEW_DATE_FORMAT = "%m/%d/%Y"
+
+
+@dataclass
+class PopularityState:
+    """
+    Decayed review counters per product.
+
+    Attributes
+    ----------
+    product_keys : np.ndarray
+        Sorted product keys the counters belong to.
+    liked : np.ndarray
+        Decayed count of 'liked' reviews per product.
+    total : np.ndarray
+        Decayed count of all reviews per product.
+    as_of : float
+        Reference date of the counters, in days since the Unix epoch.
+    n_reviews : int
+        Number of leading review rows already read.
+    last_hash : int
+        Hash of review row ``n_reviews - 1``, used to detect a rewritten
+        history (0 when no rows were read).
+    pending_names : np.ndarray
+        product_name of read reviews whose product is not in the catalog.
+    pending_days : np.ndarray
+        Their dates, in days since the Unix epoch.
+    pending_liked : np.ndarray
+        Whether each pending review is 'liked'.
+    """
+
+    product_keys: np.ndarray
+    liked: np.ndarray
+    total: np.ndarray
+    as_of: float
+    n_reviews: int
+    last_hash: int
+    pending_names: np.ndarray
+    pending_days: np.ndarray
+    pending_liked: np.ndarray
+
+
+def empty_state() -> PopularityState:
+    """
+    Create a state with no products and no reviews.
+
+    Returns
+    -------
+    PopularityState
+        Empty counters.
+    """
+    return PopularityState(
+        product_keys=np.empty(0, dtype=object),
+        liked=np.empty(0),
+        total=np.empty(0),
+        as_of=0.0,
+        n_reviews=0,
+        last_hash=0,
+        pending_names=np.empty(0, dtype=object),
+        pending_days=np.empty(0),
+        pending_liked=np.empty(0, dtype=bool),
+    )
+
+
+def load_state(path: Path = POPULARITY_STATE_PATH) -> PopularityState:
+    """
+    Load saved counters, or an empty state if none exist yet (or the
+    file predates the append offset, so the counters get rebuilt).
+
+    Parameters
+    ----------
+    path : Path
+        Location of the saved state.
+
+    Returns
+    -------
+    PopularityState
+        Saved counters.
+    """
+    if not path.exists():
+        return empty_state()
+    with np.load(path, allow_pickle=False) as saved:
+        if "n_reviews" not in saved:
+            return empty_state()
+        return PopularityState(
+            product_keys=saved["product_keys"].astype(object),
+            liked=saved["liked"],
+            total=saved["total"],
+            as_of=float(saved["as_of"]),
+            n_reviews=int(saved["n_reviews"]),
+            last_hash=int(saved["last_hash"]),
+            pending_names=saved["pending_names"].astype(object),
+            pending_days=saved["pending_days"],
+            pending_liked=saved["pending_liked"],
+        )
+
+
+def save_state(state: PopularityState, path: Path = POPULARITY_STATE_PATH) -> None:
+    """
+    Save counters for the next incremental update.
+
+    Parameters
+    ----------
+    state : PopularityState
+        Counters to save.
+    path : Path
+        Destination .npz file.
+    """
+    np.savez_compressed(
+        path,
+        product_keys=state.product_keys.astype(str),
+        liked=state.liked,
+        total=state.total,
+        as_of=np.float64(state.as_of),
+        n_reviews=np.int64(state.n_reviews),
+        last_hash=np.uint64(state.last_hash),
+        pending_names=state.pending_names.astype(str),
+        pending_days=state.pending_days,
+        pending_liked=state.pending_liked,
+    )
+
+
+def _days(dates: pd.Series) -> np.ndarray:
+    """Review dates as days since the Unix epoch."""
+    parsed = pd.to_datetime(dates, format=REVIEW_DATE_FORMAT)
+    return (parsed - pd.Timestamp(0)).dt.total_seconds().to_numpy() / 86400.0
+
+
+def _is_continuation(state: PopularityState, reviews_df: pd.DataFrame) -> bool:
+    """Whether reviews_df extends the rows the state has already read."""
+    if state.n_reviews == 0:
+        return True
+    if state.n_reviews > len(reviews_df):
+        return False
+    boundary = reviews_df.iloc[[state.n_reviews - 1]]
+    return int(review_hashes(boundary)[0]) == state.last_hash
+
+
+def update_state(
+    state: PopularityState,
+    reviews_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+) -> PopularityState:
+    """
+    Fold reviews appended since the last update into the decayed counters.
+
+    The counters move forward to the newest review date; reviews dated
+    before the current reference date are added with their decayed
+    weight. Pending reviews whose product is now in the catalog are
+    folded in too.
+
+    Parameters
+    ----------
+    state : PopularityState
+        Current counters.
+    reviews_df : pd.DataFrame
+        All reviews, in the order they were appended.
+    products_df : pd.DataFrame
+        Cleaned products, used to map product_name to product_key.
+
+    Returns
+    -------
+    PopularityState
+        Updated counters.
+    """
+    if not _is_continuation(state, reviews_df):
+        state = empty_state()
+    appended = reviews_df.iloc[state.n_reviews:]
+
+    names = np.concatenate([state.pending_names,
+                            appended["product_name"].to_numpy(dtype=object)])
+    days = np.concatenate([state.pending_days, _days(appended["date"])])
+    is_liked = np.concatenate([state.pending_liked,
+                               (appended["sentiment"] == "liked").to_numpy()])
+
+    key_by_name = product_key_by_name(products_df)
+    new_keys = pd.Series(names, dtype=object).map(key_by_name)
+    matched = new_keys.notna().to_numpy()
+
+    keys = np.union1d(state.product_keys.astype(str),
+                      products_df["product_key"].unique().astype(str))
+    liked = np.zeros(len(keys))
+    total = np.zeros(len(keys))
+    old_ids = np.searchsorted(keys, state.product_keys.astype(str))
+
+    as_of = max(state.as_of, float(days[matched].max()) if matched.any() else state.as_of)
+    carry = np.exp(-DECAY_PER_DAY * (as_of - state.as_of))
+    liked[old_ids] = state.liked * carry
+    total[old_ids] = state.total * carry
+
+    ids = np.searchsorted(keys, new_keys[matched].to_numpy(dtype=str))
+    weights = np.exp(-DECAY_PER_DAY * (as_of - days[matched]))
+    np.add.at(total, ids, weights)
+    np.add.at(liked, ids, weights * is_liked[matched])
+
+    last_hash = (int(review_hashes(appended.iloc[[-1]])[0]) if len(appended)
+                 else state.last_hash)
+    return PopularityState(
+        product_keys=keys.astype(object),
+        liked=liked,
+        total=total,
+        as_of=as_of,
+        n_reviews=len(reviews_df),
+        last_hash=last_hash,
+        pending_names=names[~matched],
+        pending_days=days[~matched],
+        pending_liked=is_liked[~matched],
+    )
+
+
+def product_popularity_features(state: PopularityState) -> pd.DataFrame:
+    """
+    Turn counters into normalized per-product features.
+
+    Parameters
+    ----------
+    state : PopularityState
+        Current counters.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key, trend_score (0..1, saturating in decayed liked
+        reviews) and recent_liked_share (decayed liked / decayed total).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        liked_share = np.where(state.total > 0, state.liked / state.total, 0.0)
+    return pd.DataFrame({
+        "product_key": state.product_keys,
+        "trend_score": (state.liked / (state.liked + TREND_SATURATION)).round(4),
+        "recent_liked_share": liked_share.round(4),
+    })
@@ -0,0 +1,471 @@
+"""
+Versioned price history of the catalog, stored as deltas.
+
+Every prep run overwrites products_clean.csv. Before that happens, the
+new catalog is compared with the latest known state of each
+(product_key, size) and only the entries whose price_numeric,
+price_per_oz or hearts changed are appended, tagged with a new version.
+A size that disappears gets a NaN tombstone. Re-running prep on an
+unchanged catalog adds nothing.
+
+The deltas form an append-only log: each version is one contiguous
+block of rows, saved as its own small .npz under
+``data/processed/price_history/`` (committed with the features derived
+from it). A run appends one block and writes one file; nothing already
+recorded is rewritten.
+
+Lookups go through a permutation of the log rows sorted by (entry,
+version) with CSR offsets per entry, built when the history is loaded
+and extended in place by each append (new rows go last in their entry's
+segment, so no re-sort is needed). "Value at time t" is then a binary
+search for the entry among the sorted labels and one for the version
+within the entry's segment; the last row of each segment is the latest
+state, which the next run diffs against.
+
+From the history, ``price_trend_features`` derives per-product price
+changes over a recent window, which the ranker reads as precomputed
+features ('price_drop' and 'previous_price_per_oz').
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import PROCESSED_DIR
+
+
+PRICE_HISTORY_DIR = PROCESSED_DIR / "price_history"
+PRODUCT_PRICE_TREND_PATH = PROCESSED_DIR / "product_price_trend.csv"
+
+TRACKED_COLUMNS = ["price_numeric", "price_per_oz", "hearts"]
+
+# Price changes are measured against the catalog this many days back.
+PRICE_TREND_DAYS = 30
+
+# Separator between product_key and size in entry labels.
+ENTRY_SEPARATOR = " @ "
+
+SECONDS_PER_DAY = 86400.0
+
+
+@dataclass
+class PriceHistory:
+    """
+    Delta-encoded snapshots of the tracked columns.
+
+    Attributes
+    ----------
+    entries : np.ndarray
+        Sorted 'product_key @ size' labels.
+    entry_codes : np.ndarray
+        int32 position in ``entries`` of each delta row, in append order.
+    version_offsets : np.ndarray
+        Deltas of version ``v`` are rows ``version_offsets[v]:version_offsets[v + 1]``.
+    values : Dict[str, np.ndarray]
+        float64 value of each tracked column per delta row; NaN after
+        the entry was removed from the catalog.
+    version_times : np.ndarray
+        Unix time of each version (version ``v`` is ``version_times[v]``).
+    order : np.ndarray
+        Delta rows sorted by (entry, version).
+    entry_offsets : np.ndarray
+        Deltas of entry ``i`` are rows ``order[entry_offsets[i]:entry_offsets[i + 1]]``.
+    order_versions : np.ndarray
+        int32 version of each row of ``order``, increasing within an entry.
+    """
+
+    entries: np.ndarray
+    entry_codes: np.ndarray
+    version_offsets: np.ndarray
+    values: Dict[str, np.ndarray]
+    version_times: np.ndarray
+    order: np.ndarray
+    entry_offsets: np.ndarray
+    order_versions: np.ndarray
+
+    @property
+    def n_versions(self) -> int:
+        """Number of catalog versions recorded."""
+        return len(self.version_times)
+
+
+def empty_history() -> PriceHistory:
+    """
+    Create a history with no versions.
+
+    Returns
+    -------
+    PriceHistory
+        Empty history.
+    """
+    return PriceHistory(
+        entries=np.empty(0, dtype=object),
+        entry_codes=np.empty(0, dtype=np.int32),
+        version_offsets=np.zeros(1, dtype=np.int64),
+        values={col: np.empty(0) for col in TRACKED_COLUMNS},
+        version_times=np.empty(0),
+        order=np.empty(0, dtype=np.int64),
+        entry_offsets=np.zeros(1, dtype=np.int64),
+        order_versions=np.empty(0, dtype=np.int32),
+    )
+
+
+def _block_path(directory: Path, version: int) -> Path:
+    """File holding the deltas of one version."""
+    return directory / f"v{version:05d}.npz"
+
+
+def load_history(directory: Path = PRICE_HISTORY_DIR) -> PriceHistory:
+    """
+    Load the saved history, or an empty one if none exists yet.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory of per-version blocks.
+
+    Returns
+    -------
+    PriceHistory
+        Saved history, with its (entry, version) lookup order built.
+    """
+    blocks = []
+    version = 0
+    while _block_path(directory, version).exists():
+        with np.load(_block_path(directory, version), allow_pickle=False) as saved:
+            blocks.append({key: saved[key] for key in saved.files})
+        version += 1
+    if not blocks:
+        return empty_history()
+
+    sizes = [len(block["entries"]) for block in blocks]
+    entries, codes = np.unique(np.concatenate([block["entries"] for block in blocks]),
+                               return_inverse=True)
+    versions = np.repeat(np.arange(len(blocks), dtype=np.int32), sizes)
+    order = np.lexsort((versions, codes))
+    return PriceHistory(
+        entries=entries.astype(object),
+        entry_codes=codes.astype(np.int32),
+        version_offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+        values={col: np.concatenate([block[col] for block in blocks])
+                for col in TRACKED_COLUMNS},
+        version_times=np.array([float(block["as_of"]) for block in blocks]),
+        order=order.astype(np.int64),
+        entry_offsets=np.searchsorted(codes[order], np.arange(len(entries) + 1)).astype(np.int64),
+        order_versions=versions[order],
+    )
+
+
+def save_history(history: PriceHistory, directory: Path = PRICE_HISTORY_DIR) -> None:
+    """
+    Write the versions not saved yet, one block file each.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to save.
+    directory : Path
+        Directory of per-version blocks.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for version in range(history.n_versions):
+        path = _block_path(directory, version)
+        if path.exists():
+            continue
+        rows = slice(history.version_offsets[version], history.version_offsets[version + 1])
+        np.savez_compressed(
+            path,
+            entries=history.entries[history.entry_codes[rows]].astype(str),
+            as_of=np.float64(history.version_times[version]),
+            **{col: history.values[col][rows] for col in TRACKED_COLUMNS},
+        )
+
+
+def catalog_entries(products_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tracked columns of a catalog, one row per entry label.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products with product_key, size and the tracked columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        'entry' plus the tracked columns as float64, sorted by entry.
+    """
+    entries = (
+        products_df["product_key"].astype(str) + ENTRY_SEPARATOR
+        + products_df["size"].astype(str)
+    )
+    table = products_df[TRACKED_COLUMNS].astype(np.float64).assign(entry=entries.to_numpy())
+    return (
+        table.drop_duplicates("entry", keep="last")
+        .sort_values("entry", ignore_index=True)[["entry"] + TRACKED_COLUMNS]
+    )
+
+
+def latest_values(history: PriceHistory) -> pd.DataFrame:
+    """
+    Current value of every entry the history knows.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to read.
+
+    Returns
+    -------
+    pd.DataFrame
+        'entry' plus the tracked columns (NaN for removed entries).
+    """
+    last = history.order[history.entry_offsets[1:] - 1]
+    return pd.DataFrame({
+        "entry": history.entries,
+        **{col: history.values[col][last] for col in TRACKED_COLUMNS},
+    })
+
+
+def _extend_order(
+    history: PriceHistory,
+    n_entries: int,
+    moved: np.ndarray,
+    codes: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lookup order after appending one version's deltas.
+
+    ``moved`` maps the old entry codes to the new ones and ``codes`` are
+    the new rows' entries (one row per entry). The new rows carry the
+    largest version, so each goes last in its entry's segment and the
+    old order is copied around them unchanged.
+    """
+    counts = np.zeros(n_entries, dtype=np.int64)
+    counts[moved] = np.diff(history.entry_offsets)
+    counts[codes] += 1
+    entry_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    start = len(history.entry_codes)
+    slots = entry_offsets[codes + 1] - 1
+    kept = np.ones(start + len(codes), dtype=bool)
+    kept[slots] = False
+    order = np.empty(len(kept), dtype=np.int64)
+    order[kept], order[slots] = history.order, start + np.arange(len(codes))
+    order_versions = np.empty(len(kept), dtype=np.int32)
+    order_versions[kept], order_versions[slots] = history.order_versions, history.n_versions
+    return order, entry_offsets, order_versions
+
+
+def append_snapshot(
+    history: PriceHistory,
+    products_df: pd.DataFrame,
+    as_of: Optional[float] = None,
+) -> PriceHistory:
+    """
+    Record a catalog as a new version, storing only what changed.
+
+    The changed entries are appended as one block. Their rows go last in
+    their entries' segments of the lookup order, so the order is
+    extended in one pass rather than re-sorted.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History so far.
+    products_df : pd.DataFrame
+        The new catalog.
+    as_of : Optional[float]
+        Unix time of the snapshot; defaults to now.
+
+    Returns
+    -------
+    PriceHistory
+        The extended history, or ``history`` itself if nothing changed.
+    """
+    current = catalog_entries(products_df)
+    previous = latest_values(history)
+    merged = previous.merge(current, on="entry", how="outer", suffixes=("_old", ""))
+
+    changed = np.zeros(len(merged), dtype=bool)
+    for col in TRACKED_COLUMNS:
+        old, new = merged[f"{col}_old"].to_numpy(), merged[col].to_numpy()
+        changed |= ~((old == new) | (np.isnan(old) & np.isnan(new)))
+    # Removed entries have NaN on the new side and become tombstones;
+    # entries already tombstoned and still absent compare equal.
+    deltas = merged[changed]
+    if deltas.empty:
+        return history
+
+    # New labels shift the sorted entries; old codes move monotonically.
+    labels = deltas["entry"].to_numpy(dtype=str)
+    entries = np.union1d(history.entries.astype(str), labels)
+    moved = np.searchsorted(entries, history.entries.astype(str))
+    codes = np.searchsorted(entries, labels)
+
+    start = len(history.entry_codes)
+    order, entry_offsets, order_versions = _extend_order(history, len(entries), moved, codes)
+
+    return PriceHistory(
+        entries=entries.astype(object),
+        entry_codes=np.concatenate([moved[history.entry_codes], codes]).astype(np.int32),
+        version_offsets=np.append(history.version_offsets, start + len(codes)),
+        values={
+            col: np.concatenate([history.values[col], deltas[col].to_numpy(dtype=np.float64)])
+            for col in TRACKED_COLUMNS
+        },
+        version_times=np.append(history.version_times,
+                                time.time() if as_of is None else as_of),
+        order=order,
+        entry_offsets=entry_offsets,
+        order_versions=order_versions,
+    )
+
+
+def version_at(history: PriceHistory, timestamp: float) -> int:
+    """
+    Latest version recorded at or before a time.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to search.
+    timestamp : float
+        Unix time.
+
+    Returns
+    -------
+    int
+        Version number, or -1 if the history starts later.
+    """
+    return int(np.searchsorted(history.version_times, timestamp, side="right")) - 1
+
+
+def value_at(
+    history: PriceHistory,
+    product_key: str,
+    size: str,
+    timestamp: float,
+    column: str = "price_per_oz",
+) -> Optional[float]:
+    """
+    Value of one product size as of a time.
+
+    Two binary searches: the entry among the sorted labels, then the
+    version within the entry's segment of the lookup order.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to search.
+    product_key : str
+        Product to look up.
+    size : str
+        Size label, e.g. '12oz'.
+    timestamp : float
+        Unix time.
+    column : str
+        One of ``TRACKED_COLUMNS``.
+
+    Returns
+    -------
+    Optional[float]
+        The value, or None if the size was not in the catalog then.
+    """
+    entry = f"{product_key}{ENTRY_SEPARATOR}{size}"
+    i = int(np.searchsorted(history.entries, entry))
+    if i == len(history.entries) or history.entries[i] != entry:
+        return None
+    version = version_at(history, timestamp)
+    start, stop = history.entry_offsets[i], history.entry_offsets[i + 1]
+    pos = start + int(np.searchsorted(history.order_versions[start:stop], version,
+                                      side="right")) - 1
+    if pos < start:
+        return None
+    value = history.values[column][history.order[pos]]
+    return None if np.isnan(value) else float(value)
+
+
+def values_at(history: PriceHistory, timestamp: float) -> pd.DataFrame:
+    """
+    The whole catalog's tracked columns as of a time.
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to read.
+    timestamp : float
+        Unix time.
+
+    Returns
+    -------
+    pd.DataFrame
+        'entry' plus the tracked columns, for entries present then,
+        sorted by entry.
+    """
+    version = version_at(history, timestamp)
+    # Last delta at or before ``version`` within each entry's segment:
+    # versions increase within a segment, so count the qualifying rows.
+    qualifying = np.concatenate([[0], np.cumsum(history.order_versions <= version)])
+    offsets = history.entry_offsets
+    counts = qualifying[offsets[1:]] - qualifying[offsets[:-1]]
+    known = counts > 0
+    rows = history.order[(offsets[:-1] + counts - 1)[known]]
+    table = pd.DataFrame({
+        "entry": history.entries[known],
+        **{col: history.values[col][rows] for col in TRACKED_COLUMNS},
+    })
+    return table.dropna(subset=TRACKED_COLUMNS, how="all").reset_index(drop=True)
+
+
+def price_trend_features(
+    history: PriceHistory,
+    window_days: float = PRICE_TREND_DAYS,
+) -> pd.DataFrame:
+    """
+    Per-product price change over the last ``window_days``.
+
+    The cheapest price per ounce across sizes is compared between the
+    latest version and the version in force ``window_days`` before it
+    (or the first version, if the history is shorter than the window).
+
+    Parameters
+    ----------
+    history : PriceHistory
+        History to read.
+    window_days : float
+        Look-back window.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key, previous_price_per_oz (NaN for products added since)
+        and price_drop, the relative decrease (0..1; 0 for unchanged or
+        higher prices).
+    """
+    columns = ["product_key", "previous_price_per_oz", "price_drop"]
+    if history.n_versions == 0:
+        return pd.DataFrame(columns=columns)
+
+    latest_time = float(history.version_times[-1])
+    baseline_time = max(latest_time - window_days * SECONDS_PER_DAY,
+                        float(history.version_times[0]))
+
+    def cheapest(timestamp: float) -> pd.Series:
+        table = values_at(history, timestamp)
+        product_keys = table["entry"].str.rsplit(ENTRY_SEPARATOR, n=1).str[0]
+        return table["price_per_oz"].groupby(product_keys.to_numpy()).min()
+
+    now = cheapest(latest_time)
+    before = cheapest(baseline_time).reindex(now.index)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drop = ((before - now) / before).clip(lower=0.0).fillna(0.0)
+    return pd.DataFrame({
+        "product_key": now.index.to_numpy(),
+        "previous_price_per_oz": before.round(4).to_numpy(),
+        "price_drop": drop.round(4).to_numpy(),
+    })
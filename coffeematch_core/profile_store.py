@@ -0,0 +1,486 @@
+"""
+Persistent user profiles in an embedded SQLite database.
+
+Each profile holds a user's ``UserPreferences``, the products they liked
+or disliked, and their last top-k results together with the catalog
+version and preferences hash those results were computed for. A
+returning user whose preferences and catalog are unchanged gets the
+stored results back without re-scoring.
+
+Connections come from a small fixed pool (SQLite in WAL mode lets
+readers proceed while a write is in progress). Writes are buffered and
+flushed in batches with one ``executemany`` per transaction by a
+background thread; reads check the buffer first, so a session always
+sees its own latest write.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from coffeematch_core.catalog import (
+    PRODUCT_FEATURE_FILES,
+    PRODUCT_LISTS_PATH,
+    PRODUCT_MATRIX_FILES,
+    PRODUCT_NEIGHBORS_PATH,
+    PRODUCTS_PATH,
+)
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.scoring import scoring_config_path
+
+
+PROFILE_DB_ENV = "COFFEEMATCH_PROFILE_DB"
+DEFAULT_PROFILE_DB = Path("data/profiles.sqlite3")
+
+POOL_SIZE = 4
+
+# Pending writes are flushed when this many queue up or after this long.
+WRITE_BATCH_SIZE = 64
+FLUSH_INTERVAL_S = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    preferences TEXT NOT NULL,
+    liked TEXT NOT NULL,
+    disliked TEXT NOT NULL,
+    results TEXT NOT NULL,
+    catalog_version TEXT,
+    prefs_hash TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+UPSERT = """
+INSERT INTO profiles (user_id, preferences, liked, disliked, results,
+                      catalog_version, prefs_hash, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    preferences = excluded.preferences,
+    liked = excluded.liked,
+    disliked = excluded.disliked,
+    results = excluded.results,
+    catalog_version = excluded.catalog_version,
+    prefs_hash = excluded.prefs_hash,
+    updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class UserProfile:
+    """
+    Stored state of one user.
+
+    Attributes
+    ----------
+    user_id : str
+        Stable user identifier.
+    preferences : UserPreferences
+        Latest survey answers.
+    liked : List[str]
+        Product keys the user liked.
+    disliked : List[str]
+        Product keys the user disliked.
+    results : List[Dict[str, object]]
+        Last top-k results, best first (at least product_key and score).
+    catalog_version : Optional[str]
+        ``catalog_version`` the results were computed against.
+    prefs_hash : Optional[str]
+        ``preferences_hash`` of the preferences behind the results.
+    updated_at : float
+        Unix time of the last change.
+    """
+
+    user_id: str
+    preferences: UserPreferences
+    liked: List[str] = field(default_factory=list)
+    disliked: List[str] = field(default_factory=list)
+    results: List[Dict[str, object]] = field(default_factory=list)
+    catalog_version: Optional[str] = None
+    prefs_hash: Optional[str] = None
+    updated_at: float = 0.0
+
+
+def preferences_hash(prefs: UserPreferences) -> str:
+    """
+    Stable hash of a preference set.
+
+    Parameters
+    ----------
+    prefs : UserPreferences
+        Preferences to hash.
+
+    Returns
+    -------
+    str
+        Hex digest; equal preferences give equal hashes across runs.
+    """
+    payload = json.dumps(asdict(prefs), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=16)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    """Content hash of a file, cached per (size, mtime)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def catalog_inputs() -> List[Path]:
+    """
+    Files ``load_catalog_index`` reads, plus the scoring config.
+
+    Returns
+    -------
+    List[Path]
+        Products, precomputed features, neighbors, lists and the scoring
+        config in effect.
+    """
+    return [
+        PRODUCTS_PATH,
+        *PRODUCT_FEATURE_FILES,
+        *PRODUCT_MATRIX_FILES.values(),
+        PRODUCT_NEIGHBORS_PATH,
+        PRODUCT_LISTS_PATH,
+        scoring_config_path(),
+    ]
+
+
+def catalog_version(paths: Optional[Sequence[Path]] = None) -> str:
+    """
+    Version string of everything the ranked results depend on.
+
+    Each file is hashed once per size/modification time, so repeated
+    calls are a ``stat`` per file. A missing file counts as a distinct
+    state, so adding or removing a feature file changes the version.
+
+    Parameters
+    ----------
+    paths : Optional[Sequence[Path]]
+        Files the results depend on; defaults to ``catalog_inputs()``.
+
+    Returns
+    -------
+    str
+        Short combined content hash.
+    """
+    digest = hashlib.sha1()
+    for path in catalog_inputs() if paths is None else paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            part = "missing"
+        else:
+            part = _file_digest(str(path), stat.st_size, stat.st_mtime_ns)
+        digest.update(f"{Path(path).name}={part};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _to_row(profile: UserProfile) -> tuple:
+    """Serialize a profile for UPSERT."""
+    return (
+        profile.user_id,
+        json.dumps(asdict(profile.preferences)),
+        json.dumps(profile.liked),
+        json.dumps(profile.disliked),
+        json.dumps(profile.results),
+        profile.catalog_version,
+        profile.prefs_hash,
+        profile.updated_at,
+    )
+
+
+def _from_row(row: sqlite3.Row) -> UserProfile:
+    """Deserialize one profiles row."""
+    fields = UserPreferences.__dataclass_fields__
+    prefs = json.loads(row["preferences"])
+    return UserProfile(
+        user_id=row["user_id"],
+        preferences=UserPreferences(**{k: v for k, v in prefs.items() if k in fields}),
+        liked=json.loads(row["liked"]),
+        disliked=json.loads(row["disliked"]),
+        results=json.loads(row["results"]),
+        catalog_version=row["catalog_version"],
+        prefs_hash=row["prefs_hash"],
+        updated_at=row["updated_at"],
+    )
+
+
+class ProfileStore:
+    """
+    Pooled, write-batching SQLite store of ``UserProfile`` objects.
+
+    Parameters
+    ----------
+    path : Path
+        Database file; created with its parent directory if missing.
+    pool_size : int
+        Number of pooled connections.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PROFILE_DB, pool_size: int = POOL_SIZE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.execute(SCHEMA)
+
+        self._pending: Dict[str, UserProfile] = {}
+        self._flushing: Dict[str, UserProfile] = {}
+        self._lock = threading.Lock()
+        # One flush at a time: _flushing holds a single in-flight batch.
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                        name="coffeematch-profile-writer")
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open one pooled connection."""
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; commits on success, rolls back on error."""
+        conn = self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def get(self, user_id: str) -> Optional[UserProfile]:
+        """
+        Load a profile.
+
+        Parameters
+        ----------
+        user_id : str
+            User to look up.
+
+        Returns
+        -------
+        Optional[UserProfile]
+            The profile, including unflushed writes, or None.
+        """
+        with self._lock:
+            pending = self._pending.get(user_id) or self._flushing.get(user_id)
+        if pending is not None:
+            return pending
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM profiles WHERE user_id = ?",
+                               (user_id,)).fetchone()
+        return _from_row(row) if row else None
+
+    def cached_results(
+        self,
+        user_id: str,
+        prefs: UserPreferences,
+        version: str,
+    ) -> Optional[List[Dict[str, object]]]:
+        """
+        Return stored results if they are still valid.
+
+        Parameters
+        ----------
+        user_id : str
+            User to look up.
+        prefs : UserPreferences
+            Current preferences.
+        version : str
+            Current ``catalog_version``.
+
+        Returns
+        -------
+        Optional[List[Dict[str, object]]]
+            Stored results when both the preferences and the catalog are
+            unchanged, else None (re-scoring is needed).
+        """
+        profile = self.get(user_id)
+        if (profile is None or profile.catalog_version != version
+                or profile.prefs_hash != preferences_hash(prefs)):
+            return None
+        return profile.results
+
+    def save(self, profile: UserProfile) -> None:
+        """
+        Queue a profile write.
+
+        Parameters
+        ----------
+        profile : UserProfile
+            Profile to store; replaces any earlier pending write.
+        """
+        profile.updated_at = time.time()
+        with self._lock:
+            self._pending[profile.user_id] = profile
+            full = len(self._pending) >= WRITE_BATCH_SIZE
+        if full:
+            self._wake.set()
+
+    def save_results(
+        self,
+        user_id: str,
+        prefs: UserPreferences,
+        results: List[Dict[str, object]],
+        version: str,
+    ) -> UserProfile:
+        """
+        Store new preferences and the results computed for them.
+
+        Liked/disliked products of an existing profile are kept.
+
+        Parameters
+        ----------
+        user_id : str
+            User to update.
+        prefs : UserPreferences
+            Preferences the results were computed for.
+        results : List[Dict[str, object]]
+            Top-k results, best first.
+        version : str
+            ``catalog_version`` used.
+
+        Returns
+        -------
+        UserProfile
+            The queued profile.
+        """
+        # get() may return the object a flush is serializing, so the
+        # update is a new profile rather than an in-place change.
+        profile = replace(
+            self.get(user_id) or UserProfile(user_id=user_id, preferences=prefs),
+            preferences=prefs,
+            results=results,
+            catalog_version=version,
+            prefs_hash=preferences_hash(prefs),
+        )
+        self.save(profile)
+        return profile
+
+    def set_feedback(
+        self,
+        user_id: str,
+        liked: Optional[Sequence[str]] = None,
+        disliked: Optional[Sequence[str]] = None,
+    ) -> UserProfile:
+        """
+        Store the products a user liked or disliked.
+
+        Preferences and cached results are kept.
+
+        Parameters
+        ----------
+        user_id : str
+            User to update; a new profile gets default preferences.
+        liked : Optional[Sequence[str]]
+            Product keys the user liked; None leaves them unchanged.
+        disliked : Optional[Sequence[str]]
+            Product keys the user disliked; None leaves them unchanged.
+
+        Returns
+        -------
+        UserProfile
+            The queued profile.
+        """
+        current = self.get(user_id) or UserProfile(user_id=user_id,
+                                                   preferences=UserPreferences())
+        profile = replace(
+            current,
+            liked=current.liked if liked is None else list(liked),
+            disliked=current.disliked if disliked is None else list(disliked),
+        )
+        self.save(profile)
+        return profile
+
+    def save_many(self, profiles: Sequence[UserProfile]) -> None:
+        """
+        Write profiles immediately in one transaction.
+
+        Parameters
+        ----------
+        profiles : Sequence[UserProfile]
+            Profiles to upsert.
+        """
+        if not profiles:
+            return
+        with self._connection() as conn:
+            conn.executemany(UPSERT, [_to_row(profile) for profile in profiles])
+
+    def flush(self) -> None:
+        """Write all pending profiles now."""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+                batch = list(self._flushing.values())
+            try:
+                self.save_many(batch)
+            except Exception:
+                # Put the batch back unless newer writes replaced it.
+                with self._lock:
+                    for profile in batch:
+                        self._pending.setdefault(profile.user_id, profile)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _write_loop(self) -> None:
+        """Background writer: flush on a full batch or every interval."""
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL_S)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # retried on the next tick
+
+    def close(self) -> None:
+        """Flush pending writes and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        while not self._pool.empty():
+            self._pool.get().close()
+
+
+def open_profile_store(path: Optional[Path] = None) -> ProfileStore:
+    """
+    Open the store at ``path``, ``COFFEEMATCH_PROFILE_DB`` or the default.
+
+    Parameters
+    ----------
+    path : Optional[Path]
+        Database file.
+
+    Returns
+    -------
+    ProfileStore
+        Open store.
+    """
+    return ProfileStore(Path(path or os.environ.get(PROFILE_DB_ENV) or DEFAULT_PROFILE_DB))
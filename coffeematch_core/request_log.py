@@ -0,0 +1,146 @@
+"""
+Optional capture of recommendation requests for replay and load tests.
+
+When the ``COFFEEMATCH_REQUEST_LOG`` environment variable names a file,
+every ``engine.recommend`` call appends one compact JSON line with the
+preferences, the ranking options, the returned product keys and the
+latency (plus every variant's product keys during an experiment). The
+file rotates by size through ``logging``'s ``RotatingFileHandler``, so
+capture can stay on in long-running apps.
+``scripts/replay_requests.py`` re-drives these logs.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from coffeematch_core.schemas import UserPreferences
+
+
+REQUEST_LOG_ENV = "COFFEEMATCH_REQUEST_LOG"
+
+# Rotate at this size, keeping this many old files (requests.log.1, ...).
+MAX_LOG_BYTES = 50 * 1024 * 1024
+BACKUP_COUNT = 5
+
+LOGGER_NAME = "coffeematch.requests"
+
+
+@lru_cache(maxsize=None)
+def request_logger(path: Optional[str] = None) -> Optional[logging.Logger]:
+    """
+    Return the request logger, configured on first use.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        Log file. None reads ``COFFEEMATCH_REQUEST_LOG``.
+
+    Returns
+    -------
+    Optional[logging.Logger]
+        Logger writing one record per line, or None if capture is off.
+    """
+    path = path or os.environ.get(REQUEST_LOG_ENV)
+    if not path:
+        return None
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=MAX_LOG_BYTES,
+                                  backupCount=BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logger = logging.getLogger(f"{LOGGER_NAME}.{path}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def log_request(
+    logger: logging.Logger,
+    prefs: UserPreferences,
+    options: Dict[str, object],
+    product_keys: List[str],
+    latency_ms: float,
+    variant_results: Optional[Dict[str, List[str]]] = None,
+) -> None:
+    """
+    Append one request record.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        Output of ``request_logger``.
+    prefs : UserPreferences
+        Preferences of the request.
+    options : Dict[str, object]
+        Ranking options passed to ``recommend`` (k, mode, ...).
+    product_keys : List[str]
+        Returned products, best first.
+    latency_ms : float
+        Time spent in ``recommend``.
+    variant_results : Optional[Dict[str, List[str]]]
+        In an experiment, every variant's product keys, by variant name.
+    """
+    record = {
+        "ts": round(time.time(), 3),
+        "prefs": asdict(prefs),
+        "options": options,
+        "results": product_keys,
+        "latency_ms": round(latency_ms, 3),
+    }
+    if variant_results is not None:
+        record["variants"] = variant_results
+    logger.info(json.dumps(record, separators=(",", ":")))
+
+
+def log_files(path: Path) -> List[Path]:
+    """
+    List a log and its rotated backups, oldest first.
+
+    Parameters
+    ----------
+    path : Path
+        Active log file.
+
+    Returns
+    -------
+    List[Path]
+        Existing files in the order their records were written.
+    """
+    backups = [Path(f"{path}.{i}") for i in range(BACKUP_COUNT, 0, -1)]
+    return [p for p in backups + [Path(path)] if p.exists()]
+
+
+def read_requests(path: Path) -> Iterator[Dict[str, object]]:
+    """
+    Iterate over logged records, oldest first, across rotated files.
+
+    Parameters
+    ----------
+    path : Path
+        Active log file.
+
+    Yields
+    ------
+    Dict[str, object]
+        Records with 'prefs' turned back into ``UserPreferences``.
+    """
+    fields = UserPreferences.__dataclass_fields__
+    for log_path in log_files(path):
+        with log_path.open(encoding="utf-8") as lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record["prefs"] = UserPreferences(
+                    **{k: v for k, v in record["prefs"].items() if k in fields}
+                )
+                yield record
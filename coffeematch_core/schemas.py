@@ -51,6 +51,9 @@ class UserPreferences:
     ----------
     roast_type : Optional[str]
         Preferred roast type, such as 'Light', 'Medium', or 'Dark'.
+    roast_required : bool
+        Whether roast_type is a hard filter. When False, the roast only
+        adds to the score.
     max_price_per_oz : Optional[float]
         Maximum acceptable price per ounce. Use None if no limit is set.
     decaf : Optional[bool]
@@ -67,9 +70,35 @@ class UserPreferences:
         Relative weight for price/value matching in the ranking stage.
     popularity_weight : float
         Relative weight for popularity/review-based ranking.
+    sentiment_weight : float
+        Relative weight for review-text sentiment, when available.
+    trending_weight : float
+        Relative weight for recent, time-decayed review activity.
+    brewing_method : Optional[str]
+        How the user brews, e.g. 'Espresso' or 'Pour Over'. Use None if
+        not specified.
+    brewing_weight : float
+        Relative weight for how well reviewers with the same brewing
+        method liked the coffee. Only used when brewing_method is set.
+    liked_products : List[str]
+        Product keys the user already likes, for collaborative scoring.
+    collaborative_weight : float
+        Relative weight for similarity to liked_products.
+    tags : List[str]
+        Tags the user is looking for, e.g. 'organic' or 'espresso'.
+    tag_weight : float
+        Relative weight for the share of requested tags a product has.
+    tasting_notes : List[str]
+        Tasting notes the user is looking for, e.g. 'chocolate' or 'berry'.
+    note_weight : float
+        Relative weight for the share of requested tasting notes that
+        reviewers mention for a product.
+    price_drop_weight : float
+        Relative weight for recent price drops, when price history exists.
     """
 
     roast_type: Optional[str] = None
+    roast_required: bool = False
     max_price_per_oz: Optional[float] = None
     decaf: Optional[bool] = None
     ground_required: Optional[bool] = None
@@ -78,6 +107,17 @@ class UserPreferences:
     roast_weight: float = 0.45
     price_weight: float = 0.35
     popularity_weight: float = 0.20
+    sentiment_weight: float = 0.0
+    trending_weight: float = 0.0
+    brewing_method: Optional[str] = None
+    brewing_weight: float = 0.20
+    liked_products: List[str] = field(default_factory=list)
+    collaborative_weight: float = 0.25
+    tags: List[str] = field(default_factory=list)
+    tag_weight: float = 0.30
+    tasting_notes: List[str] = field(default_factory=list)
+    note_weight: float = 0.20
+    price_drop_weight: float = 0.0
 
 
 @dataclass
@@ -114,3 +154,20 @@ class Recommendation:
     heart_percentage: Optional[float] = None
     has_reviews: Optional[bool] = None
     url: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    tasting_notes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PurchaseLocation:
+    """
+    One cafe near the user where a recommended roaster's coffee is sold.
+    """
+    roaster: str
+    cafe_name: str
+    address: str
+    city: str
+    lat: float
+    lon: float
+    distance_km: float
+    geo_precision: str = "city"
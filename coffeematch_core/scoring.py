@@ -0,0 +1,453 @@
+"""
+Declarative scoring formula, compiled to a component matrix.
+
+``config/scoring.toml`` lists the score components and their weights.
+Column components (value, popularity, precomputed review signals, ...)
+do not depend on the request, so they are normalized once per catalog
+into one (components x rows) float matrix; a request's score over a row
+range is then a single matrix-vector product with its weight vector.
+Query components (roast match, brewing affinity, ...) depend on the
+request and are evaluated by the engine, then weighted the same way.
+
+Changing a weight, dropping a component or adding a column component is
+a config change; every variant runs at full vectorized speed.
+
+An optional ``[experiment]`` section defines A/B variants: named
+overrides of the weight fields, each with a traffic share. Users are
+assigned by a salted hash of their id, so the same user always sees the
+same variant, and since variants differ only in weights, all of them
+are scored together in one matrix product (see ``engine.rank_variants``).
+"""
+
+import hashlib
+import os
+import tomllib
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from coffeematch_core.catalog import CatalogIndex, product_feature
+from coffeematch_core.schemas import UserPreferences
+
+
+SCORING_CONFIG_ENV = "COFFEEMATCH_SCORING_CONFIG"
+SCORING_CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "scoring.toml"
+
+# Key of the compiled matrix in ``index.columns``; its row labels are
+# ``index.categories[SCORE_COMPONENTS]``, and what each row was compiled
+# from ('name:source:normalize') is ``index.categories[COMPILED_SPECS]``.
+SCORE_COMPONENTS = "score_components"
+COMPILED_SPECS = "score_components:specs"
+
+
+def _min_max(values: np.ndarray, inverted: bool = False) -> np.ndarray:
+    """Scale to 0..1 (smallest at 1 if inverted); constant columns map to 1."""
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not high > low:
+        return np.ones_like(values)
+    if inverted:
+        return (high - values) / (high - low)
+    return (values - low) / (high - low)
+
+
+NORMALIZATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "none": lambda values: values,
+    "min_max": _min_max,
+    "min_max_inverted": lambda values: _min_max(values, inverted=True),
+    "percent": lambda values: np.clip(values / 100.0, 0.0, 1.0),
+}
+
+# Request-dependent components the engine knows how to evaluate.
+QUERY_KINDS = ("roast_match", "brewing_affinity", "collaborative", "tag_share", "note_share")
+
+Weight = Union[str, float]
+
+
+@dataclass
+class ColumnComponent:
+    """
+    A component computed once from a catalog column.
+
+    Attributes
+    ----------
+    name : str
+        Component label.
+    source : str
+        Row column of the index, or per-product feature.
+    weight : Weight
+        UserPreferences field name, or a fixed number.
+    normalize : str
+        Key of ``NORMALIZATIONS``.
+    """
+
+    name: str
+    source: str
+    weight: Weight
+    normalize: str = "none"
+
+
+@dataclass
+class QueryComponent:
+    """
+    A component evaluated per request by the engine.
+
+    Attributes
+    ----------
+    name : str
+        Component label.
+    kind : str
+        One of ``QUERY_KINDS``.
+    weight : Weight
+        UserPreferences field name, or a fixed number.
+    """
+
+    name: str
+    kind: str
+    weight: Weight
+
+
+@dataclass
+class ScoringVariant:
+    """
+    One arm of a scoring experiment.
+
+    Attributes
+    ----------
+    name : str
+        Variant label, logged with each request.
+    weights : Dict[str, float]
+        UserPreferences weight fields to override; empty for control.
+    share : float
+        Relative share of users assigned to this variant.
+    """
+
+    name: str
+    weights: Dict[str, float] = field(default_factory=dict)
+    share: float = 1.0
+
+
+@dataclass
+class ScoringConfig:
+    """
+    Parsed scoring formula.
+
+    Attributes
+    ----------
+    columns : List[ColumnComponent]
+        Precomputable components, in config order.
+    queries : List[QueryComponent]
+        Request-dependent components, in config order.
+    variants : List[ScoringVariant]
+        Experiment arms; empty when no experiment runs.
+    experiment_salt : str
+        Mixed into the user hash, so a new experiment reshuffles users.
+    """
+
+    columns: List[ColumnComponent] = field(default_factory=list)
+    queries: List[QueryComponent] = field(default_factory=list)
+    variants: List[ScoringVariant] = field(default_factory=list)
+    experiment_salt: str = ""
+
+
+def _check_weight(name: str, weight: Weight) -> None:
+    """Reject weights that are neither numbers nor preference fields."""
+    if isinstance(weight, (int, float)) and not isinstance(weight, bool):
+        return
+    if weight not in UserPreferences.__dataclass_fields__:
+        raise ValueError(f"Component {name!r}: weight {weight!r} is neither a number "
+                         "nor a UserPreferences field")
+
+
+def parse_scoring_config(raw: Dict[str, object]) -> ScoringConfig:
+    """
+    Validate a parsed TOML document.
+
+    Parameters
+    ----------
+    raw : Dict[str, object]
+        Output of ``tomllib.load``.
+
+    Returns
+    -------
+    ScoringConfig
+        The formula.
+
+    Raises
+    ------
+    ValueError
+        On unknown normalizations or query kinds, bad weights, duplicate
+        component names, or variants overriding anything but the
+        formula's weight fields.
+    """
+    experiment = dict(raw.get("experiment", {}))
+    variants = []
+    for name, entry in experiment.get("variants", {}).items():
+        entry = dict(entry)
+        share = float(entry.pop("share", 1.0))
+        variants.append(ScoringVariant(name=name, weights=entry, share=share))
+    config = ScoringConfig(
+        columns=[ColumnComponent(**entry) for entry in raw.get("column", [])],
+        queries=[QueryComponent(**entry) for entry in raw.get("query", [])],
+        variants=variants,
+        experiment_salt=str(experiment.get("salt", "")),
+    )
+    names = [c.name for c in config.columns] + [q.name for q in config.queries]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate scoring component names in {names}")
+    for component in config.columns:
+        if component.normalize not in NORMALIZATIONS:
+            raise ValueError(f"Component {component.name!r}: unknown normalization "
+                             f"{component.normalize!r}; expected one of {sorted(NORMALIZATIONS)}")
+        _check_weight(component.name, component.weight)
+    for component in config.queries:
+        if component.kind not in QUERY_KINDS:
+            raise ValueError(f"Component {component.name!r}: unknown kind "
+                             f"{component.kind!r}; expected one of {QUERY_KINDS}")
+        _check_weight(component.name, component.weight)
+
+    weight_fields = {c.weight for c in config.columns + config.queries if isinstance(c.weight, str)}
+    for variant in config.variants:
+        unknown = set(variant.weights) - weight_fields
+        if unknown:
+            raise ValueError(f"Variant {variant.name!r}: {sorted(unknown)} are not weight "
+                             f"fields of the formula; expected some of {sorted(weight_fields)}")
+        if variant.share <= 0:
+            raise ValueError(f"Variant {variant.name!r}: share must be positive")
+    return config
+
+
+def scoring_config_path(path: Optional[str] = None) -> Path:
+    """
+    Scoring config file in effect.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        Explicit TOML file, if any.
+
+    Returns
+    -------
+    Path
+        ``path``, else ``COFFEEMATCH_SCORING_CONFIG``, else
+        ``SCORING_CONFIG_PATH``.
+    """
+    return Path(path or os.environ.get(SCORING_CONFIG_ENV) or SCORING_CONFIG_PATH)
+
+
+@lru_cache(maxsize=None)
+def load_scoring_config(path: Optional[str] = None) -> ScoringConfig:
+    """
+    Read the scoring formula, once per path.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        TOML file. None reads ``COFFEEMATCH_SCORING_CONFIG``, then
+        ``SCORING_CONFIG_PATH``.
+
+    Returns
+    -------
+    ScoringConfig
+        The formula.
+    """
+    with scoring_config_path(path).open("rb") as handle:
+        return parse_scoring_config(tomllib.load(handle))
+
+
+def _source_values(index: CatalogIndex, source: str) -> Optional[np.ndarray]:
+    """Per-row values of a component source, or None if the index lacks it."""
+    if source in index.columns:
+        return index.columns[source]
+    if source in index.product_columns:
+        return product_feature(index, source, slice(None))
+    return None
+
+
+def _compiled_specs(index: CatalogIndex, config: ScoringConfig) -> List[str]:
+    """'name:source:normalize' of the config's components the index can compile."""
+    return [
+        f"{c.name}:{c.source}:{c.normalize}" for c in config.columns
+        if c.source in index.columns or c.source in index.product_columns
+    ]
+
+
+def attach_score_components(index: CatalogIndex, config: ScoringConfig) -> None:
+    """
+    Compile the column components of a formula into the index.
+
+    Stores a C-contiguous (components x rows) float64 matrix under
+    ``index.columns[SCORE_COMPONENTS]`` and the component names under
+    ``index.categories[SCORE_COMPONENTS]``.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to extend in place.
+    config : ScoringConfig
+        Formula to compile.
+    """
+    names, rows = [], []
+    for component in config.columns:
+        values = _source_values(index, component.source)
+        if values is None:
+            continue
+        normalized = NORMALIZATIONS[component.normalize](values.astype(np.float64))
+        names.append(component.name)
+        rows.append(np.nan_to_num(normalized, nan=0.0))
+
+    matrix = np.vstack(rows) if rows else np.zeros((0, index.n_rows))
+    index.columns[SCORE_COMPONENTS] = np.ascontiguousarray(matrix)
+    index.categories[SCORE_COMPONENTS] = np.asarray(names, dtype=object)
+    index.categories[COMPILED_SPECS] = np.asarray(_compiled_specs(index, config), dtype=object)
+
+
+def score_components(index: CatalogIndex, config: Optional[ScoringConfig] = None) -> np.ndarray:
+    """
+    The compiled column components, compiling them when out of date.
+
+    The matrix is (re)compiled when it is missing, when a feature the
+    formula reads was attached after it was compiled, or when it was
+    compiled from a different formula (e.g. a shared index published
+    with another config).
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog index.
+    config : Optional[ScoringConfig]
+        Formula; defaults to ``load_scoring_config()``.
+
+    Returns
+    -------
+    np.ndarray
+        (components x rows) matrix; see ``attach_score_components``.
+    """
+    config = load_scoring_config() if config is None else config
+    compiled = index.categories.get(COMPILED_SPECS)
+    if (SCORE_COMPONENTS not in index.columns or compiled is None
+            or list(compiled) != _compiled_specs(index, config)):
+        attach_score_components(index, config)
+    return index.columns[SCORE_COMPONENTS]
+
+
+def component_row(index: CatalogIndex, name: str) -> Optional[np.ndarray]:
+    """
+    One compiled component over all rows.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index with compiled components.
+    name : str
+        Component label, e.g. 'value'.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        The component's normalized values, or None if the formula has no
+        such component or its source is missing.
+    """
+    names = list(index.categories.get(SCORE_COMPONENTS, []))
+    if name not in names:
+        return None
+    return index.columns[SCORE_COMPONENTS][names.index(name)]
+
+
+def resolve_weight(weight: Weight, prefs: UserPreferences) -> float:
+    """
+    Numeric value of a component weight for a request.
+
+    Parameters
+    ----------
+    weight : Weight
+        UserPreferences field name, or a fixed number.
+    prefs : UserPreferences
+        Request preferences.
+
+    Returns
+    -------
+    float
+        The weight.
+    """
+    if isinstance(weight, str):
+        return float(getattr(prefs, weight))
+    return float(weight)
+
+
+def column_weights(index: CatalogIndex, config: ScoringConfig, prefs: UserPreferences) -> np.ndarray:
+    """
+    Weight vector matching the rows of the compiled matrix.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index with compiled components.
+    config : ScoringConfig
+        Formula to weight by; see ``score_components``.
+    prefs : UserPreferences
+        Request preferences.
+
+    Returns
+    -------
+    np.ndarray
+        One float weight per compiled component; 0 for components the
+        formula does not define.
+    """
+    by_name = {component.name: component.weight for component in config.columns}
+    return np.array([resolve_weight(by_name[name], prefs) if name in by_name else 0.0
+                     for name in index.categories[SCORE_COMPONENTS]], dtype=np.float64)
+
+
+def assign_variant(
+    user_id: str,
+    variants: Sequence[ScoringVariant],
+    salt: str = "",
+) -> ScoringVariant:
+    """
+    Pick the variant a user is served.
+
+    The salted SHA-1 of the user id is mapped to [0, 1) and matched
+    against the cumulative shares, so assignment is stable across
+    processes and restarts.
+
+    Parameters
+    ----------
+    user_id : str
+        Stable user identifier.
+    variants : Sequence[ScoringVariant]
+        Experiment arms, at least one.
+    salt : str
+        Experiment salt (see ``ScoringConfig.experiment_salt``).
+
+    Returns
+    -------
+    ScoringVariant
+        The user's variant.
+    """
+    digest = hashlib.sha1(f"{salt}:{user_id}".encode("utf-8")).digest()
+    point = int.from_bytes(digest[:8], "big") / 2.0 ** 64
+    shares = np.cumsum([variant.share for variant in variants])
+    position = int(np.searchsorted(shares / shares[-1], point, side="right"))
+    return variants[min(position, len(variants) - 1)]
+
+
+def variant_preferences(prefs: UserPreferences, variant: ScoringVariant) -> UserPreferences:
+    """
+    Apply a variant's weight overrides to a request.
+
+    Parameters
+    ----------
+    prefs : UserPreferences
+        Request preferences.
+    variant : ScoringVariant
+        Variant to apply.
+
+    Returns
+    -------
+    UserPreferences
+        A copy with the overridden weights.
+    """
+    return replace(prefs, **variant.weights) if variant.weights else prefs
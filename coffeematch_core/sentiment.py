@@ -0,0 +1,248 @@
+"""
+Lexicon-based sentiment scoring of review text, run at prep time.
+
+Reviews only carry a coarse 'liked'/'disliked' label. This module scores
+the free text with a small coffee-aware lexicon, entirely on CPU and in
+vectorized batches: texts are tokenized column-wise, exploded into one
+token per row, looked up in the lexicon and summed back per review.
+Scores are cached by review hash, so re-running the prep pipeline only
+scores reviews it has not seen, and are rolled up into per-product
+features the ranker can weight. Cached scores are tagged with a hash of
+the lexicon and negation list, so editing either re-scores everything.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import PROCESSED_DIR, product_key_by_name
+
+
+SENTIMENT_CACHE_PATH = PROCESSED_DIR / "sentiment_cache.csv"
+PRODUCT_SENTIMENT_PATH = PROCESSED_DIR / "product_sentiment.csv"
+
+# Reviews scored per batch; bounds the size of the exploded token frame.
+BATCH_SIZE = 50_000
+
+# Pseudo-reviews of neutral sentiment added per product, so products
+# with one glowing review do not outrank well-reviewed staples.
+PRIOR_STRENGTH = 5.0
+
+LEXICON: Dict[str, float] = {
+    # positive
+    "amazing": 3.0, "awesome": 3.0, "best": 3.0, "delicious": 3.0,
+    "excellent": 3.0, "fantastic": 3.0, "favorite": 3.0, "favourite": 3.0,
+    "love": 3.0, "loved": 3.0, "perfect": 3.0, "wonderful": 3.0,
+    "delightful": 2.5, "great": 2.5, "outstanding": 2.5, "superb": 2.5,
+    "enjoy": 2.0, "enjoyed": 2.0, "good": 2.0, "lovely": 2.0, "nice": 2.0,
+    "rich": 1.5, "smooth": 1.5, "balanced": 1.5, "sweet": 1.0, "bright": 1.0,
+    "refreshing": 1.5, "recommend": 2.0, "like": 1.0, "liked": 1.5,
+    "tasty": 2.0, "yum": 2.0, "complex": 1.0, "clean": 1.0,
+    # negative
+    "awful": -3.0, "terrible": -3.0, "horrible": -3.0, "worst": -3.0,
+    "disgusting": -3.0, "undrinkable": -3.0, "bad": -2.5, "disappointing": -2.5,
+    "disappointed": -2.5, "burnt": -2.0, "burned": -2.0, "stale": -2.0,
+    "bitter": -1.5, "sour": -1.5, "flat": -1.5, "weak": -1.5, "bland": -1.5,
+    "boring": -1.5, "harsh": -1.5, "acidic": -1.0, "thin": -1.0, "watery": -1.5,
+    "meh": -1.0, "dislike": -2.0, "unfortunately": -1.0, "overpriced": -1.5,
+}
+
+NEGATIONS = {"not", "no", "never", "isn't", "wasn't", "don't", "didn't",
+             "doesn't", "nothing", "hardly"}
+
+# Scales raw lexicon sums into (-1, 1), as in VADER.
+_NORMALIZATION_ALPHA = 15.0
+
+
+def score_texts(texts: pd.Series) -> np.ndarray:
+    """
+    Score review texts in one vectorized pass.
+
+    A lexicon hit directly after a negation word has its sign flipped.
+    The per-review sum ``s`` is normalized to ``s / sqrt(s^2 + 15)``.
+
+    Parameters
+    ----------
+    texts : pd.Series
+        Review texts; missing values are allowed.
+
+    Returns
+    -------
+    np.ndarray
+        Score in (-1, 1) per text, NaN where the text is missing.
+    """
+    tokens = (
+        texts.reset_index(drop=True).astype("string").str.lower()
+        .str.findall(r"[a-z']+")
+        .explode()
+    )
+    tokens = tokens[tokens.notna()]
+
+    weights = tokens.map(LEXICON).fillna(0.0).to_numpy(dtype=np.float64, copy=True)
+    owner = tokens.index.to_numpy()
+    negated = np.zeros(len(tokens), dtype=bool)
+    negated[1:] = tokens.isin(NEGATIONS).to_numpy()[:-1] & (owner[1:] == owner[:-1])
+    weights[negated] *= -1
+
+    raw = np.bincount(owner, weights=weights, minlength=len(texts))
+    scores = raw / np.sqrt(raw * raw + _NORMALIZATION_ALPHA)
+    scores[texts.isna().to_numpy()] = np.nan
+    return scores
+
+
+def model_version() -> str:
+    """
+    Fingerprint of the scoring model (lexicon, negations, normalization).
+
+    Returns
+    -------
+    str
+        Short hex digest; changes whenever any of them is edited.
+    """
+    model = json.dumps([sorted(LEXICON.items()), sorted(NEGATIONS), _NORMALIZATION_ALPHA])
+    return hashlib.sha1(model.encode("utf-8")).hexdigest()[:12]
+
+
+def review_hashes(reviews_df: pd.DataFrame) -> np.ndarray:
+    """
+    Stable 64-bit hash per review, used as the cache key.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Reviews with product_name, date and review_text.
+
+    Returns
+    -------
+    np.ndarray
+        uint64 hash per review.
+    """
+    return pd.util.hash_pandas_object(
+        reviews_df[["product_name", "date", "review_text"]].fillna(""),
+        index=False,
+    ).to_numpy()
+
+
+def load_sentiment_cache(
+    path: Path = SENTIMENT_CACHE_PATH,
+    version: Optional[str] = None,
+) -> pd.Series:
+    """
+    Load cached scores keyed by review hash.
+
+    Parameters
+    ----------
+    path : Path
+        Cache CSV with review_hash, sentiment_score and model_version
+        columns.
+    version : Optional[str]
+        Model version the scores must have been computed with; defaults
+        to the current ``model_version()``. Other scores are dropped.
+
+    Returns
+    -------
+    pd.Series
+        Scores indexed by uint64 hash (empty if there is no usable cache).
+    """
+    empty = pd.Series(dtype=np.float64, index=pd.Index([], dtype=np.uint64))
+    if not path.exists():
+        return empty
+    cache = pd.read_csv(path, dtype={"review_hash": np.uint64, "model_version": str})
+    if "model_version" not in cache.columns:
+        return empty
+    cache = cache[cache["model_version"] == (version or model_version())]
+    return cache.set_index("review_hash")["sentiment_score"]
+
+
+def score_reviews(
+    reviews_df: pd.DataFrame,
+    cache_path: Path = SENTIMENT_CACHE_PATH,
+) -> np.ndarray:
+    """
+    Score every review, reusing cached scores for reviews seen before.
+
+    New reviews are scored in batches of ``BATCH_SIZE`` and appended to
+    the cache. Scores from an older lexicon are discarded and recomputed.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+    cache_path : Path
+        Location of the score cache.
+
+    Returns
+    -------
+    np.ndarray
+        Sentiment score per review, aligned with ``reviews_df``.
+    """
+    hashes = review_hashes(reviews_df)
+    version = model_version()
+    cache = load_sentiment_cache(cache_path, version)
+
+    is_new = ~np.isin(hashes, cache.index.to_numpy())
+    new_positions = np.flatnonzero(is_new)
+    new_scores = np.empty(len(new_positions))
+    texts = reviews_df["review_text"]
+    for start in range(0, len(new_positions), BATCH_SIZE):
+        batch = new_positions[start:start + BATCH_SIZE]
+        new_scores[start:start + BATCH_SIZE] = score_texts(texts.iloc[batch])
+
+    if len(new_positions):
+        additions = pd.Series(new_scores, index=pd.Index(hashes[is_new], dtype=np.uint64))
+        cache = pd.concat([cache, additions[~additions.index.duplicated()]])
+        (cache.rename("sentiment_score").rename_axis("review_hash").reset_index()
+         .assign(model_version=version).to_csv(cache_path, index=False))
+
+    return cache.reindex(hashes).to_numpy()
+
+
+def product_sentiment_features(
+    reviews_df: pd.DataFrame,
+    scores: np.ndarray,
+    products_df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Roll review scores up into per-product features.
+
+    Reviews are matched to products by product_name. The mean score is
+    shrunk toward neutral by ``PRIOR_STRENGTH`` pseudo-reviews and
+    rescaled to 0..1, so products without reviews sit at a neutral 0.5.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews.
+    scores : np.ndarray
+        Output of ``score_reviews``.
+    products_df : pd.DataFrame
+        Cleaned products with product_key.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key, sentiment_score (0..1) and sentiment_reviews for
+        every product.
+    """
+    key_by_name = product_key_by_name(products_df)
+    scored = pd.DataFrame({
+        "product_key": reviews_df["product_name"].map(key_by_name),
+        "score": scores,
+    }).dropna()
+
+    all_keys = pd.Index(products_df["product_key"].unique(), name="product_key")
+    grouped = (
+        scored.groupby("product_key")["score"].agg(["sum", "count"])
+        .reindex(all_keys, fill_value=0)
+    )
+    shrunk = grouped["sum"] / (grouped["count"] + PRIOR_STRENGTH)
+
+    return pd.DataFrame({
+        "product_key": all_keys,
+        "sentiment_score": ((shrunk + 1.0) / 2.0).round(4).to_numpy(),
+        "sentiment_reviews": grouped["count"].astype(int).to_numpy(),
+    })
@@ -0,0 +1,230 @@
+"""
+Shares one copy of the catalog index between app worker processes.
+
+A loader process builds the ``CatalogIndex`` once and copies every array
+into a single ``multiprocessing.shared_memory`` segment. Workers attach
+to the segment by name and get read-only NumPy views over it, so the
+catalog is not duplicated per worker.
+
+Segment layout: an 8-byte little-endian manifest length, a JSON manifest
+describing each array (group, name, dtype, shape, offset), then the
+array data, each array aligned to 64 bytes. Category labels are stored
+as fixed-width unicode arrays so they can live in the segment too.
+
+Typical deployment:
+    python -m coffeematch_core.shared_catalog --name coffeematch &
+    COFFEEMATCH_SHARED_CATALOG=coffeematch streamlit run streamlit_poc.py
+"""
+
+import argparse
+import json
+import os
+import signal
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from coffeematch_core.catalog import (
+    PRODUCTS_PATH,
+    CatalogIndex,
+    load_catalog_index,
+)
+from coffeematch_core.scoring import score_components
+
+
+DEFAULT_SEGMENT_NAME = "coffeematch"
+SHARED_CATALOG_ENV = "COFFEEMATCH_SHARED_CATALOG"
+
+_HEADER = struct.Struct("<Q")
+_ALIGNMENT = 64
+
+# Segments attached by this process; keeps the mappings alive.
+_ATTACHED: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the array alignment."""
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _iter_arrays(index: CatalogIndex) -> List[Tuple[str, str, np.ndarray]]:
+    """List every array of the index as (group, name, array)."""
+    arrays = [("offsets", "product_offsets", index.product_offsets)]
+    arrays += [("columns", k, v) for k, v in index.columns.items()]
+    arrays += [("product_columns", k, v) for k, v in index.product_columns.items()]
+    arrays += [("list_offsets", k, v) for k, v in index.list_offsets.items()]
+    arrays += [("list_codes", k, v) for k, v in index.list_codes.items()]
+    arrays += [("filter_stats", k, v) for k, v in index.filter_stats.items()]
+    arrays += [
+        ("categories", k, np.asarray(v, dtype=str))
+        for k, v in index.categories.items()
+    ]
+    return [(group, name, np.ascontiguousarray(arr)) for group, name, arr in arrays]
+
+
+def publish_catalog(
+    index: CatalogIndex,
+    name: str = DEFAULT_SEGMENT_NAME,
+) -> shared_memory.SharedMemory:
+    """
+    Copy a catalog index into a new shared memory segment.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Index to publish.
+    name : str
+        Segment name workers will attach to.
+
+    Returns
+    -------
+    shared_memory.SharedMemory
+        The segment. The caller owns it and must ``unlink`` it on exit.
+    """
+    arrays = _iter_arrays(index)
+
+    manifest = []
+    data_offset = 0
+    for group, key, arr in arrays:
+        data_offset = _align(data_offset)
+        manifest.append({
+            "group": group,
+            "name": key,
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": data_offset,
+        })
+        data_offset += arr.nbytes
+
+    manifest_bytes = json.dumps(manifest).encode("utf-8")
+    data_start = _align(_HEADER.size + len(manifest_bytes))
+
+    segment = shared_memory.SharedMemory(
+        name=name, create=True, size=max(1, data_start + data_offset)
+    )
+    _HEADER.pack_into(segment.buf, 0, len(manifest_bytes))
+    segment.buf[_HEADER.size:_HEADER.size + len(manifest_bytes)] = manifest_bytes
+
+    for entry, (_, _, arr) in zip(manifest, arrays):
+        target = np.ndarray(arr.shape, dtype=arr.dtype, buffer=segment.buf,
+                            offset=data_start + entry["offset"])
+        target[...] = arr
+
+    return segment
+
+
+def _open_segment(name: str) -> shared_memory.SharedMemory:
+    """Attach to a segment without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment with the resource
+        # tracker, which would destroy it when this worker exits.
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")  # pylint: disable=protected-access
+        return segment
+
+
+def attach_catalog(name: str = DEFAULT_SEGMENT_NAME) -> CatalogIndex:
+    """
+    Attach to a published catalog as zero-copy, read-only views.
+
+    Parameters
+    ----------
+    name : str
+        Segment name used by ``publish_catalog``.
+
+    Returns
+    -------
+    CatalogIndex
+        Index whose arrays point into the shared segment.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no segment with that name exists.
+    """
+    segment = _ATTACHED.get(name) or _open_segment(name)
+    _ATTACHED[name] = segment
+
+    (manifest_len,) = _HEADER.unpack_from(segment.buf, 0)
+    manifest = json.loads(
+        bytes(segment.buf[_HEADER.size:_HEADER.size + manifest_len])
+    )
+    data_start = _align(_HEADER.size + manifest_len)
+
+    groups: Dict[str, Dict[str, np.ndarray]] = {
+        "offsets": {}, "columns": {}, "product_columns": {}, "categories": {},
+        "list_offsets": {}, "list_codes": {}, "filter_stats": {},
+    }
+    for entry in manifest:
+        view = np.ndarray(tuple(entry["shape"]), dtype=np.dtype(entry["dtype"]),
+                          buffer=segment.buf, offset=data_start + entry["offset"])
+        view.flags.writeable = False
+        groups[entry["group"]][entry["name"]] = view
+
+    return CatalogIndex(
+        columns=groups["columns"],
+        categories=groups["categories"],
+        product_offsets=groups["offsets"]["product_offsets"],
+        product_columns=groups["product_columns"],
+        list_offsets=groups["list_offsets"],
+        list_codes=groups["list_codes"],
+        filter_stats=groups["filter_stats"],
+    )
+
+
+def open_catalog_index() -> CatalogIndex:
+    """
+    Attach to the shared catalog if one is configured, else load locally.
+
+    The segment name comes from the COFFEEMATCH_SHARED_CATALOG
+    environment variable.
+
+    Returns
+    -------
+    CatalogIndex
+        Shared or process-local index.
+    """
+    name = os.environ.get(SHARED_CATALOG_ENV)
+    if name:
+        return attach_catalog(name)
+    return load_catalog_index()
+
+
+def _stop(signum, frame):  # pylint: disable=unused-argument
+    """Turn SIGTERM into the same shutdown path as Ctrl-C."""
+    raise KeyboardInterrupt
+
+
+def main() -> None:
+    """Publish the catalog and keep the segment alive until terminated."""
+    parser = argparse.ArgumentParser(
+        description="Publish the CoffeeMatch catalog to shared memory."
+    )
+    parser.add_argument("--name", default=DEFAULT_SEGMENT_NAME)
+    parser.add_argument("--products", default=str(PRODUCTS_PATH))
+    args = parser.parse_args()
+
+    index = load_catalog_index(args.products)
+    # Compile the scoring matrix here so workers share it instead of
+    # each building its own.
+    score_components(index)
+    segment = publish_catalog(index, args.name)
+    print(f"Published catalog to shared memory '{args.name}' "
+          f"({segment.size / 1e6:.1f} MB). Ctrl-C to stop.")
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic catalogs for benchmarks and performance tests.
+
+The generated frames follow the processed products schema, so they can
+be fed to ``build_catalog_index`` exactly like products_clean.csv.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.schemas import UserPreferences
+
+
+ROAST_TYPES = [
+    "Light Roast",
+    "Light-Medium Roast",
+    "Medium Roast",
+    "Medium-Dark Roast",
+    "Dark Roast",
+    "Unspecified",
+]
+ROAST_CHOICES = [None, "Light", "Medium", "Dark"]
+ORIGINS = [
+    "Unspecified",
+    "Ethiopia",
+    "Colombia",
+    "Guatemala",
+    "Kenya",
+    "El Salvador",
+    "Peru",
+    "Sumatra",
+]
+SIZES_OZ = [10, 12, 32, 80]
+
+
+def make_synthetic_products(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a products DataFrame with roughly ``n_rows`` size rows.
+
+    Parameters
+    ----------
+    n_rows : int
+        Target number of product/size rows.
+    seed : int
+        Random seed, so runs are reproducible.
+
+    Returns
+    -------
+    pd.DataFrame
+        Frame with the processed products columns and product_key.
+    """
+    rng = np.random.default_rng(seed)
+
+    # 1-3 sizes per product; draw more products than needed and truncate.
+    sizes_per_product = rng.integers(1, 4, max(1, n_rows))
+    product_id = np.repeat(np.arange(len(sizes_per_product)),
+                           sizes_per_product)[:n_rows]
+    n_products = int(product_id[-1]) + 1
+    n_rows = len(product_id)
+    first_row = np.searchsorted(product_id, np.arange(n_products))
+    size_position = np.arange(n_rows) - first_row[product_id]
+
+    roaster = np.array([f"Roaster {i}" for i in range(max(1, n_products // 20))],
+                       dtype=object)
+    roaster_of = rng.integers(0, len(roaster), n_products)
+    roast_of = rng.integers(0, len(ROAST_TYPES), n_products)
+    origin_of = rng.integers(0, len(ORIGINS), n_products)
+    total_reviews_of = rng.poisson(40, n_products) * rng.integers(0, 2, n_products)
+    heart_pct_of = np.where(total_reviews_of > 0,
+                            rng.uniform(40, 100, n_products).round(1), 0.0)
+    base_ppo_of = rng.lognormal(np.log(1.4), 0.25, n_products)
+    single_origin_of = rng.random(n_products) < 0.5
+
+    size_shift = rng.integers(0, 2, n_products)[product_id]
+    size_oz = np.array(SIZES_OZ)[size_position + size_shift]
+    bulk_discount = np.where(size_oz > 16, 0.8, 1.0)
+    price_per_oz = (base_ppo_of[product_id] * bulk_discount).round(2)
+    names = np.char.add("Coffee ", product_id.astype(str)).astype(object)
+
+    df = pd.DataFrame({
+        "roaster": roaster[roaster_of[product_id]],
+        "product_name": names,
+        "origin": np.array(ORIGINS, dtype=object)[origin_of[product_id]],
+        "roast_type": np.array(ROAST_TYPES, dtype=object)[roast_of[product_id]],
+        "size": np.char.add(size_oz.astype(str), "oz").astype(object),
+        "price": (price_per_oz * size_oz).round(2),
+        "hearts": (total_reviews_of * heart_pct_of / 100).astype(int)[product_id],
+        "total_reviews": total_reviews_of[product_id],
+        "heart_percentage": heart_pct_of[product_id],
+        "decaf": (rng.random(n_products) < 0.1)[product_id],
+        "blend": ~single_origin_of[product_id],
+        "available_ground": (rng.random(n_products) < 0.6)[product_id],
+        "single_origin": single_origin_of[product_id],
+        "url": np.char.add("/products/coffee-", product_id.astype(str)).astype(object),
+        "has_reviews": (total_reviews_of > 0)[product_id],
+        "price_numeric": (price_per_oz * size_oz).round(2),
+        "size_oz": size_oz,
+        "price_per_oz": price_per_oz,
+    })
+    df["product_key"] = df["roaster"] + " | " + df["product_name"]
+    return df
+
+
+def make_synthetic_preferences(n: int, seed: int = 0) -> List[UserPreferences]:
+    """
+    Generate a corpus of varied user preferences for offline evaluation.
+
+    Only the roast, price and popularity components are set, so every
+    scorer implementation can be compared on the same inputs.
+
+    Parameters
+    ----------
+    n : int
+        Number of preference sets.
+    seed : int
+        Random seed, so runs are reproducible.
+
+    Returns
+    -------
+    List[UserPreferences]
+        Preference sets with random filters and normalized weights.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(3), n).round(2)
+    tristate = [None, True, False]
+
+    return [
+        UserPreferences(
+            roast_type=ROAST_CHOICES[rng.integers(len(ROAST_CHOICES))],
+            max_price_per_oz=(round(float(rng.uniform(0.8, 3.0)), 2)
+                              if rng.random() < 0.4 else None),
+            decaf=tristate[rng.integers(3)],
+            ground_required=bool(rng.random() < 0.3),
+            single_origin_preference=bool(rng.random() < 0.2),
+            roast_weight=float(weights[i, 0]),
+            price_weight=float(weights[i, 1]),
+            popularity_weight=float(weights[i, 2]),
+        )
+        for i in range(n)
+    ]
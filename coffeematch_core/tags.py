@@ -0,0 +1,194 @@
+"""
+Product tags, tasting notes and the precomputed UI option lists.
+
+Raw products carry a comma-separated 'tags' string per row, and reviews
+a comma-separated 'tasting_notes' string. At prep time both are cleaned
+once into long product_key/value tables, then interned: each distinct
+value gets an integer id and every product's values become one slice of
+a flat int32 array (CSR offsets per product), saved to product_lists.npz.
+The engine scores overlaps with ``np.isin`` over the flat array instead
+of building a Python set per product.
+
+Every list a front end offers (roast types, tags, tasting notes,
+origins, brewing methods, price range) is written to options.json, so
+apps never scan the catalog to build their controls.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.brewing import BREWING_METHODS
+from coffeematch_core.catalog import (
+    OPTIONS_PATH,
+    PRODUCT_LISTS_PATH,
+    intern_product_list,
+    product_key_by_name,
+)
+
+
+def _clean_labels(values: pd.Series) -> pd.Series:
+    """Strip, lowercase and collapse whitespace; drop empty values."""
+    values = values.str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+    return values[values.fillna("") != ""]
+
+
+def product_tags_table(products_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean the raw tags into one row per (product, tag).
+
+    Tags are stripped, lowercased and whitespace-collapsed, so
+    'Dark  Roast' and 'dark roast' are the same tag.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Products with product_key and the raw 'tags' column.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key and tag, sorted and without duplicates.
+    """
+    tags = _clean_labels(
+        products_df.set_index("product_key")["tags"].astype("string")
+        .str.replace(r"[\[\]'\"]", "", regex=True)
+        .str.split(r"[,;]").explode()
+    )
+    table = tags.rename("tag").reset_index().astype({"product_key": str, "tag": str})
+    return table.drop_duplicates().sort_values(["product_key", "tag"]).reset_index(drop=True)
+
+
+def product_notes_table(reviews_df: pd.DataFrame, products_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collect the tasting notes reviewers mention into one row per (product, note).
+
+    Reviews name products by product_name; names that are not in the
+    catalog are dropped. Notes are cleaned like tags.
+
+    Parameters
+    ----------
+    reviews_df : pd.DataFrame
+        Cleaned reviews with product_name and tasting_notes.
+    products_df : pd.DataFrame
+        Cleaned products with product_key and product_name.
+
+    Returns
+    -------
+    pd.DataFrame
+        product_key and note, sorted and without duplicates.
+    """
+    key_by_name = product_key_by_name(products_df)
+    reviews = reviews_df.assign(product_key=reviews_df["product_name"].map(key_by_name))
+    notes = _clean_labels(
+        reviews.dropna(subset=["product_key"]).set_index("product_key")["tasting_notes"]
+        .astype("string").str.split(",").explode()
+    )
+    table = notes.rename("note").reset_index().astype({"product_key": str, "note": str})
+    return table.drop_duplicates().sort_values(["product_key", "note"]).reset_index(drop=True)
+
+
+def save_product_lists(
+    products_df: pd.DataFrame,
+    tables: Dict[str, pd.DataFrame],
+    path: Path = PRODUCT_LISTS_PATH,
+) -> None:
+    """
+    Intern per-product lists and save them as CSR arrays.
+
+    For each list ``name`` the file holds ``<name>_offsets`` (int64, one
+    more than the number of products), ``<name>_codes`` (int32) and
+    ``<name>_labels``, next to the sorted ``product_keys`` the offsets
+    refer to. ``catalog.attach_product_lists`` loads it.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products with product_key.
+    tables : Dict[str, pd.DataFrame]
+        List name -> long table with product_key and a column of that
+        name, e.g. ``{"tag": product_tags_table(...)}``.
+    path : Path
+        Destination .npz file.
+    """
+    product_keys = np.sort(products_df["product_key"].astype(str).unique())
+    arrays = {"product_keys": product_keys.astype(str), "names": np.asarray(list(tables), dtype=str)}
+    for name, table in tables.items():
+        offsets, codes, labels = intern_product_list(product_keys, table, name)
+        arrays[f"{name}_offsets"] = offsets
+        arrays[f"{name}_codes"] = codes
+        arrays[f"{name}_labels"] = labels.astype(str)
+    np.savez_compressed(path, **arrays)
+
+
+def build_options(
+    products_df: pd.DataFrame,
+    tags_df: pd.DataFrame,
+    notes_df: pd.DataFrame,
+) -> Dict[str, object]:
+    """
+    Collect the option lists the front ends show.
+
+    Parameters
+    ----------
+    products_df : pd.DataFrame
+        Cleaned products.
+    tags_df : pd.DataFrame
+        Output of ``product_tags_table``.
+    notes_df : pd.DataFrame
+        Output of ``product_notes_table``.
+
+    Returns
+    -------
+    Dict[str, object]
+        'roast_types', 'tags', 'tasting_notes', 'origins' and
+        'brewing_methods' (sorted lists) and 'price_per_oz' (min/max).
+    """
+    def labels(series: pd.Series) -> List[str]:
+        return sorted(str(v) for v in series.dropna().unique() if str(v).strip())
+
+    return {
+        "roast_types": labels(products_df["roast_type"]),
+        "tags": labels(tags_df["tag"]),
+        "tasting_notes": labels(notes_df["note"]),
+        "origins": labels(products_df["origin"]),
+        "brewing_methods": list(BREWING_METHODS),
+        "price_per_oz": {
+            "min": round(float(products_df["price_per_oz"].min()), 2),
+            "max": round(float(products_df["price_per_oz"].max()), 2),
+        },
+    }
+
+
+def save_options(options: Dict[str, object], path: Path = OPTIONS_PATH) -> None:
+    """
+    Write option lists as JSON.
+
+    Parameters
+    ----------
+    options : Dict[str, object]
+        Output of ``build_options``.
+    path : Path
+        Destination file.
+    """
+    path.write_text(json.dumps(options, indent=2) + "\n", encoding="utf-8")
+
+
+def load_options(path: Path = OPTIONS_PATH) -> Dict[str, object]:
+    """
+    Read the option lists written at prep time.
+
+    Parameters
+    ----------
+    path : Path
+        Location of options.json.
+
+    Returns
+    -------
+    Dict[str, object]
+        Option lists, see ``build_options``.
+    """
+    return json.loads(path.read_text(encoding="utf-8"))
@@ -0,0 +1,365 @@
+"""
+Vectorized schema validation for the processed CoffeeMatch datasets.
+
+The column lists in ``schemas.py`` describe *which* columns must exist.
+This module attaches a type/range contract to each of those columns and
+compiles the contracts into checks that run directly on the column
+arrays, so a whole frame is validated in a single pass without per-row
+Python code. The result is a compact ``ValidationReport`` that can be
+printed or raised during data preparation.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.schemas import (
+    PRODUCT_REQUIRED_COLUMNS,
+    REVIEW_REQUIRED_COLUMNS,
+)
+
+
+MAX_SAMPLE_ROWS = 5
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a DataFrame does not satisfy its column contract."""
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    Contract for a single column.
+
+    Attributes
+    ----------
+    dtype : str
+        One of 'str', 'float', 'int', 'bool' or 'date'.
+    nullable : bool
+        Whether missing values are allowed.
+    min_value : Optional[float]
+        Lower bound for numeric columns.
+    max_value : Optional[float]
+        Upper bound for numeric columns.
+    min_exclusive : bool
+        Whether ``min_value`` itself is rejected (e.g. prices must be > 0).
+    allowed_values : Optional[Tuple[str, ...]]
+        Closed set of permitted values for categorical string columns.
+    date_format : Optional[str]
+        strftime format that 'date' columns must parse with.
+    """
+
+    dtype: str
+    nullable: bool = False
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    min_exclusive: bool = False
+    allowed_values: Optional[Tuple[str, ...]] = None
+    date_format: Optional[str] = None
+
+
+PRODUCT_COLUMN_SPECS: Dict[str, ColumnSpec] = {
+    "roaster": ColumnSpec("str"),
+    "product_name": ColumnSpec("str"),
+    "origin": ColumnSpec("str"),
+    "roast_type": ColumnSpec("str"),
+    "size": ColumnSpec("str"),
+    "size_oz": ColumnSpec("float", min_value=0, min_exclusive=True),
+    "price_numeric": ColumnSpec("float", min_value=0, min_exclusive=True),
+    "price_per_oz": ColumnSpec("float", min_value=0, min_exclusive=True),
+    "hearts": ColumnSpec("int", min_value=0),
+    "total_reviews": ColumnSpec("int", min_value=0),
+    "heart_percentage": ColumnSpec("float", min_value=0, max_value=100),
+    "has_reviews": ColumnSpec("bool"),
+    "decaf": ColumnSpec("bool"),
+    "blend": ColumnSpec("bool"),
+    "single_origin": ColumnSpec("bool"),
+    "available_ground": ColumnSpec("bool"),
+    "url": ColumnSpec("str", nullable=True),
+    "product_key": ColumnSpec("str"),
+}
+
+REVIEW_COLUMN_SPECS: Dict[str, ColumnSpec] = {
+    "product_name": ColumnSpec("str"),
+    "sentiment": ColumnSpec("str", allowed_values=("liked", "disliked")),
+    "brewing_method": ColumnSpec("str", nullable=True),
+    "review_text": ColumnSpec("str", nullable=True),
+    "date": ColumnSpec("date", date_format="%m/%d/%Y"),
+    "tasting_notes": ColumnSpec("str", nullable=True),
+}
+
+# Composite keys that must be unique, e.g. one row per product and size.
+PRODUCT_UNIQUE_KEYS: List[Tuple[str, ...]] = [("product_key", "size")]
+
+
+@dataclass
+class Violation:
+    """
+    One failed rule, aggregated over all offending rows.
+    """
+
+    column: str
+    rule: str
+    count: int
+    sample_rows: List[int] = field(default_factory=list)
+
+
+@dataclass
+class ValidationReport:
+    """
+    Outcome of validating one DataFrame against its column contract.
+    """
+
+    name: str
+    n_rows: int
+    violations: List[Violation] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Whether every rule passed."""
+        return not self.violations
+
+    def summary(self) -> str:
+        """
+        Format the report as a short, human-readable table.
+
+        Returns
+        -------
+        str
+            One line per violated rule, or a single 'OK' line.
+        """
+        if self.ok:
+            return f"{self.name}: OK ({self.n_rows} rows)"
+
+        lines = [f"{self.name}: {len(self.violations)} rule(s) violated "
+                 f"({self.n_rows} rows)"]
+        for violation in self.violations:
+            lines.append(
+                f"  {violation.column:<20} {violation.rule:<24} "
+                f"{violation.count:>7} rows  e.g. {violation.sample_rows}"
+            )
+        return "\n".join(lines)
+
+    def raise_if_invalid(self) -> None:
+        """
+        Raise if any rule was violated.
+
+        Raises
+        ------
+        SchemaValidationError
+            If the report contains violations.
+        """
+        if not self.ok:
+            raise SchemaValidationError(self.summary())
+
+
+# A compiled check maps a column array to a boolean "is invalid" mask.
+CompiledCheck = Tuple[str, Callable[[pd.Series], np.ndarray]]
+
+
+def _dtype_check(spec: ColumnSpec) -> CompiledCheck:
+    """Build the dtype rule; it flags the whole column when it fails."""
+    predicates = {
+        "str": lambda s: pd.api.types.is_string_dtype(s) or s.dtype == object,
+        "float": pd.api.types.is_numeric_dtype,
+        "int": pd.api.types.is_integer_dtype,
+        "bool": pd.api.types.is_bool_dtype,
+        "date": lambda s: pd.api.types.is_string_dtype(s) or s.dtype == object,
+    }
+    predicate = predicates[spec.dtype]
+
+    def check(series: pd.Series) -> np.ndarray:
+        return np.full(len(series), not predicate(series))
+
+    return f"dtype={spec.dtype}", check
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    """The column as numbers; unparseable values become NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def compile_column_checks(spec: ColumnSpec) -> List[CompiledCheck]:
+    """
+    Compile a column contract into a list of vectorized checks.
+
+    Parameters
+    ----------
+    spec : ColumnSpec
+        Contract for one column.
+
+    Returns
+    -------
+    List[CompiledCheck]
+        ``(rule_name, check)`` pairs. Each check takes the column and
+        returns a boolean mask of offending rows.
+    """
+    checks = [_dtype_check(spec)]
+
+    if not spec.nullable:
+        checks.append(("not_null", lambda s: s.isna().to_numpy()))
+
+    if spec.dtype in ("float", "int"):
+        # Compared as numbers, so a column that picked up stray strings is
+        # reported by the dtype rule rather than raising a TypeError here;
+        # values that do not parse are not counted again.
+        if spec.min_value is not None:
+            low = spec.min_value
+            if spec.min_exclusive:
+                checks.append((f"> {low:g}", lambda s: (_numeric(s) <= low).to_numpy()))
+            else:
+                checks.append((f">= {low:g}", lambda s: (_numeric(s) < low).to_numpy()))
+        if spec.max_value is not None:
+            high = spec.max_value
+            checks.append((f"<= {high:g}", lambda s: (_numeric(s) > high).to_numpy()))
+
+    if spec.allowed_values is not None:
+        allowed = list(spec.allowed_values)
+        checks.append((
+            "allowed_values",
+            lambda s: (s.notna() & ~s.isin(allowed)).to_numpy(),
+        ))
+
+    if spec.date_format is not None:
+        date_format = spec.date_format
+        checks.append((
+            f"date {date_format}",
+            lambda s: (
+                s.notna()
+                & pd.to_datetime(s, format=date_format, errors="coerce").isna()
+            ).to_numpy(),
+        ))
+
+    return checks
+
+
+def compile_schema(
+    required_columns: Sequence[str],
+    specs: Dict[str, ColumnSpec],
+) -> Dict[str, List[CompiledCheck]]:
+    """
+    Compile the contracts for a list of required columns.
+
+    Parameters
+    ----------
+    required_columns : Sequence[str]
+        Column names the frame must contain.
+    specs : Dict[str, ColumnSpec]
+        Contract per column.
+
+    Returns
+    -------
+    Dict[str, List[CompiledCheck]]
+        Compiled checks per column.
+
+    Raises
+    ------
+    KeyError
+        If a required column has no contract.
+    """
+    missing_specs = [col for col in required_columns if col not in specs]
+    if missing_specs:
+        raise KeyError(f"No column contract for: {missing_specs}")
+
+    return {col: compile_column_checks(specs[col]) for col in required_columns}
+
+
+def validate_frame(
+    df: pd.DataFrame,
+    compiled: Dict[str, List[CompiledCheck]],
+    unique_keys: Sequence[Tuple[str, ...]] = (),
+    name: str = "frame",
+) -> ValidationReport:
+    """
+    Run compiled checks against a DataFrame.
+
+    Each column is visited once and all of its rules are evaluated on
+    the same array.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data to validate.
+    compiled : Dict[str, List[CompiledCheck]]
+        Output of ``compile_schema``.
+    unique_keys : Sequence[Tuple[str, ...]]
+        Column combinations that must not repeat.
+    name : str
+        Label used in the report.
+
+    Returns
+    -------
+    ValidationReport
+        All violations found.
+    """
+    report = ValidationReport(name=name, n_rows=len(df))
+
+    for column, checks in compiled.items():
+        if column not in df.columns:
+            report.violations.append(Violation(column, "missing_column", len(df)))
+            continue
+
+        series = df[column]
+        for rule, check in checks:
+            bad = check(series)
+            count = int(bad.sum())
+            if count:
+                sample = np.flatnonzero(bad)[:MAX_SAMPLE_ROWS].tolist()
+                report.violations.append(Violation(column, rule, count, sample))
+
+    for key in unique_keys:
+        if not set(key).issubset(df.columns):
+            continue
+        dup = df.duplicated(subset=list(key), keep="first").to_numpy()
+        count = int(dup.sum())
+        if count:
+            sample = np.flatnonzero(dup)[:MAX_SAMPLE_ROWS].tolist()
+            report.violations.append(
+                Violation("+".join(key), "unique", count, sample)
+            )
+
+    return report
+
+
+_PRODUCT_CHECKS = compile_schema(
+    PRODUCT_REQUIRED_COLUMNS + ["product_key"], PRODUCT_COLUMN_SPECS
+)
+_REVIEW_CHECKS = compile_schema(REVIEW_REQUIRED_COLUMNS, REVIEW_COLUMN_SPECS)
+
+
+def validate_products(df: pd.DataFrame) -> ValidationReport:
+    """
+    Validate a cleaned products DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Products data, one row per product and size.
+
+    Returns
+    -------
+    ValidationReport
+        Violations of ``PRODUCT_COLUMN_SPECS`` and ``PRODUCT_UNIQUE_KEYS``.
+    """
+    return validate_frame(df, _PRODUCT_CHECKS, PRODUCT_UNIQUE_KEYS, "products")
+
+
+def validate_reviews(df: pd.DataFrame) -> ValidationReport:
+    """
+    Validate a cleaned reviews DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Reviews data, one row per review.
+
+    Returns
+    -------
+    ValidationReport
+        Violations of ``REVIEW_COLUMN_SPECS``.
+    """
+    return validate_frame(df, _REVIEW_CHECKS, name="reviews")
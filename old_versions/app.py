@@ -22,11 +22,7 @@ VALUE_WEIGHT = 2.0
 # -----------------------------
 @st.cache_data
 def load_products():
-    df = pd.read_excel(PRODUCTS_PATH)
-
-    df["tags_clean"] = df["tags"].fillna("").apply(
-        lambda x: [t.strip().lower() for t in str(x).split(",") if t.strip()]
-    )
+    df = pd.read_excel(PRODUCTS_PATH).reset_index(drop=True)
 
     df["roast_type"] = df["roast_type"].fillna("Unknown")
     df["origin"] = df["origin"].fillna("Unspecified")
@@ -41,6 +37,20 @@ def load_products():
     return df
 
 
+@st.cache_data
+def load_tags():
+    # Tags interned once: sorted labels, and per product row a slice
+    # codes[offsets[i]:offsets[i + 1]] of one flat int32 array.
+    tags = (
+        load_products()["tags"].astype("string").str.split(",").explode()
+        .str.strip().str.lower()
+    )
+    tags = tags[tags.fillna("") != ""]
+    codes, labels = pd.factorize(tags, sort=True)
+    offsets = np.searchsorted(tags.index.to_numpy(), np.arange(len(load_products()) + 1))
+    return list(labels), offsets, codes.astype(np.int32)
+
+
 @st.cache_data
 def load_reviews():
     try:
@@ -55,6 +65,7 @@ def load_reviews():
 
 
 products = load_products()
+tag_labels, tag_offsets, tag_codes = load_tags()
 reviews = load_reviews()
 
 # -----------------------------
@@ -104,14 +115,9 @@ def score_products(df, prefs):
     # Tag overlap (vectorized)
     if prefs["tags"]:
 
-        overlaps = (
-            df["tags_clean"]
-            .explode()
-            .isin(prefs["tags"])
-            .groupby(level=0)
-            .sum()
-            .reindex(df.index, fill_value=0)
-        )
+        wanted = np.flatnonzero(np.isin(tag_labels, prefs["tags"]))
+        hits = np.concatenate([[0], np.cumsum(np.isin(tag_codes, wanted))])
+        overlaps = pd.Series(hits[tag_offsets[1:]] - hits[tag_offsets[:-1]])[df.index]
 
         TAG_POINTS_PER_MATCH = (prefs["tagImportance"] * 100)/ (prefs["roastImportance"] + prefs["costImportance"] + prefs["tagImportance"])
         print("TAG_POINTS_PER_MATCH:", TAG_POINTS_PER_MATCH)
@@ -183,7 +189,7 @@ with col1:
 
     prefs["tags"] = st.multiselect(
         "Tags (optional)",
-        sorted({tag for tags in products["tags_clean"] for tag in tags})
+        tag_labels
     )
 
     with col2:
@@ -1,8 +1,9 @@
 # app.py (Dash MVP version)
 from __future__ import annotations
 
-import math
-import pandas as pd
+from functools import lru_cache
+import sys
+import threading
 
 from dash import Dash, html, dcc, Input, Output, State, callback
 
@@ -14,172 +15,77 @@ except Exception:
     dbc = None
     BOOTSTRAP = None
 
-DATA_PATH = "data/Product_Information.xlsx"
-
 # -----------------------------
-# Data loading + light cleaning
+# Data: shared core engine
 # -----------------------------
-def to_bool(x) -> bool:
-    if pd.isna(x):
-        return False
-    if isinstance(x, bool):
-        return x
-    s = str(x).strip().lower()
-    return s in {"true", "1", "yes", "y"}
-
-def clean_tags(val):
-    if pd.isna(val):
-        return []
-    if isinstance(val, list):
-        return [str(t).strip() for t in val if str(t).strip()]
-    s = str(val).strip()
-    if s.startswith("[") and s.endswith("]"):
-        s = s.strip("[]")
-    parts = [p.strip(" '\"") for p in s.replace(";", ",").split(",")]
-    return sorted({p for p in parts if p})
-
-def load_products() -> pd.DataFrame:
-    df = pd.read_excel(DATA_PATH)
-    df.columns = [c.strip() for c in df.columns]
-
-    # Ensure key columns exist
-    for col in ["roaster", "product_name", "roast_type", "tags", "url",
-                "price_per_oz", "hearts", "has_reviews", "heart_percentage",
-                "available_ground", "decaf", "origin"]:
-        if col not in df.columns:
-            df[col] = pd.NA
-
-    # Normalize
-    df["roast_type"] = df["roast_type"].astype(str).str.strip().str.lower().replace({"nan": ""})
-    df["available_ground"] = df["available_ground"].apply(to_bool)
-    df["decaf"] = df["decaf"].apply(to_bool)
-    df["has_reviews"] = df["has_reviews"].apply(to_bool)
-
-    df["tags_clean"] = df["tags"].apply(clean_tags)
-
-    # Make sure price is numeric
-    df["price_per_oz"] = pd.to_numeric(df["price_per_oz"], errors="coerce")
-    df["hearts"] = pd.to_numeric(df["hearts"], errors="coerce").fillna(0)
-
-    # heart_percentage can be missing; keep numeric if present
-    df["heart_percentage"] = pd.to_numeric(df["heart_percentage"], errors="coerce")
-
-    return df
+# Filtering, scoring and reasons live in coffeematch_core. Option lists are
+# precomputed by scripts/prepare_data.py (data/processed/options.json), and the
+# catalog index is built once per server process on first use; a background
+# thread warms it while the first page is being requested.
+MODES = {
+    "best": ("score", 1),
+    "top5": ("score", 5),
+    "value": ("pareto", 5),
+}
 
+# Distinct input combinations remembered by the callback layer.
+CALLBACK_CACHE_SIZE = 4096
 
-# -----------------------------
-# Recommendation logic (MVP)
-# -----------------------------
-TAG_POINTS_PER_MATCH = 0.8
-POPULARITY_WEIGHT = 0.6
-VALUE_WEIGHT = 0.8
-
-def score_and_reason(df: pd.DataFrame, prefs: dict) -> pd.DataFrame:
-    out = df.copy()
-    out["score"] = 0.0
-    out["reason"] = ""
-
-    # Explicit matches first (added later into reason for finalists)
-
-    # Tag overlap
-    tags = prefs.get("tags", [])
-    if tags:
-        tag_set = set(tags)
-
-        def overlap_count(row_tags):
-            return len(set(row_tags).intersection(tag_set))
-
-        overlaps = out["tags_clean"].apply(overlap_count)
-        out["score"] += TAG_POINTS_PER_MATCH * overlaps
-        out.loc[overlaps > 0, "reason"] += "Tag overlap. "
-
-    # Popularity (use heart_percentage if available, otherwise fallback to hearts)
-    if out["heart_percentage"].notna().any():
-        hp = out["heart_percentage"].fillna(0)
-        hp_min, hp_max = float(hp.min()), float(hp.max())
-        if hp_max > hp_min:
-            hp_norm = (hp - hp_min) / (hp_max - hp_min)
-            out["score"] += POPULARITY_WEIGHT * hp_norm
-            out.loc[out["heart_percentage"].notna(), "reason"] += "Popular reviews. "
-    else:
-        # Fallback: normalize hearts
-        h = out["hearts"].fillna(0)
-        h_min, h_max = float(h.min()), float(h.max())
-        if h_max > h_min:
-            h_norm = (h - h_min) / (h_max - h_min)
-            out["score"] += 0.3 * h_norm
-            out.loc[h > 0, "reason"] += "Liked by users. "
-
-    # Value (lower $/oz is better)
-    if out["price_per_oz"].notna().any():
-        p = out["price_per_oz"]
-        p_min, p_max = float(p.min()), float(p.max())
-        if p_max > p_min:
-            value_norm = (p_max - p) / (p_max - p_min)  # 0..1
-            out["score"] += VALUE_WEIGHT * value_norm
-            out.loc[p.notna(), "reason"] += "Good value. "
-
-    return out
-
-
-def recommend(products: pd.DataFrame, prefs: dict) -> list[dict]:
-    df = products.copy()
-
-    # Hard filters
-    decaf_pref = prefs.get("decaf", "Either")
-    if decaf_pref == "Decaf":
-        df = df[df["decaf"] == True]
-    elif decaf_pref == "Caffeinated":
-        df = df[df["decaf"] == False]
-
-    roast_types = prefs.get("roast_types", [])
-    if roast_types:
-        roast_types = [r.strip().lower() for r in roast_types]
-        df = df[df["roast_type"].isin(roast_types)]
-
-    max_price = prefs.get("max_price_per_oz")
-    if max_price is not None:
-        df = df[df["price_per_oz"].isna() | (df["price_per_oz"] <= float(max_price))]
-
-    # If user requires ground availability (strict), filter here:
-    # if prefs.get("needs_ground", False):
-    #     df = df[df["available_ground"] == True]
-
-    if df.empty:
-        return []
-
-    ranked = score_and_reason(df, prefs).sort_values("score", ascending=False)
-
-    # Strengthen reason with explicit matches
-    results = []
-    for _, row in ranked.iterrows():
-        r = row.to_dict()
-        explicit = []
-        if prefs.get("decaf") != "Either":
-            explicit.append(f"Matches caffeine: {prefs['decaf'].lower()}.")
-        if roast_types:
-            explicit.append(f"Matches roast: {row.get('roast_type','')}.")
-        if max_price is not None and pd.notna(row.get("price_per_oz")):
-            explicit.append(f"Within budget (${row['price_per_oz']:.2f}/oz).")
-
-        r["reason"] = (" ".join(explicit) + " " if explicit else "") + (r.get("reason") or "")
-        results.append(r)
-
-    return results
+# `python old_versions/app_dash.py --profile-memory` prints a memory report
+# once the index is loaded, and the callback cache size on every request.
+# The flag is coffeematch_core.memory.PROFILE_MEMORY_FLAG, checked here without
+# importing that module (it pulls in pandas); the profiler is built on first use.
+PROFILE_MEMORY = "--profile-memory" in sys.argv
+
+
+@lru_cache(maxsize=1)
+def get_profiler():
+    from coffeematch_core.memory import MemoryProfiler
+    return MemoryProfiler(enabled=PROFILE_MEMORY)
+
+
+# lru_cache does not stop two threads (the warm-up and the first request)
+# from both building the index; the lock does.
+_INDEX_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _load_index():
+    # Attaches to the published catalog when COFFEEMATCH_SHARED_CATALOG is
+    # set, so gunicorn workers share one copy.
+    from coffeematch_core.shared_catalog import open_catalog_index
+    profiler = get_profiler()
+    with profiler.stage("load index"):
+        index = open_catalog_index()
+    if profiler.enabled:
+        print(profiler.report(structures={"catalog index": index,
+                                          "options": get_options()}))
+    return index
+
+
+def get_index():
+    with _INDEX_LOCK:
+        return _load_index()
+
+
+@lru_cache(maxsize=1)
+def get_options() -> dict:
+    from coffeematch_core.tags import load_options
+    return load_options()
+
+
+threading.Thread(target=get_index, name="catalog-warm", daemon=True).start()
 
 
 # -----------------------------
 # Build Dash UI
 # -----------------------------
-products_df = load_products()
-
-roast_options = sorted([r for r in products_df["roast_type"].dropna().unique().tolist() if r])
-all_tags = sorted({t for tags in products_df["tags_clean"] for t in tags})
-
 app = Dash(__name__, external_stylesheets=[BOOTSTRAP] if BOOTSTRAP else None)
 server = app.server  # for deployment platforms that look for "server"
 
 def controls_panel():
+    options = get_options()
+    roast_options, all_tags = options["roast_types"], options["tags"]
     # Use dbc if available, otherwise plain html.Div
     if dbc:
         return dbc.Card(
@@ -191,6 +97,7 @@ def controls_panel():
                     options=[
                         {"label": "Best match", "value": "best"},
                         {"label": "Top 5", "value": "top5"},
+                        {"label": "Best value", "value": "value"},
                     ],
                     value="best",
                     inline=True,
@@ -206,12 +113,12 @@ def controls_panel():
                 ),
 
                 html.Br(),
-                html.Label("Roast level(s)"),
+                html.Label("Roast level"),
                 dcc.Dropdown(
-                    id="roast_types",
+                    id="roast_type",
                     options=roast_options,
-                    value=[],
-                    multi=True
+                    value=None,
+                    placeholder="No preference",
                 ),
 
                 html.Br(),
@@ -250,6 +157,7 @@ def controls_panel():
                 options=[
                     {"label": "Best match", "value": "best"},
                     {"label": "Top 5", "value": "top5"},
+                    {"label": "Best value", "value": "value"},
                 ],
                 value="best",
             ),
@@ -257,8 +165,8 @@ def controls_panel():
             html.Label("Caffeine"),
             dcc.Dropdown(id="decaf", options=["Either", "Caffeinated", "Decaf"], value="Either", clearable=False),
             html.Br(),
-            html.Label("Roast level(s)"),
-            dcc.Dropdown(id="roast_types", options=roast_options, value=[], multi=True),
+            html.Label("Roast level"),
+            dcc.Dropdown(id="roast_type", options=roast_options, value=None, placeholder="No preference"),
             html.Br(),
             html.Label("Budget ($ per oz max)"),
             dcc.Slider(id="max_price_per_oz", min=0.10, max=5.00, step=0.05, value=2.00),
@@ -296,36 +204,30 @@ def page_layout():
         ])
     ])
 
-app.layout = page_layout()
+app.layout = page_layout  # a function, so options are built on first page load
 
 
-def render_result_card(r: dict):
+def render_result_card(r):
     # Build a compact “card” for each recommendation
-    header = html.H4(f"{r.get('roaster','')} — {r.get('product_name','')}", style={"marginBottom": "6px"})
-    reason = html.P(r.get("reason", ""), style={"marginTop": "0px"})
-
-    roast = r.get("roast_type", "")
-    ppo = r.get("price_per_oz", None)
-    hearts = r.get("hearts", 0)
-    has_reviews = r.get("has_reviews", False)
-    origin = r.get("origin", "")
-    tags = r.get("tags_clean", []) or []
-    url = r.get("url", "")
+    header = html.H4(f"{r.roaster} — {r.product_name}", style={"marginBottom": "6px"})
+    reason = html.P(" ".join(r.match_reasons), style={"marginTop": "0px"})
 
     metrics = html.Ul([
-        html.Li(f"Roast: {roast}" if roast else "Roast: —"),
-        html.Li(f"$/oz: {ppo:.2f}" if isinstance(ppo, (int, float)) and not math.isnan(ppo) else "$/oz: —"),
-        html.Li(f"Hearts: {int(hearts) if pd.notna(hearts) else 0}"),
-        html.Li(f"Has reviews: {'Yes' if has_reviews else 'No'}"),
+        html.Li(f"Roast: {r.roast_type}" if r.roast_type else "Roast: —"),
+        html.Li(f"$/oz: {r.reference_price_per_oz:.2f}"
+                if r.reference_price_per_oz is not None else "$/oz: —"),
+        html.Li(f"Hearts: {r.heart_percentage:.0f}% of {r.total_reviews} reviews"
+                if r.has_reviews else "Hearts: —"),
+        html.Li(f"Has reviews: {'Yes' if r.has_reviews else 'No'}"),
     ])
 
     extras = []
-    if origin and str(origin).strip().lower() != "nan":
-        extras.append(html.Div([html.Strong("Origin: "), html.Span(str(origin))]))
-    if tags:
-        extras.append(html.Div([html.Strong("Tags: "), html.Span(", ".join(tags[:12]))]))
-    if url and str(url).strip().lower() != "nan":
-        extras.append(html.Div(html.A("View product", href=url, target="_blank")))
+    if r.origin:
+        extras.append(html.Div([html.Strong("Origin: "), html.Span(r.origin)]))
+    if r.tags:
+        extras.append(html.Div([html.Strong("Tags: "), html.Span(", ".join(r.tags[:12]))]))
+    if r.url:
+        extras.append(html.Div(html.A("View product", href=r.url, target="_blank")))
 
     if dbc:
         return dbc.Card(dbc.CardBody([header, reason, metrics] + extras), style={"marginBottom": "12px"})
@@ -333,41 +235,51 @@ def render_result_card(r: dict):
                     style={"border": "1px solid #ddd", "borderRadius": "8px", "padding": "12px", "marginBottom": "12px"})
 
 
+@lru_cache(maxsize=CALLBACK_CACHE_SIZE)
+def recommend_view(mode, decaf, roast_type, max_price_per_oz, tags):
+    # Memoized on the (hashable) input tuple: repeat queries from any user
+    # are a dictionary lookup. The rendered components are only read when
+    # Dash serializes the response, so sharing them across requests is safe.
+    from coffeematch_core.engine import recommend
+    from coffeematch_core.schemas import UserPreferences
+
+    ranking_mode, k = MODES.get(mode, MODES["best"])
+    prefs = UserPreferences(
+        roast_type=roast_type,
+        max_price_per_oz=max_price_per_oz,
+        decaf={"Decaf": True, "Caffeinated": False}.get(decaf),
+        tags=list(tags),
+    )
+    results = recommend(get_index(), prefs, k, mode=ranking_mode)
+
+    if not results:
+        msg = "No coffees matched those constraints. Try relaxing roast/decaf/budget or removing tags."
+        if dbc:
+            return [], dbc.Alert(msg, color="warning")
+        return [], html.Div(msg, style={"color": "crimson"})
+
+    cards = [render_result_card(r) for r in results]
+    return cards, None if dbc else ""
+
+
 @callback(
     Output("results", "children"),
     Output("error_box", "children"),
     Input("btn_recommend", "n_clicks"),
     State("mode", "value"),
     State("decaf", "value"),
-    State("roast_types", "value"),
+    State("roast_type", "value"),
     State("max_price_per_oz", "value"),
     State("tags", "value"),
     prevent_initial_call=True
 )
-def on_recommend(n_clicks, mode, decaf, roast_types, max_price_per_oz, tags):
-    prefs = {
-        "top_n": 1 if mode == "best" else 5,
-        "decaf": decaf,
-        "roast_types": roast_types or [],
-        "max_price_per_oz": max_price_per_oz,
-        "tags": tags or [],
-    }
-
-    results = recommend(products_df, prefs)
-
-    if not results:
-        msg = "No coffees matched those constraints. Try relaxing roast/decaf/budget or removing tags."
-        if dbc:
-            return [], dbc.Alert(msg, color="warning")
-        return [], html.Div(msg, style={"color": "crimson"})
-
-    top_n = prefs["top_n"]
-    cards = [render_result_card(r) for r in results[:top_n]]
-
-    if dbc:
-        return cards, None
-    return cards, ""
+def on_recommend(n_clicks, mode, decaf, roast_type, max_price_per_oz, tags):
+    view = recommend_view(mode, decaf, roast_type, max_price_per_oz,
+                          tuple(sorted(tags or [])))
+    if PROFILE_MEMORY:
+        print(f"recommend_view cache: {recommend_view.cache_info()}")
+    return view
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,72 @@
+"""
+Purpose:
+Measure ranking latency of the recommendation engine on a synthetic
+catalog for several ``n_jobs`` settings and report the speedup over a
+single worker.
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/benchmark_scoring.py --rows 300000 --jobs 1,2,4
+"""
+
+import argparse
+import statistics
+import time
+
+from coffeematch_core.catalog import build_catalog_index
+from coffeematch_core.engine import rank_products
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark engine ranking latency across n_jobs."
+    )
+    parser.add_argument("--rows", type=int, default=300_000,
+                        help="Synthetic catalog size in product/size rows.")
+    parser.add_argument("--jobs", default="1,2,4",
+                        help="Comma-separated n_jobs values to compare.")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="Timed runs per setting.")
+    parser.add_argument("--k", type=int, default=5, help="Top-k size.")
+    return parser.parse_args()
+
+
+def time_ranking(index, prefs: UserPreferences, k: int, n_jobs: int,
+                 repeat: int) -> float:
+    """
+    Median wall time of one ranking call.
+
+    Returns
+    -------
+    float
+        Median latency in milliseconds.
+    """
+    rank_products(index, prefs, k, n_jobs)  # warm-up, creates the pool
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rank_products(index, prefs, k, n_jobs)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    """Run the benchmark and print a latency/speedup table."""
+    args = parse_args()
+    index = build_catalog_index(make_synthetic_products(args.rows))
+    prefs = UserPreferences(roast_type="Medium", decaf=False)
+
+    print(f"Catalog: {index.n_rows} rows, {index.n_products} products")
+    print(f"{'n_jobs':>6} {'median ms':>10} {'speedup':>8}")
+
+    baseline = None
+    for n_jobs in (int(j) for j in args.jobs.split(",")):
+        latency = time_ranking(index, prefs, args.k, n_jobs, args.repeat)
+        baseline = baseline or latency
+        print(f"{n_jobs:>6} {latency:>10.2f} {baseline / latency:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
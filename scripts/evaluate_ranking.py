@@ -0,0 +1,86 @@
+"""
+Purpose:
+Replay a corpus of user preferences through two scorer implementations
+and report top-k agreement, NDCG against review-derived relevance and
+latency side by side.
+
+The corpus is either synthetic or read from a JSON-lines file with one
+``UserPreferences`` object per line.
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/evaluate_ranking.py --requests 2000 --jobs -1
+    python scripts/evaluate_ranking.py --rows 100000 --output ranking_eval.csv
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import List
+
+from coffeematch_core.evaluation import SCORERS, evaluate_corpus, summarize
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_preferences
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Compare two scorers on ranking quality and latency."
+    )
+    parser.add_argument("--preferences", type=Path, default=None,
+                        help="JSON-lines corpus of UserPreferences; "
+                             "synthetic if omitted.")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="Synthetic corpus size.")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="Evaluate on a synthetic catalog of this many "
+                             "rows instead of data/processed.")
+    parser.add_argument("--scorers", default="reference,engine",
+                        help=f"Baseline and candidate, from {sorted(SCORERS)}.")
+    parser.add_argument("--k", type=int, default=5, help="Top-k size.")
+    parser.add_argument("--jobs", type=int, default=-1,
+                        help="Worker processes (-1 = all cores).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Optional CSV path for the per-request report.")
+    return parser.parse_args()
+
+
+def load_corpus(path: Path) -> List[UserPreferences]:
+    """
+    Read logged preferences, one JSON object per line.
+
+    Lines may also be request-log records (see
+    ``coffeematch_core.request_log``), whose preferences sit under
+    'prefs'. Unknown keys are ignored.
+    """
+    fields = UserPreferences.__dataclass_fields__
+    corpus = []
+    with path.open() as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record = record.get("prefs", record)
+            corpus.append(UserPreferences(**{k: v for k, v in record.items() if k in fields}))
+    return corpus
+
+
+def main() -> None:
+    """Run the evaluation and print the summary."""
+    args = parse_args()
+    scorers = args.scorers.split(",")
+    corpus = (load_corpus(args.preferences) if args.preferences
+              else make_synthetic_preferences(args.requests, args.seed))
+
+    report = evaluate_corpus(corpus, scorers, args.k, args.rows, args.seed, args.jobs)
+
+    print(f"Replayed {len(report)} requests, k={args.k}")
+    print(summarize(report, scorers).round(4).to_string())
+    if args.output:
+        report.to_csv(args.output, index=False)
+        print(f"Saved per-request report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
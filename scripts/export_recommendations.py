@@ -0,0 +1,309 @@
+"""
+Purpose:
+Export top-k recommendations for a file of users or segments to CSV or
+Parquet, e.g. for nightly email campaigns.
+
+The input is JSON lines (one ``UserPreferences`` object per line, or
+request-log records) or a CSV whose columns are ``UserPreferences``
+fields, with list fields such as tags separated by ';'. An optional id
+column (``--id-column``, default user_id) is carried through; rows
+without one are numbered.
+
+Input is read and ranked chunk by chunk, and each chunk's rows go
+straight to a buffered writer, so memory stays bounded by the chunk
+size. Identical preference sets (common when exporting per segment) are
+ranked once and reused from a bounded cache.
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/export_recommendations.py segments.csv exports/top5.csv --k 5
+    python scripts/export_recommendations.py users.jsonl exports/top5.parquet
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.catalog import CatalogIndex, load_catalog_index
+from coffeematch_core.engine import RankedProducts, rank_products
+from coffeematch_core.schemas import UserPreferences
+
+
+CHUNK_SIZE = 10_000
+
+# Output buffer of the CSV writer.
+WRITE_BUFFER_BYTES = 8 * 1024 * 1024
+
+# Distinct preference sets whose rankings are kept for reuse.
+RANKING_CACHE_SIZE = 100_000
+
+LIST_FIELDS = ("tags", "tasting_notes", "liked_products")
+LIST_SEPARATOR = ";"
+
+OUTPUT_COLUMNS = ["id", "rank", "product_key", "product_name", "roaster",
+                  "score", "price_per_oz", "url"]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Export top-k recommendations per user or segment."
+    )
+    parser.add_argument("input", type=Path,
+                        help="Preferences as .jsonl or .csv.")
+    parser.add_argument("output", type=Path,
+                        help="Destination .csv or .parquet file.")
+    parser.add_argument("--k", type=int, default=5, help="Top-k size.")
+    parser.add_argument("--id-column", default="user_id",
+                        help="Input column identifying each row.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Input rows ranked and written per chunk.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker threads per ranking (see engine.resolve_n_jobs).")
+    return parser.parse_args()
+
+
+def to_preferences(record: Dict[str, object]) -> UserPreferences:
+    """
+    Build preferences from one input record, ignoring unknown and empty fields.
+
+    Parameters
+    ----------
+    record : Dict[str, object]
+        Parsed JSON object or CSV row.
+
+    Returns
+    -------
+    UserPreferences
+        Preferences with defaults for missing fields.
+    """
+    fields = UserPreferences.__dataclass_fields__
+    values = {}
+    for key, value in record.items():
+        if key not in fields or value is None or (isinstance(value, float) and pd.isna(value)):
+            continue
+        if key in LIST_FIELDS and isinstance(value, str):
+            value = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+        values[key] = value
+    return UserPreferences(**values)
+
+
+def read_chunks(
+    path: Path,
+    id_column: str,
+    chunk_size: int,
+) -> Iterator[List[Tuple[str, UserPreferences]]]:
+    """
+    Stream ``(id, preferences)`` pairs in chunks.
+
+    Parameters
+    ----------
+    path : Path
+        .jsonl or .csv input.
+    id_column : str
+        Column or key holding the row id.
+    chunk_size : int
+        Rows per chunk.
+
+    Yields
+    ------
+    List[Tuple[str, UserPreferences]]
+        Up to ``chunk_size`` rows, in input order.
+    """
+    if path.suffix == ".csv":
+        start = 0
+        # Everything as strings, so ids keep leading zeros; booleans and
+        # numbers are converted below.
+        for frame in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            records = frame.replace({"": None, "True": True, "False": False,
+                                     "true": True, "false": False}).to_dict("records")
+            yield [(_row_id(record, id_column, start + i), to_preferences(_numeric(record)))
+                   for i, record in enumerate(records)]
+            start += len(records)
+        return
+
+    with path.open(encoding="utf-8") as lines:
+        records = (json.loads(line) for line in lines if line.strip())
+        start = 0
+        while True:
+            batch = list(islice(records, chunk_size))
+            if not batch:
+                return
+            yield [(_row_id(record, id_column, start + i), to_preferences(record.get("prefs", record)))
+                   for i, record in enumerate(batch)]
+            start += len(batch)
+
+
+def _row_id(record: Dict[str, object], id_column: str, position: int) -> str:
+    """Id of an input row; its position when the id is missing."""
+    value = record.get(id_column)
+    return str(position) if value is None else str(value)
+
+
+def _numeric(record: Dict[str, object]) -> Dict[str, object]:
+    """Convert the numeric preference fields of a CSV row."""
+    fields = UserPreferences.__dataclass_fields__
+    for key, value in record.items():
+        if isinstance(value, str) and key in fields and key not in LIST_FIELDS:
+            try:
+                record[key] = float(value)
+            except ValueError:
+                pass
+    return record
+
+
+class RankingCache:
+    """
+    Bounded LRU of rankings by preference values.
+
+    Parameters
+    ----------
+    index : CatalogIndex
+        Catalog to rank.
+    k : int
+        Top-k size.
+    n_jobs : int or None
+        Worker threads per ranking.
+    maxsize : int
+        Preference sets kept.
+    """
+
+    def __init__(self, index: CatalogIndex, k: int, n_jobs, maxsize: int = RANKING_CACHE_SIZE):
+        self.index = index
+        self.k = k
+        self.n_jobs = n_jobs
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[tuple, RankedProducts]" = OrderedDict()
+        self.hits = 0
+
+    def rank(self, prefs: UserPreferences) -> RankedProducts:
+        """Top-k of ``prefs``, ranked at most once while cached."""
+        # Field values as a tuple: far cheaper than hashing asdict() output.
+        key = tuple(tuple(v) if isinstance(v, list) else v for v in vars(prefs).values())
+        ranked = self.entries.get(key)
+        if ranked is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return ranked
+        ranked = rank_products(self.index, prefs, self.k, self.n_jobs)
+        self.entries[key] = ranked
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return ranked
+
+
+def chunk_frame(
+    index: CatalogIndex,
+    rows: List[Tuple[str, UserPreferences]],
+    cache: RankingCache,
+) -> pd.DataFrame:
+    """
+    Rank one chunk and lay it out as output rows.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (id, rank), columns ``OUTPUT_COLUMNS``.
+    """
+    ids, ranks, product_ids, scores = [], [], [], []
+    for row_id, prefs in rows:
+        for rank, (score, product_id) in enumerate(cache.rank(prefs), start=1):
+            ids.append(row_id)
+            ranks.append(rank)
+            product_ids.append(product_id)
+            scores.append(score)
+
+    # Product details come from each product's first row.
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    first_rows = index.product_offsets[:-1][product_ids]
+    return pd.DataFrame({
+        "id": ids,
+        "rank": ranks,
+        "product_key": index.categories["product_key"][product_ids],
+        "product_name": index.labels("product_name", first_rows),
+        "roaster": index.labels("roaster", first_rows),
+        "score": np.round(scores, 4),
+        "price_per_oz": index.columns["price_per_oz"][first_rows],
+        "url": index.labels("url", first_rows),
+    }, columns=OUTPUT_COLUMNS)
+
+
+class ChunkWriter:
+    """
+    Append output chunks to a CSV (buffered) or Parquet file.
+
+    Parquet needs pyarrow and is written as one row group per chunk.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.parquet = path.suffix == ".parquet"
+        self.handle = None
+        self.writer = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        """Append one chunk."""
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Parquet output needs pyarrow: pip install pyarrow") from None
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+            return
+
+        first = self.handle is None
+        if first:
+            self.handle = self.path.open("w", encoding="utf-8", newline="",
+                                         buffering=WRITE_BUFFER_BYTES)
+        frame.to_csv(self.handle, header=first, index=False)
+
+    def close(self) -> None:
+        """Flush and close the output."""
+        if self.writer is not None:
+            self.writer.close()
+        if self.handle is not None:
+            self.handle.close()
+
+
+def main() -> None:
+    """Stream the input through the ranker and write the export."""
+    args = parse_args()
+    index = load_catalog_index()
+    cache = RankingCache(index, args.k, args.jobs)
+    writer = ChunkWriter(args.output)
+
+    start = time.perf_counter()
+    n_inputs = n_outputs = 0
+    try:
+        for rows in read_chunks(args.input, args.id_column, args.chunk_size):
+            frame = chunk_frame(index, rows, cache)
+            writer.write(frame)
+            n_inputs += len(rows)
+            n_outputs += len(frame)
+            elapsed = time.perf_counter() - start
+            print(f"\r{n_inputs:,} inputs, {n_outputs:,} rows written, "
+                  f"{n_inputs / elapsed:,.0f} inputs/s", end="", file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    print(f"Exported {n_outputs:,} rows for {n_inputs:,} inputs to {args.output} "
+          f"in {elapsed:.1f} s ({n_inputs / max(elapsed, 1e-9):,.0f} inputs/s, "
+          f"{cache.hits:,} cached rankings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,20 +9,93 @@ Typical workflow:
 
 The processed CSV files are committed to the repository to ensure
 reproducibility and simplify project setup.
+
+Both outputs are validated against the column contracts in
+coffeematch_core.validation before they are written, so malformed data
+fails here instead of being patched up by the apps at request time.
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/prepare_data.py
+    python scripts/prepare_data.py --profile-memory
 """
 
+import argparse
 from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
 import pandas as pd
 
+from coffeematch_core.brewing import BREWING_AFFINITY_PATH, brewing_affinity
+from coffeematch_core.catalog import OPTIONS_PATH, PRODUCT_LISTS_PATH, PRODUCT_NEIGHBORS_PATH
+from coffeematch_core.collaborative import build_product_neighbors
+from coffeematch_core.geo import geocode_cafes, load_gazetteer
+from coffeematch_core.memory import PROFILE_MEMORY_FLAG, MemoryProfiler
+from coffeematch_core.popularity import (
+    PRODUCT_POPULARITY_PATH,
+    PopularityState,
+    load_state,
+    product_popularity_features,
+    save_state,
+    update_state,
+)
+from coffeematch_core.price_history import (
+    PRICE_HISTORY_DIR,
+    PRODUCT_PRICE_TREND_PATH,
+    PriceHistory,
+    append_snapshot,
+    load_history,
+    price_trend_features,
+    save_history,
+)
+from coffeematch_core.sentiment import (
+    PRODUCT_SENTIMENT_PATH,
+    product_sentiment_features,
+    score_reviews,
+)
+from coffeematch_core.tags import (
+    build_options,
+    product_notes_table,
+    product_tags_table,
+    save_options,
+    save_product_lists,
+)
+from coffeematch_core.validation import validate_products, validate_reviews
+
 
 RAW_DIR = Path("data/raw")
 PROCESSED_DIR = Path("data/processed")
 
 PRODUCTS_INPUT = RAW_DIR / "Product_Information.xlsx"
 REVIEWS_INPUT = RAW_DIR / "Reviews_and_Tasting_Notes.xlsx"
+CAFES_INPUT = RAW_DIR / "address_out.csv"
+GAZETTEER_INPUT = RAW_DIR / "wa_gazetteer.csv"
 
 PRODUCTS_OUTPUT = PROCESSED_DIR / "products_clean.csv"
 REVIEWS_OUTPUT = PROCESSED_DIR / "reviews_clean.csv"
+CAFES_OUTPUT = PROCESSED_DIR / "cafes_geocoded.csv"
+
+# Bag sizes look like "12oz", "12 oz", "2.5 lb", "5lbs" or "340g".
+SIZE_PATTERN = r"^\s*(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>[a-z]+)\.?\s*$"
+
+# First amount in a price string: "$12.99", "12.99 USD", "$1,299.00", or
+# the low end of a range such as "$12.99 - $15.99".
+PRICE_PATTERN = r"(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+)"
+
+# Ounces per unit, keyed by every spelling seen in scrapes.
+SIZE_UNIT_TO_OZ = {
+    "oz": 1.0,
+    "ounce": 1.0,
+    "ounces": 1.0,
+    "lb": 16.0,
+    "lbs": 16.0,
+    "pound": 16.0,
+    "pounds": 16.0,
+    "g": 1 / 28.349523125,
+    "gram": 1 / 28.349523125,
+    "grams": 1 / 28.349523125,
+    "kg": 1000 / 28.349523125,
+}
 
 
 def ensure_directories() -> None:
@@ -114,6 +187,120 @@ def create_product_key(df: pd.DataFrame) -> pd.DataFrame:
     return cleaned_df
 
 
+def parse_size_oz(sizes: pd.Series) -> pd.Series:
+    """
+    Convert raw bag sizes to ounces.
+
+    A regex extracts amount and unit and a lookup table converts the
+    unit to ounces.
+
+    Parameters
+    ----------
+    sizes : pd.Series
+        Raw sizes such as '12oz', '2.5 lb' or '340g'.
+
+    Returns
+    -------
+    pd.Series
+        float ounces, rounded to 2 decimals; NaN for unrecognized sizes.
+    """
+    parts = sizes.astype("string").str.lower().str.extract(SIZE_PATTERN)
+    amount = parts["amount"].astype("Float64")
+    ounces = amount * parts["unit"].map(SIZE_UNIT_TO_OZ).astype("Float64")
+    return ounces.round(2).astype(np.float64)
+
+
+def parse_price(prices: pd.Series) -> pd.Series:
+    """
+    Convert raw prices to numbers.
+
+    The first amount in each string is taken, so currency symbols and
+    text are ignored, thousands separators are dropped and a range such
+    as '$12.99 - $15.99' yields its low end, 12.99.
+
+    Parameters
+    ----------
+    prices : pd.Series
+        Raw prices, strings or numbers.
+
+    Returns
+    -------
+    pd.Series
+        float prices; NaN where no amount is found.
+    """
+    amount = prices.astype("string").str.extract(PRICE_PATTERN)["amount"]
+    return amount.str.replace(",", "", regex=False).astype("Float64").astype(np.float64)
+
+
+def normalize_sizes_and_prices(
+    df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Derive size_oz, price_numeric and price_per_oz from the raw size and
+    price strings.
+
+    Parsing runs on whole columns (see ``parse_size_oz`` and
+    ``parse_price``). Values already present in the scrape are kept;
+    derived values only fill the gaps.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Products DataFrame with raw 'size' and 'price' columns.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        The rows that could be normalized, and the rows that could not
+        (missing or unrecognized size/price).
+    """
+    cleaned_df = df.copy()
+
+    size_oz = parse_size_oz(cleaned_df["size"])
+    price = parse_price(cleaned_df["price"])
+
+    for column, derived in (("size_oz", size_oz), ("price_numeric", price)):
+        if column in cleaned_df.columns:
+            cleaned_df[column] = cleaned_df[column].fillna(derived)
+        else:
+            cleaned_df[column] = derived
+
+    derived_per_oz = (cleaned_df["price_numeric"] / cleaned_df["size_oz"]).round(2)
+    if "price_per_oz" in cleaned_df.columns:
+        cleaned_df["price_per_oz"] = cleaned_df["price_per_oz"].fillna(derived_per_oz)
+    else:
+        cleaned_df["price_per_oz"] = derived_per_oz
+
+    unparsed = (
+        cleaned_df[["size_oz", "price_numeric", "price_per_oz"]].isna().any(axis=1)
+        | (cleaned_df["size_oz"] <= 0)
+    )
+    return (
+        cleaned_df[~unparsed].reset_index(drop=True),
+        cleaned_df.loc[unparsed, ["roaster", "product_name", "size", "price"]],
+    )
+
+
+def drop_duplicate_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remove rows that are exact duplicates of an earlier row.
+
+    The scraped product sheet occasionally lists the same size twice,
+    which would otherwise violate the one-row-per-product-and-size rule.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Input DataFrame.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame without exact duplicate rows.
+    """
+    return df.drop_duplicates(ignore_index=True)
+
+
 def save_csv(df: pd.DataFrame, output_path: Path) -> None:
     """
     Save a DataFrame to CSV.
@@ -128,26 +315,181 @@ def save_csv(df: pd.DataFrame, output_path: Path) -> None:
     df.to_csv(output_path, index=False)
 
 
-def main() -> None:
-    """Run the raw Excel to processed CSV pipeline."""
-    ensure_directories()
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Convert the raw Excel datasets into processed CSVs."
+    )
+    parser.add_argument(PROFILE_MEMORY_FLAG, action="store_true",
+                        help="Trace memory per stage and print a per-structure "
+                             "and strings-vs-categoricals report.")
+    return parser.parse_args()
 
-    products_df = load_excel_file(PRODUCTS_INPUT)
-    reviews_df = load_excel_file(REVIEWS_INPUT)
 
+def clean_datasets(
+    products_df: pd.DataFrame,
+    reviews_df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Clean the raw frames and split off the per-product lists.
+
+    Tags and tasting notes are kept as separate long tables, interned into
+    per-product lists when saved, rather than as products columns.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        Products, reviews, product tags and product tasting notes.
+    """
     products_df = standardize_column_names(products_df)
     reviews_df = standardize_column_names(reviews_df)
 
-    products_df = remove_unused_columns(products_df)
-    products_df = create_product_key(products_df)
-
+    products_df, unparsed_df = normalize_sizes_and_prices(products_df)
+    if not unparsed_df.empty:
+        print(f"Dropped {len(unparsed_df)} rows with unparseable size/price:")
+        print(unparsed_df.to_string())
+    products_df = drop_duplicate_rows(create_product_key(products_df))
+    tags_df = product_tags_table(products_df)
+    notes_df = product_notes_table(reviews_df, products_df)
+    return remove_unused_columns(products_df), reviews_df, tags_df, notes_df
+
+
+def validate_datasets(products_df: pd.DataFrame, reviews_df: pd.DataFrame) -> None:
+    """Print both validation reports and stop on the first invalid one."""
+    for report in (validate_products(products_df), validate_reviews(reviews_df)):
+        print(report.summary())
+        report.raise_if_invalid()
+
+
+def save_datasets(
+    products_df: pd.DataFrame,
+    reviews_df: pd.DataFrame,
+    tags_df: pd.DataFrame,
+    notes_df: pd.DataFrame,
+) -> None:
+    """Write the cleaned frames, the per-product lists and the UI options."""
     save_csv(products_df, PRODUCTS_OUTPUT)
     save_csv(reviews_df, REVIEWS_OUTPUT)
-
     print(f"Saved products data to {PRODUCTS_OUTPUT}")
     print(f"Saved reviews data to {REVIEWS_OUTPUT}")
+
+    save_product_lists(products_df, {"tag": tags_df, "note": notes_df}, PRODUCT_LISTS_PATH)
+    save_options(build_options(products_df, tags_df, notes_df), OPTIONS_PATH)
+    print(f"Saved product tags and tasting notes to {PRODUCT_LISTS_PATH} "
+          f"and UI options to {OPTIONS_PATH}")
+
+
+def save_sentiment_features(reviews_df: pd.DataFrame, products_df: pd.DataFrame) -> np.ndarray:
+    """Score the reviews and write the per-product sentiment features."""
+    sentiment_scores = score_reviews(reviews_df)
+    save_csv(
+        product_sentiment_features(reviews_df, sentiment_scores, products_df),
+        PRODUCT_SENTIMENT_PATH,
+    )
+    print(f"Saved product sentiment features to {PRODUCT_SENTIMENT_PATH}")
+    return sentiment_scores
+
+
+def save_popularity_features(
+    reviews_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+) -> PopularityState:
+    """Fold new reviews into the popularity state and write its features."""
+    popularity_state = update_state(load_state(), reviews_df, products_df)
+    save_state(popularity_state)
+    save_csv(product_popularity_features(popularity_state), PRODUCT_POPULARITY_PATH)
+    print(f"Saved product popularity features to {PRODUCT_POPULARITY_PATH}")
+    return popularity_state
+
+
+def save_price_history(products_df: pd.DataFrame) -> PriceHistory:
+    """
+    Append the catalog to the price history and write the price trends.
+
+    Only changed prices/hearts are appended; an unchanged catalog adds no
+    version.
+    """
+    price_history = append_snapshot(load_history(), products_df)
+    save_history(price_history)
+    save_csv(price_trend_features(price_history), PRODUCT_PRICE_TREND_PATH)
+    print(f"Saved price history ({price_history.n_versions} versions) to "
+          f"{PRICE_HISTORY_DIR} and price trends to {PRODUCT_PRICE_TREND_PATH}")
+    return price_history
+
+
+def save_cafes() -> None:
+    """Geocode the scraped cafe addresses."""
+    cafes_df = geocode_cafes(pd.read_csv(CAFES_INPUT), load_gazetteer(GAZETTEER_INPUT))
+    save_csv(cafes_df, CAFES_OUTPUT)
+    print(f"Saved {len(cafes_df)} geocoded cafes to {CAFES_OUTPUT}")
+
+
+def print_memory_report(profiler: MemoryProfiler, structures: Dict[str, object]) -> None:
+    """Print the ``--profile-memory`` report for the pipeline's structures."""
+    structures = {
+        **structures,
+        "reviews_df.review_text": structures["reviews_df"]["review_text"],
+    }
+    print()
+    print(profiler.report(
+        structures=structures,
+        frames={name: structures[name] for name in ("products_df", "reviews_df")},
+    ))
+
+
+def main() -> None:
+    """Run the raw Excel to processed CSV pipeline."""
+    args = parse_args()
+    profiler = MemoryProfiler(enabled=args.profile_memory)
+    ensure_directories()
+
+    with profiler.stage("load"):
+        products_df = load_excel_file(PRODUCTS_INPUT)
+        reviews_df = load_excel_file(REVIEWS_INPUT)
+
+    with profiler.stage("clean"):
+        products_df, reviews_df, tags_df, notes_df = clean_datasets(products_df, reviews_df)
+
+    with profiler.stage("validate"):
+        validate_datasets(products_df, reviews_df)
+
+    with profiler.stage("save"):
+        save_datasets(products_df, reviews_df, tags_df, notes_df)
+
+    with profiler.stage("sentiment"):
+        sentiment_scores = save_sentiment_features(reviews_df, products_df)
+
+    with profiler.stage("popularity"):
+        popularity_state = save_popularity_features(reviews_df, products_df)
+
+    with profiler.stage("price history"):
+        price_history = save_price_history(products_df)
+
+    with profiler.stage("brewing"):
+        save_csv(brewing_affinity(reviews_df, products_df), BREWING_AFFINITY_PATH)
+        print(f"Saved brewing method affinity to {BREWING_AFFINITY_PATH}")
+
+    with profiler.stage("neighbors"):
+        build_product_neighbors(reviews_df, products_df)
+        print(f"Saved product neighbors to {PRODUCT_NEIGHBORS_PATH}")
+
+    if CAFES_INPUT.exists():
+        with profiler.stage("geocode"):
+            save_cafes()
+
     print("Data preparation complete.")
 
+    if profiler.enabled:
+        print_memory_report(profiler, {
+            "products_df": products_df,
+            "reviews_df": reviews_df,
+            "tags_df": tags_df,
+            "notes_df": notes_df,
+            "sentiment_scores": sentiment_scores,
+            "popularity_state": popularity_state,
+            "price_history": price_history,
+        })
+
 
 if __name__ == "__main__":
     main()
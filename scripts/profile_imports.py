@@ -0,0 +1,99 @@
+"""
+Purpose:
+Summarize Python's ``-X importtime`` output for the CoffeeMatch entry
+points, so slow imports on a fresh worker are easy to spot.
+
+Each target module is imported in a clean subprocess. The report lists
+the total import time and the top-level packages that cost the most
+(self time summed over each package's submodules).
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --module streamlit_poc --top 15
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+DEFAULT_MODULES = ["coffeematch_core.engine", "streamlit_poc"]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Summarize -X importtime for CoffeeMatch entry points."
+    )
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="Module to import (repeatable). Defaults to "
+                             f"{', '.join(DEFAULT_MODULES)}.")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of packages to list per module.")
+    return parser.parse_args()
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Import a module under ``-X importtime`` and parse the timings.
+
+    Parameters
+    ----------
+    module : str
+        Dotted module name.
+
+    Returns
+    -------
+    List[Tuple[str, int, int]]
+        ``(imported_module, self_us, cumulative_us)`` per imported module.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=False,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    if not rows:
+        raise RuntimeError(f"Could not import {module}:\n{completed.stderr}")
+    return rows
+
+
+def summarize(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """
+    Sum self time per top-level package.
+
+    Returns
+    -------
+    Dict[str, int]
+        Microseconds per package.
+    """
+    per_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        per_package[name.split(".")[0]] += self_us
+    return per_package
+
+
+def main() -> None:
+    """Print an import-time summary for each target module."""
+    args = parse_args()
+    for module in args.modules or DEFAULT_MODULES:
+        rows = import_times(module)
+        total_us = sum(self_us for _, self_us, _ in rows)
+        per_package = sorted(summarize(rows).items(), key=lambda kv: -kv[1])
+
+        print(f"\n{module}: {total_us / 1000:.1f} ms total, {len(rows)} modules")
+        print(f"  {'package':<28} {'ms':>8} {'share':>7}")
+        for package, self_us in per_package[:args.top]:
+            print(f"  {package:<28} {self_us / 1000:>8.1f} "
+                  f"{self_us / total_us:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Purpose:
+Re-drive a captured request log against the recommendation engine at a
+configurable rate and report throughput and latency percentiles.
+
+Capture a log by running an app with COFFEEMATCH_REQUEST_LOG set, e.g.
+    COFFEEMATCH_REQUEST_LOG=logs/requests.log streamlit run streamlit_poc.py
+
+Requests are sent open-loop: each one is scheduled at its arrival time
+whether or not earlier ones have finished, and latency is measured from
+that scheduled time, so queueing under overload shows up in the tail
+instead of silently lowering the offered rate. Replies are compared with
+the logged results to confirm the replay is deterministic.
+
+Run from the repository root (after ``pip install -e .``):
+    python scripts/replay_requests.py logs/requests.log --rate 200 --workers 4
+    python scripts/replay_requests.py logs/requests.log --speedup 10
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from coffeematch_core.catalog import load_catalog_index
+from coffeematch_core.engine import recommend
+from coffeematch_core.request_log import read_requests
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Replay a captured request log and report latency percentiles."
+    )
+    parser.add_argument("log", type=Path, help="Active request log file.")
+    rate = parser.add_mutually_exclusive_group()
+    rate.add_argument("--rate", type=float, default=None,
+                      help="Fixed arrival rate in requests per second.")
+    rate.add_argument("--speedup", type=float, default=1.0,
+                      help="Replay recorded inter-arrival gaps this many "
+                           "times faster (default: real time).")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Replay at most this many requests.")
+    parser.add_argument("--loops", type=int, default=1,
+                        help="Replay the log this many times.")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent requests served in-process.")
+    return parser.parse_args()
+
+
+def arrival_offsets(records: List[Dict], rate, speedup: float) -> np.ndarray:
+    """
+    Seconds after start at which each request is sent.
+
+    Returns
+    -------
+    np.ndarray
+        Non-decreasing offsets, one per record.
+    """
+    if rate:
+        return np.arange(len(records)) / rate
+    stamps = np.array([record["ts"] for record in records], dtype=np.float64)
+    return (stamps - stamps[0]) / speedup
+
+
+async def replay(records: List[Dict], offsets: np.ndarray, workers: int) -> Dict[str, object]:
+    """
+    Send every request at its offset and collect latencies.
+
+    Returns
+    -------
+    Dict[str, object]
+        Latencies in ms, mismatching replies and wall time.
+    """
+    index = load_catalog_index()
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    latencies = np.zeros(len(records))
+    mismatches = 0
+
+    async def send(i: int, scheduled: float) -> None:
+        nonlocal mismatches
+        record = records[i]
+        options = record["options"]
+        result = await loop.run_in_executor(
+            executor,
+            lambda: recommend(index, record["prefs"], options["k"],
+                              diversity_lambda=options.get("diversity_lambda"),
+                              mode=options.get("mode", "score")),
+        )
+        latencies[i] = (time.perf_counter() - scheduled) * 1000
+        if [rec.product_key for rec in result] != record["results"]:
+            mismatches += 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i, offset in enumerate(offsets):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(i, start + offset)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+    executor.shutdown()
+
+    return {"latencies": latencies, "mismatches": mismatches, "wall": wall}
+
+
+def main() -> None:
+    """Load the log, replay it and print the report."""
+    args = parse_args()
+    records = list(read_requests(args.log))[:args.limit]
+    if not records:
+        raise SystemExit(f"No requests found in {args.log}")
+
+    offsets = arrival_offsets(records, args.rate, args.speedup)
+    # Later loops start one average gap after the previous one ends.
+    period = offsets[-1] + (offsets[-1] / max(len(offsets) - 1, 1) or 1e-3)
+    offsets = np.concatenate([offsets + loop * period for loop in range(args.loops)])
+    records = records * args.loops
+    result = asyncio.run(replay(records, offsets, args.workers))
+    latencies = result["latencies"]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+    print(f"Requests:    {len(records)}")
+    print(f"Offered:     {len(records) / max(offsets[-1], 1e-9):.1f} req/s")
+    print(f"Throughput:  {len(records) / result['wall']:.1f} req/s")
+    print(f"Latency ms:  p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  max {latencies.max():.2f}")
+    print(f"Mismatched replies: {result['mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import emoji 
-import pandas as pd 
-import numpy as np
 
-# Paths to data 
-PRODUCTS_PATH = "data/Product_Information.xlsx"
-REVIEWS_PATH = "data/Reviews_and_Tasting_Notes.xlsx"
-REVIEWS_SHEET = "Reviews with Tasting Notes"
+# Number of matches shown on the results page
+TOP_K = 3
+
+# Browser tab title per page
+PAGE_TITLES = {"survey": "Coffee Match", "results": "Match Results"}
 
-# Set up styling classes for use in the website 
-st.markdown("""
+# Styling classes for use in the website. Streamlit rebuilds the page on every
+# rerun, so this is re-sent each time; keeping it a module constant means it
+# is not rebuilt, and the results fragment below reruns without it.
+STYLE = """
         <style>
             /*Page Background Colors*/
-            
+
             .stApp {
                 background: linear-gradient(to bottom, #ffe4b5, #8b4513);
             }
@@ -27,7 +29,7 @@ st.markdown("""
                 margin-bottom: 0 !important
                 gap: 0 !important;
             }
-            
+
             /*Page Subtitles*/
 
             .page-subtitle {
@@ -48,13 +50,13 @@ st.markdown("""
 
             .survey-question {
                 font-size: 24px;
-                color: #a0522d ; 
+                color: #a0522d ;
                 font-weight: bold;
                 margin: 0 !important;
                 padding: 0 !important;
                 margin-bottom: 0.2rem !important;
             }
-            
+
             /*Formatting for the question boxes */
 
             .stRadio {
@@ -78,129 +80,147 @@ st.markdown("""
             padding: 20px;
             margin: 20px 0;
             font-size: 18px;
-            
+
         }
         </style>
-        """, unsafe_allow_html=True)
-
-# Data Loading (load out datasets and store for later use)
-#st.cache is a Streamlit decorator that caches the output of a function.
-#When you call a function decorated with @st.cache_data, Streamlit stores its result.
-#If you call the function again with the same arguments, Streamlit returns the cached result instead of re-running the function.
-#This helps speed things up and keep things responsive
-
-@st.cache_data
-def load_products():
-    product_df = pd.read_excel(PRODUCTS_PATH)
-
-    product_df["tags_clean"] = product_df["tags"].fillna("").apply(
-        lambda x: [t.strip().lower() for t in str(x).split(",") if t.strip()]
+        """
+
+# Catalog (shared by every session)
+# The columnar catalog index is built once per server process and shared
+# read-only by all sessions. The first run starts loading it in a background
+# thread (see warm_catalog) and the survey renders straight away; results wait
+# on the index only after submit. Session state only keeps the survey answers
+# and the top-k (product_key, score) pairs, so per-session memory and rerun
+# cost do not grow with the catalog.
+# With COFFEEMATCH_SHARED_CATALOG set (see coffeematch_core.shared_catalog),
+# every server process attaches to one published copy instead of building
+# its own.
+
+def load_index(profiler):
+    from coffeematch_core.shared_catalog import open_catalog_index
+    with profiler.stage("load index"):
+        return open_catalog_index()
+
+
+@st.cache_resource(show_spinner=False)
+def warm_catalog():
+    # Returns a Future right away; the index loads on a worker thread.
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-warm").submit(
+        load_index, get_memory_profiler()
     )
 
-    product_df["roast_type"] = product_df["roast_type"].fillna("Unknown")
-    product_df["origin"] = product_df["origin"].fillna("Unspecified")
-
-    product_df["price_numeric"] = pd.to_numeric(product_df["price_numeric"], errors="coerce")
-    product_df["price_per_oz"] = pd.to_numeric(product_df["price_per_oz"], errors="coerce")
-
-    for col in ["decaf", "blend", "single_origin", "available_ground", "has_reviews"]:
-        if col in product_df.columns:
-            product_df[col] = product_df[col].fillna(False).astype(bool)
-
-    return product_df
 
-@st.cache_data
-def load_reviews():
-    try:
-        reviews_df = pd.read_excel(REVIEWS_PATH, sheet_name=REVIEWS_SHEET)
-    except:
-        return pd.DataFrame()
+def get_index():
+    future = warm_catalog()
+    if future.done():
+        return future.result()
+    with st.spinner("Brewing the catalog..."):
+        return future.result()
 
-    reviews_df["product_name"] = reviews_df["product_name"].astype(str)
-    reviews_df["sentiment"] = reviews_df["sentiment"].astype(str).str.lower()
 
-    return reviews_df
+# Memory profiling: `streamlit run streamlit_poc.py -- --profile-memory` traces
+# the index load and each ranking, and adds a memory report to the sidebar.
+@st.cache_resource(show_spinner=False)
+def get_memory_profiler():
+    from coffeematch_core.memory import MemoryProfiler, profile_memory_requested
+    return MemoryProfiler(enabled=profile_memory_requested())
 
 
-products = load_products()
-reviews = load_reviews()
+# Returning users (?user=<id> in the URL) are remembered in a local profile
+# store. Results are reused as long as their answers and the catalog file are
+# unchanged, so they skip both the survey and re-scoring.
+@st.cache_resource(show_spinner=False)
+def get_profile_store():
+    from coffeematch_core.profile_store import open_profile_store
+    return open_profile_store()
 
-# Matching Algorithm 
 
-# Points awarded for matching certain criterea (TODO: tune based on user survey if we do it)
-ROAST_POINTS = 3.0
-VALUE_WEIGHT = 2.0
+# A chosen roast is a hard filter, as in the original app: a Light + Decaf
+# survey only returns light roasts.
+def survey_to_preferences(survey_results):
+    from coffeematch_core.schemas import UserPreferences
 
-def apply_filters(df, survey_results):
-    filtered = df.copy()
-
-    # Decaf or Caff
-    if survey_results["caffeine"] == "Decaf 😌":
-        filtered = filtered[filtered["decaf"] == True]
-    else: 
-        filtered = filtered[filtered["decaf"] == False]
+    roast = survey_results["roast"]
+    roast_type = None if roast == "No preference / I'm not sure" else roast
+    return UserPreferences(
+        decaf=survey_results["caffeine"] == "Decaf 😌",
+        roast_type=roast_type,
+        roast_required=roast_type is not None,
+        ground_required=survey_results["ground"] == "Pre-ground (no)",
+    )
 
-    # Roast Level
-    if survey_results["roast"] != "No preference / I'm not sure":
-        filtered = filtered[
-            filtered["roast_type"].str.contains(survey_results["roast"], case=False, na=False)
-        ]
 
-    # Ground or Whole 
-    if survey_results["ground"] == "Pre-ground (no)":
-        filtered = filtered[filtered["available_ground"] == True]
+# Goes through engine.recommend so requests are captured when
+# COFFEEMATCH_REQUEST_LOG is set, and returning users are assigned their
+# scoring experiment variant.
+def top_results(prefs, user_id=None):
+    from coffeematch_core.engine import recommend
 
-    return filtered
+    index = get_index()
+    with get_memory_profiler().stage("rank"):
+        recommendations = recommend(index, prefs, TOP_K, user_id=user_id)
+    return [
+        {"product_key": rec.product_key, "score": rec.score}
+        for rec in recommendations
+    ]
 
-def score_products(df, survey_results):
-    df = df.copy()
-    df["score"] = 0
-    df["reason"] = ""
 
-    # Roast match
-    if survey_results["roast"] != "No preference / I'm not sure":
-        mask = df["roast_type"].str.contains(survey_results["roast"], case=False, na=False)
-        df.loc[mask, "score"] += ROAST_POINTS
-        df.loc[mask, "reason"] += f"Roast match (+{ROAST_POINTS}). "
+def memory_sidebar():
+    from coffeematch_core.memory import index_memory, structure_sizes
 
-    # Cheaper per oz gets slight boost
-    if df["price_per_oz"].notna().any():
-        max_p = df["price_per_oz"].max()
-        min_p = df["price_per_oz"].min()
-        if max_p > min_p:
-            value_score = (max_p - df["price_per_oz"]) / (max_p - min_p)
-            value_bonus = VALUE_WEIGHT * value_score
+    profiler = get_memory_profiler()
+    index = get_index()
+    with st.sidebar.expander("Memory profile"):
+        st.caption("Per structure (MB)")
+        st.dataframe(structure_sizes({
+            "catalog index": index,
+            "session state": dict(st.session_state),
+        }), hide_index=True)
+        st.caption("Catalog index arrays (bytes)")
+        st.dataframe(index_memory(index), hide_index=True)
+        if profiler.stages:
+            st.caption("Stages (tracemalloc, MB)")
+            st.dataframe(profiler.stage_table(), hide_index=True)
 
-            df["score"] += value_bonus
 
-            df.loc[value_bonus > 0, "reason"] += (
-                "Good value (+" 
-                + value_bonus[value_bonus > 0].round(2).astype(str)
-                + "). "
-            )
-
-    return df.sort_values("score", ascending=False)
+warm_catalog()
 
+user_id = st.query_params.get("user")
 
 # Set the website so the starting state is the survey page
 if "step" not in st.session_state:
     st.session_state["step"] = "survey"
+    if user_id:
+        from coffeematch_core.profile_store import catalog_version
+
+        profile = get_profile_store().get(user_id)
+        if profile and profile.results:
+            cached = get_profile_store().cached_results(
+                user_id, profile.preferences, catalog_version()
+            )
+            if cached is not None:
+                st.session_state["survey_prefs"] = profile.preferences
+                st.session_state["scored"] = cached
+                st.session_state["step"] = "results"
+
+# set_page_config has to come before any other element
+st.set_page_config(page_title=PAGE_TITLES[st.session_state["step"]], layout="wide")
+st.markdown(STYLE, unsafe_allow_html=True)
 
 
-# What are states? 
+# What are states?
 # Basically the "state of the website". Changes will be stored,
 # but if we don't switch from one state to the next for example
 # our survey and results page would be displayed on top of eachother.
-# we use st.rerun() to stop the current script and rerun with out updated state 
+# we use st.rerun() to stop the current script and rerun with out updated state
 
-# Survey Page 
+# Survey Page
 if st.session_state["step"] == "survey":
-    st.set_page_config(page_title="Coffee Match", layout="wide")
     st.markdown("<div class='page-title'>Coffee Match</div>",unsafe_allow_html=True)
     st.markdown("<div class='page-subtitle'>☕ Find the Washington Bean of your Dreams ☕</div>",unsafe_allow_html=True)
     with st.form("survey_form"):
 
-        #Caffeine content 
+        #Caffeine content
         st.markdown("<div class='survey-question'>Are you looking for a caffeinated or decaf coffee?</div>", unsafe_allow_html=True)
         q1 = st.radio("",["Caffeinated! 🤩", "Decaf 😌"], label_visibility = "collapsed")
 
@@ -211,33 +231,68 @@ if st.session_state["step"] == "survey":
         #Ground or Whole
         st.markdown("<div class='survey-question'>Ground or whole beans (do you have a coffee grinder)?</div>", unsafe_allow_html=True)
         q3 = st.radio("",["Whole beans (yes)", "Pre-ground (no)"], label_visibility = "collapsed")
-        
+
         submitted = st.form_submit_button("Find your match!")
         if submitted:
             survey_results = {"caffeine": q1, "roast": q2, "ground": q3,}
-            st.session_state["survey_results"] = survey_results
-            filtered = apply_filters(products, survey_results)
-            st.session_state["scored"] =  score_products(filtered, survey_results)
+            prefs = survey_to_preferences(survey_results)
+            results = None
+            if user_id:
+                from coffeematch_core.profile_store import catalog_version
+
+                version = catalog_version()
+                results = get_profile_store().cached_results(user_id, prefs, version)
+            if results is None:
+                results = top_results(prefs, user_id)
+                if user_id:
+                    get_profile_store().save_results(user_id, prefs, results, version)
+            st.session_state["survey_prefs"] = prefs
+            st.session_state["scored"] = results
             st.session_state["step"] = "results"
             st.rerun()
 
 # Results Page!
-if st.session_state["step"] == "results":
+# A fragment: interacting with widgets inside it reruns only this function,
+# not the whole script. Product details are looked up in the shared index from
+# the stored product keys.
+@st.fragment
+def results_view():
+    from coffeematch_core.catalog import product_id_of
+    from coffeematch_core.engine import build_recommendation
+
     scored = st.session_state.get("scored")
-    if scored.empty:
+    if not scored:
         st.warning("No products match your filters :(")
     else:
-        st.set_page_config(page_title="Match Results", layout="wide")
         st.markdown("<div class='page-title'>💕 Here are your coffee matches! 💕</div>", unsafe_allow_html=True)
-    
-        #Top 3 (for now)
-        top_3 = scored.head(3)
-        
+
+        index = get_index()
+        prefs = st.session_state["survey_prefs"]
+        show_reasons = st.toggle("Why these matches?")
+
         # Display each match
-        for idx, row in top_3.iterrows():
+        for row in scored:
+            product_id = product_id_of(index, row["product_key"])
+            if product_id is None:
+                continue
+            rec = build_recommendation(index, prefs, product_id, row["score"])
+            reasons = "".join(f"<li>{reason}</li>" for reason in rec.match_reasons)
+            reasons = f"<ul>{reasons}</ul>" if show_reasons and reasons else ""
             st.markdown(f"""
             <div class='results-box'>
-                <h3>{row['product_name']}</h3>
-                <p><b>Score:</b> {row['score']:.2f}</p>
+                <h3>{rec.product_name}</h3>
+                <p>{rec.roaster}</p>
+                <p><b>Score:</b> {rec.score:.2f}</p>{reasons}
             </div>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+            """, unsafe_allow_html=True)
+
+    if st.button("Retake the survey"):
+        st.session_state["step"] = "survey"
+        st.rerun(scope="app")
+
+
+if st.session_state["step"] == "results":
+    results_view()
+
+if get_memory_profiler().enabled:
+    memory_sidebar()
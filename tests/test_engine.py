@@ -0,0 +1,45 @@
+"""Tests for sharded ranking in the recommendation engine."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeematch_core import engine
+from coffeematch_core.catalog import attach_product_list, build_catalog_index
+from coffeematch_core.engine import rank_products
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+TAGS = ["organic", "single origin", "fair trade", "small batch"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = build_catalog_index(make_synthetic_products(5_000))
+    keys = index.categories["product_key"]
+    rng = np.random.default_rng(0)
+    tagged = rng.random((len(keys), len(TAGS))) < 0.3
+    product_ids, tag_ids = np.nonzero(tagged)
+    attach_product_list(index, "tag", pd.DataFrame({
+        "product_key": keys[product_ids], "tag": np.array(TAGS)[tag_ids]}), "tag")
+    return index
+
+
+PREFERENCES = [
+    UserPreferences(),
+    UserPreferences(roast_type="Dark", decaf=False, max_price_per_oz=1.5),
+    UserPreferences(roast_type="Light", roast_required=True, tags=["organic", "small batch"]),
+    UserPreferences(decaf=True, ground_required=True, tags=["fair trade"]),
+]
+
+
+@pytest.mark.parametrize("prefs", PREFERENCES)
+def test_sharded_ranking_matches_single_shard(index, prefs, monkeypatch):
+    single = rank_products(index, prefs, 10, n_jobs=1)
+    # Small shards, so the catalog splits across the pool.
+    monkeypatch.setattr(engine, "MIN_ROWS_PER_SHARD", 500)
+    assert len(engine.shard_bounds(index, 4)) == 4
+
+    assert rank_products(index, prefs, 10, n_jobs=4) == single
+    assert len(single) == 10
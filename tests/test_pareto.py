@@ -0,0 +1,51 @@
+"""Tests for the best-value skyline against a brute-force frontier."""
+
+import numpy as np
+import pytest
+
+from coffeematch_core.pareto import skyline
+
+
+def brute_force_frontier(price, hearts, reviews):
+    """Sorted positions of the products no other product dominates."""
+    at_least = ((price[None, :] <= price[:, None])
+                & (hearts[None, :] >= hearts[:, None])
+                & (reviews[None, :] >= reviews[:, None]))
+    strictly = ((price[None, :] < price[:, None])
+                | (hearts[None, :] > hearts[:, None])
+                | (reviews[None, :] > reviews[:, None]))
+    dominated = (at_least & strictly).any(axis=1)
+    return np.flatnonzero(~dominated)
+
+
+def assert_frontier(price, hearts, reviews):
+    frontier = skyline(price, hearts, reviews)
+    np.testing.assert_array_equal(np.sort(frontier),
+                                  brute_force_frontier(price, hearts, reviews))
+    assert (np.diff(price[frontier]) >= 0).all()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force_with_ties(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 300))
+    # Few distinct values, so ties on every objective are common.
+    price = rng.integers(1, 8, n) / 4
+    hearts = rng.integers(0, 6, n) * 20.0
+    reviews = rng.integers(0, 6, n).astype(float)
+
+    assert_frontier(price, hearts, reviews)
+
+
+def test_anti_correlated_input_is_all_frontier():
+    # Each pricier product has fewer hearts but more reviews: the worst
+    # case for an insertion-based staircase.
+    t = np.linspace(0.0, 1.0, 2_000)
+    price, hearts, reviews = t, 100 * (1 - t), 1_000 * t
+
+    np.testing.assert_array_equal(skyline(price, hearts, reviews), np.arange(len(t)))
+    assert_frontier(price, hearts, reviews)
+
+
+def test_empty():
+    assert len(skyline(np.empty(0), np.empty(0), np.empty(0))) == 0
@@ -0,0 +1,282 @@
+"""
+Performance regression gates for the recommendation core.
+
+The filter / score / top-k pipeline (plus ``rank_products`` end to end)
+runs on fixed synthetic catalogs of 10^3 and 10^5 rows and on the real
+``data/processed`` catalog, for a few preference profiles that exercise
+the dense and sparse scoring paths and the query components. Median
+latency and tracemalloc peak of every stage are compared with
+``performance_baseline.json``: a stage fails when it exceeds its baseline
+by more than the tolerance below, and the failure message shows a
+per-stage breakdown of where the time and memory went.
+
+The gates run with the rest of the suite; the tolerance and slack absorb
+run-to-run noise on one machine. Timings do not carry across machines,
+so the gates skip when the machine, Python or numpy recorded with the
+baseline differ from the current ones. Refresh the baseline on the
+machine that runs them, and after an intended change:
+    COFFEEMATCH_UPDATE_PERF_BASELINE=1 python -m pytest -m performance
+
+Run from the repository root (after ``pip install -e .[test]``):
+    python -m pytest            # everything
+    python -m pytest -m performance
+"""
+
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+import pytest
+
+from coffeematch_core.catalog import PRODUCTS_PATH, CatalogIndex, build_catalog_index, load_catalog_index
+from coffeematch_core.engine import SPARSE_SCORING_FRACTION, _top_k, rank_products, score_products
+from coffeematch_core.planner import filter_rows
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+pytestmark = pytest.mark.performance
+
+BASELINE_PATH = Path(__file__).with_name("performance_baseline.json")
+UPDATE_BASELINE_ENV = "COFFEEMATCH_UPDATE_PERF_BASELINE"
+
+# A stage may take up to TOLERANCE x its baseline plus a fixed slack,
+# which keeps sub-millisecond stages from failing on timer noise.
+LATENCY_TOLERANCE = 1.5
+LATENCY_SLACK_MS = 0.5
+MEMORY_TOLERANCE = 1.25
+MEMORY_SLACK_MB = 0.5
+
+# Timed runs per case; the median is compared.
+REPEAT = 15
+
+TOP_K = 5
+MB = 1024 * 1024
+
+CATALOGS: Dict[str, Callable[[], CatalogIndex]] = {
+    "synthetic-1e3": lambda: build_catalog_index(make_synthetic_products(1_000)),
+    "synthetic-1e5": lambda: build_catalog_index(make_synthetic_products(100_000)),
+    "real": load_catalog_index,
+}
+
+PREFERENCES = {
+    # Loose filters: most rows survive and are scored densely.
+    "broad": UserPreferences(roast_type="Medium"),
+    # Tight filters: few candidates, scored sparsely.
+    "selective": UserPreferences(roast_type="Dark", decaf=True, ground_required=True,
+                                 max_price_per_oz=1.2),
+    # Query components: tags, tasting notes, brewing method, sentiment.
+    "personalized": UserPreferences(roast_type="Light", brewing_method="Espresso",
+                                    tags=["organic", "single origin"],
+                                    tasting_notes=["chocolate", "berry"],
+                                    sentiment_weight=0.2),
+}
+
+STAGES = ["filter", "score", "top-k", "rank_products"]
+
+
+class StageRecorder:
+    """Collects wall time and, when tracing, peak memory per stage."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.ms: Dict[str, float] = {}
+        self.peak_mb: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the enclosed block as stage ``name``."""
+        if self.trace_memory:
+            start_bytes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        self.ms[name] = (time.perf_counter() - start) * 1000
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak_mb[name] = max(peak - start_bytes, 0) / MB
+
+
+def run_pipeline(index: CatalogIndex, prefs: UserPreferences, recorder: StageRecorder) -> None:
+    """
+    Run the ranking stages the way ``engine._rank_shard`` does, one
+    stage at a time, then ``rank_products`` as a whole.
+    """
+    offsets = index.product_offsets
+    with recorder.stage("filter"):
+        candidates = filter_rows(index, prefs)
+
+    sparse = len(candidates) <= SPARSE_SCORING_FRACTION * index.n_rows
+    with recorder.stage("score"):
+        if sparse:
+            scores = score_products(index, prefs, candidates)
+        else:
+            scores = score_products(index, prefs)
+            keep = np.zeros(len(scores), dtype=bool)
+            keep[candidates] = True
+            scores[~keep] = -np.inf
+
+    with recorder.stage("top-k"):
+        if sparse:
+            # Product score = best candidate size.
+            product_ids = index.columns["product_key"][candidates]
+            starts = np.flatnonzero(np.diff(product_ids, prepend=-1))
+            if len(starts):
+                _top_k(np.maximum.reduceat(scores, starts), TOP_K, product_ids[starts])
+        else:
+            _top_k(np.maximum.reduceat(scores, offsets[:-1]), TOP_K,
+                   np.arange(index.n_products))
+
+    with recorder.stage("rank_products"):
+        rank_products(index, prefs, TOP_K, n_jobs=1)
+
+
+def measure(index: CatalogIndex, prefs: UserPreferences) -> Dict[str, Dict[str, float]]:
+    """
+    Median latency over ``REPEAT`` runs and peak memory of one traced run.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        'ms' and 'peak_mb', each by stage.
+    """
+    run_pipeline(index, prefs, StageRecorder())  # warm-up: lazy compiles, caches
+    runs = []
+    for _ in range(REPEAT):
+        recorder = StageRecorder()
+        run_pipeline(index, prefs, recorder)
+        runs.append(recorder.ms)
+
+    # Tracing slows allocations, so memory is measured in a separate run.
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        traced = StageRecorder(trace_memory=True)
+        run_pipeline(index, prefs, traced)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    return {
+        "ms": {stage: statistics.median(run[stage] for run in runs) for stage in STAGES},
+        "peak_mb": traced.peak_mb,
+    }
+
+
+def over_budget(measured: Dict[str, Dict[str, float]],
+                baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """Stages and metrics ('score ms', 'filter peak_mb', ...) over budget."""
+    failures = []
+    for stage in STAGES:
+        if measured["ms"][stage] > budget_ms(baseline, stage):
+            failures.append(f"{stage} ms")
+        if measured["peak_mb"][stage] > budget_mb(baseline, stage):
+            failures.append(f"{stage} peak_mb")
+    return failures
+
+
+def budget_ms(baseline: Dict[str, Dict[str, float]], stage: str) -> float:
+    """Latency budget of a stage."""
+    return baseline["ms"][stage] * LATENCY_TOLERANCE + LATENCY_SLACK_MS
+
+
+def budget_mb(baseline: Dict[str, Dict[str, float]], stage: str) -> float:
+    """Peak memory budget of a stage."""
+    return baseline["peak_mb"][stage] * MEMORY_TOLERANCE + MEMORY_SLACK_MB
+
+
+def breakdown(case: str, measured: Dict[str, Dict[str, float]],
+              baseline: Dict[str, Dict[str, float]], width: int = 40) -> str:
+    """
+    Flame-style view of a case: one bar per stage, scaled to the
+    end-to-end time, with measured values against budgets.
+    """
+    total = max(measured["ms"]["rank_products"], 1e-9)
+    lines = [f"{case}: rank_products {total:.2f} ms "
+             f"(baseline {baseline['ms']['rank_products']:.2f} ms)"]
+    for stage in STAGES:
+        ms, peak = measured["ms"][stage], measured["peak_mb"][stage]
+        bar = "#" * max(1, round(width * min(ms / total, 1.0)))
+        flag = " <-- over budget" if (ms > budget_ms(baseline, stage)
+                                      or peak > budget_mb(baseline, stage)) else ""
+        lines.append(
+            f"  {stage:<14} {bar:<{width}} {ms:8.2f} ms (budget {budget_ms(baseline, stage):7.2f})"
+            f"  peak {peak:7.2f} MB (budget {budget_mb(baseline, stage):6.2f}){flag}"
+        )
+    return "\n".join(lines)
+
+
+def load_baseline() -> Dict[str, object]:
+    """Saved baseline, or an empty one."""
+    if not BASELINE_PATH.exists():
+        return {"cases": {}}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+def environment() -> Dict[str, str]:
+    """What the timings depend on, as recorded with the baseline."""
+    return {
+        "machine": " ".join(filter(None, [platform.machine(), platform.processor(),
+                                          f"{os.cpu_count()} CPUs"])),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+@pytest.fixture(scope="module")
+def baseline() -> Iterator[Dict[str, object]]:
+    """
+    The baseline; rewritten after the module when updating, and skipped
+    when it was recorded in a different environment.
+    """
+    saved = load_baseline()
+    updating = bool(os.environ.get(UPDATE_BASELINE_ENV))
+    current = environment()
+    differing = [key for key, value in current.items() if saved.get(key) != value]
+    if differing and not updating:
+        recorded = ", ".join(f"{key} {saved.get(key)!r} != {current[key]!r}" for key in differing)
+        pytest.skip(f"Baseline recorded in another environment ({recorded}); "
+                    f"set {UPDATE_BASELINE_ENV}=1 to record one here")
+    yield saved
+    if updating:
+        saved.update(current)
+        saved["cases"] = dict(sorted(saved["cases"].items()))
+        BASELINE_PATH.write_text(json.dumps(saved, indent=2) + "\n", encoding="utf-8")
+
+
+@pytest.fixture(scope="module", params=list(CATALOGS))
+def catalog(request) -> Iterator[tuple]:
+    """(name, index) for each catalog, built once per module."""
+    if request.param == "real" and not PRODUCTS_PATH.exists():
+        pytest.skip(f"{PRODUCTS_PATH} not found; run from the repository root")
+    yield request.param, CATALOGS[request.param]()
+
+
+@pytest.mark.parametrize("profile", list(PREFERENCES))
+def test_ranking_within_budget(catalog, profile, baseline):
+    name, index = catalog
+    case = f"{name}/{profile}"
+    measured = measure(index, PREFERENCES[profile])
+
+    if os.environ.get(UPDATE_BASELINE_ENV):
+        baseline["cases"][case] = {
+            metric: {stage: round(value, 4) for stage, value in values.items()}
+            for metric, values in measured.items()
+        }
+        return
+
+    if case not in baseline["cases"]:
+        pytest.skip(f"No baseline for {case}; set {UPDATE_BASELINE_ENV}=1 to record one")
+    expected = baseline["cases"][case]
+    failures = over_budget(measured, expected)
+    if failures:
+        pytest.fail(f"{case} over budget ({', '.join(failures)}):\n"
+                    f"{breakdown(case, measured, expected)}", pytrace=False)
@@ -0,0 +1,95 @@
+"""Tests for the hard-filter query planner."""
+
+import numpy as np
+import pytest
+
+from coffeematch_core.catalog import build_catalog_index
+from coffeematch_core.planner import filter_rows, plan_filters
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_catalog_index(make_synthetic_products(2_000))
+
+
+def brute_force(index, prefs, start=0, stop=None):
+    """Rows passing every filter, by a full mask over the catalog."""
+    cols = index.columns
+    keep = np.ones(index.n_rows, dtype=bool)
+    if prefs.decaf is not None:
+        keep &= cols["decaf"] == prefs.decaf
+    if prefs.ground_required:
+        keep &= cols["available_ground"]
+    if prefs.single_origin_preference:
+        keep &= cols["single_origin"]
+    if prefs.blend_preference:
+        keep &= cols["blend"]
+    if prefs.max_price_per_oz is not None:
+        keep &= cols["price_per_oz"] <= prefs.max_price_per_oz
+    rows = np.flatnonzero(keep)
+    return rows[(rows >= start) & (rows < (index.n_rows if stop is None else stop))]
+
+
+PREFERENCES = [
+    UserPreferences(),
+    UserPreferences(decaf=False),
+    UserPreferences(decaf=True, ground_required=True),
+    UserPreferences(single_origin_preference=True, max_price_per_oz=1.0),
+    UserPreferences(blend_preference=True, decaf=True, max_price_per_oz=0.5),
+    UserPreferences(max_price_per_oz=0.0),
+]
+
+
+@pytest.mark.parametrize("prefs", PREFERENCES)
+def test_matches_brute_force(index, prefs):
+    np.testing.assert_array_equal(filter_rows(index, prefs), brute_force(index, prefs))
+
+
+@pytest.mark.parametrize("prefs", PREFERENCES)
+def test_row_ranges_share_one_plan(index, prefs):
+    plan = plan_filters(index, prefs)
+    for start, stop in [(0, 1), (100, 900), (1_500, index.n_rows)]:
+        np.testing.assert_array_equal(filter_rows(index, prefs, slice(start, stop), plan),
+                                      brute_force(index, prefs, start, stop))
+
+
+def test_plan_is_most_selective_first(index):
+    plan = plan_filters(index, UserPreferences(decaf=True, ground_required=True,
+                                               max_price_per_oz=1.5))
+    assert {p.column for p in plan} == {"decaf", "available_ground", "price_per_oz"}
+    assert [p.count for p in plan] == sorted(p.count for p in plan)
+    for predicate in plan:
+        assert predicate.count == len(predicate.rows())
+
+
+def test_price_cap_rows_are_sorted_once(index):
+    (predicate,) = plan_filters(index, UserPreferences(max_price_per_oz=0.8))
+    rows = predicate.rows()
+    assert predicate.rows() is rows
+    assert predicate.count == len(rows)
+    assert (np.diff(rows) > 0).all()
+
+
+def roast_labels(index, rows):
+    return index.categories["roast_type"][index.columns["roast_type"][rows]]
+
+
+def test_roast_is_soft_unless_required(index):
+    soft = filter_rows(index, UserPreferences(roast_type="Light", decaf=True))
+    hard = filter_rows(index, UserPreferences(roast_type="Light", decaf=True,
+                                              roast_required=True))
+
+    assert len(hard) < len(soft)
+    assert all("light" in str(label).lower() for label in roast_labels(index, hard))
+    assert not all("light" in str(label).lower() for label in roast_labels(index, soft))
+    np.testing.assert_array_equal(hard, np.intersect1d(soft, hard))
+
+
+def test_roast_count_matches_rows(index):
+    (predicate,) = plan_filters(index, UserPreferences(roast_type="medium",
+                                                       roast_required=True))
+    rows = predicate.rows()
+    assert predicate.count == len(rows)
+    assert predicate.test(index.columns["roast_type"][rows]).all()
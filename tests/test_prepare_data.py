@@ -0,0 +1,41 @@
+"""Tests for size and price parsing in scripts/prepare_data.py."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from prepare_data import normalize_sizes_and_prices, parse_price, parse_size_oz  # noqa: E402
+
+
+def test_parse_size_oz():
+    sizes = pd.Series(["12oz", "12 OZ", "2.5 lb", "5lbs", "340g", "1 kg", "big", None])
+    expected = [12.0, 12.0, 40.0, 80.0, 11.99, 35.27, np.nan, np.nan]
+    np.testing.assert_allclose(parse_size_oz(sizes).to_numpy(), expected)
+
+
+def test_parse_price_takes_first_amount():
+    prices = pd.Series(["$12.99", "12.99 USD", "$1,299.00", "$12.99 - $15.99",
+                        "from $9", 14.5, "free", None])
+    expected = [12.99, 12.99, 1299.0, 12.99, 9.0, 14.5, np.nan, np.nan]
+    np.testing.assert_allclose(parse_price(prices).to_numpy(), expected)
+
+
+def test_normalize_keeps_scraped_values_and_splits_unparsed():
+    raw = pd.DataFrame({
+        "roaster": ["A", "A", "B"],
+        "product_name": ["X", "X", "Y"],
+        "size": ["12oz", "2 lb", "a bag"],
+        "price": ["$12.00 - $14.00", "$32", "$10"],
+        "price_per_oz": [0.9, np.nan, np.nan],
+    })
+
+    normalized, unparsed = normalize_sizes_and_prices(raw)
+
+    assert normalized["size_oz"].tolist() == [12.0, 32.0]
+    assert normalized["price_numeric"].tolist() == [12.0, 32.0]
+    assert normalized["price_per_oz"].tolist() == [0.9, 1.0]
+    assert unparsed["size"].tolist() == ["a bag"]
@@ -0,0 +1,100 @@
+"""Tests for the append-only price history."""
+
+import numpy as np
+import pandas as pd
+
+from coffeematch_core.price_history import (
+    append_snapshot,
+    empty_history,
+    load_history,
+    price_trend_features,
+    save_history,
+    value_at,
+    values_at,
+)
+
+DAY = 86400.0
+
+
+def catalog(prices):
+    """Products 'A'..'C', one 12oz size each, at the given price_per_oz."""
+    keys = list(prices)
+    return pd.DataFrame({
+        "product_key": keys,
+        "size": ["12oz"] * len(keys),
+        "price_numeric": [12 * prices[key] for key in keys],
+        "price_per_oz": [prices[key] for key in keys],
+        "hearts": [10] * len(keys),
+    })
+
+
+def build_history():
+    history = empty_history()
+    history = append_snapshot(history, catalog({"A": 1.0, "B": 2.0}), as_of=0.0)
+    history = append_snapshot(history, catalog({"A": 0.8, "B": 2.0, "C": 3.0}), as_of=10 * DAY)
+    history = append_snapshot(history, catalog({"A": 0.8, "C": 3.0}), as_of=20 * DAY)
+    return history
+
+
+def test_appends_only_changed_entries():
+    history = build_history()
+
+    assert history.n_versions == 3
+    # Version 0: A, B; version 1: A changed, C added; version 2: B removed.
+    np.testing.assert_array_equal(np.diff(history.version_offsets), [2, 2, 1])
+    assert append_snapshot(history, catalog({"A": 0.8, "C": 3.0})) is history
+
+
+def test_values_over_time():
+    history = build_history()
+
+    assert value_at(history, "A", "12oz", 5 * DAY) == 1.0
+    assert value_at(history, "A", "12oz", 15 * DAY) == 0.8
+    assert value_at(history, "B", "12oz", 25 * DAY) is None
+    assert value_at(history, "C", "12oz", 5 * DAY) is None
+    assert values_at(history, 15 * DAY)["entry"].tolist() == ["A @ 12oz", "B @ 12oz", "C @ 12oz"]
+    assert values_at(history, 25 * DAY)["entry"].tolist() == ["A @ 12oz", "C @ 12oz"]
+
+
+def test_save_writes_one_block_per_new_version(tmp_path):
+    history = build_history()
+    save_history(history, tmp_path)
+    first_block = (tmp_path / "v00000.npz").stat().st_mtime_ns
+
+    extended = append_snapshot(history, catalog({"A": 0.7, "C": 3.0}), as_of=30 * DAY)
+    save_history(extended, tmp_path)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "v00000.npz", "v00001.npz", "v00002.npz", "v00003.npz"]
+    assert (tmp_path / "v00000.npz").stat().st_mtime_ns == first_block
+    loaded = load_history(tmp_path)
+    np.testing.assert_array_equal(loaded.version_times, extended.version_times)
+    pd.testing.assert_frame_equal(price_trend_features(loaded), price_trend_features(extended))
+
+
+def test_value_at_matches_brute_force_scan(tmp_path):
+    rng = np.random.default_rng(0)
+    keys = [f"P{i:02d}" for i in rng.permutation(30)]
+    history = empty_history()
+    for version in range(8):
+        present = [key for key in keys if rng.random() < 0.8]
+        prices = dict(zip(present, rng.integers(1, 4, len(present)) / 2))
+        history = append_snapshot(history, catalog(prices), as_of=version * DAY)
+    save_history(history, tmp_path)
+
+    def brute_force(key, timestamp):
+        """Last delta of the entry at or before the timestamp, scanning every row."""
+        version = np.searchsorted(history.version_times, timestamp, side="right") - 1
+        stop = history.version_offsets[version + 1] if version >= 0 else 0
+        found = None
+        for row in range(stop):
+            if history.entries[history.entry_codes[row]] == f"{key} @ 12oz":
+                found = history.values["price_per_oz"][row]
+        return None if found is None or np.isnan(found) else float(found)
+
+    loaded = load_history(tmp_path)
+    for timestamp in np.arange(-1, 9) * DAY + DAY / 2:
+        for key in keys + ["missing"]:
+            expected = brute_force(key, timestamp)
+            assert value_at(history, key, "12oz", timestamp) == expected
+            assert value_at(loaded, key, "12oz", timestamp) == expected
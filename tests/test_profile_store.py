@@ -0,0 +1,54 @@
+"""Tests for the write-batching profile store."""
+
+import pytest
+
+from coffeematch_core.profile_store import ProfileStore
+from coffeematch_core.schemas import UserPreferences
+
+
+RESULTS = [{"product_key": "a", "score": 0.9}, {"product_key": "b", "score": 0.7}]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(tmp_path / "profiles.sqlite3", pool_size=2)
+    yield store
+    store.close()
+
+
+def test_round_trip_through_pending_and_flush(store, tmp_path):
+    prefs = UserPreferences(roast_type="Dark", decaf=True)
+    store.save_results("u1", prefs, RESULTS, "v1")
+    store.set_feedback("u1", liked=["a"], disliked=["c"])
+
+    # Unflushed writes are read back from the buffer.
+    pending = store.get("u1")
+    assert pending.preferences == prefs
+    assert (pending.liked, pending.disliked) == (["a"], ["c"])
+    assert store.cached_results("u1", prefs, "v1") == RESULTS
+
+    store.flush()
+    store.close()
+    reopened = ProfileStore(tmp_path / "profiles.sqlite3", pool_size=2)
+    try:
+        loaded = reopened.get("u1")
+        assert loaded.preferences == prefs
+        assert (loaded.liked, loaded.disliked) == (["a"], ["c"])
+        assert loaded.results == RESULTS
+        assert reopened.cached_results("u1", prefs, "v1") == RESULTS
+        # A new catalog version or new answers invalidate the results.
+        assert reopened.cached_results("u1", prefs, "v2") is None
+        assert reopened.cached_results("u1", UserPreferences(roast_type="Light"), "v1") is None
+    finally:
+        reopened.close()
+
+
+def test_feedback_keeps_results_and_results_keep_feedback(store):
+    prefs = UserPreferences()
+    store.set_feedback("u2", liked=["a"])
+    store.save_results("u2", prefs, RESULTS, "v1")
+    store.set_feedback("u2", disliked=["b"])
+
+    profile = store.get("u2")
+    assert (profile.liked, profile.disliked) == (["a"], ["b"])
+    assert store.cached_results("u2", prefs, "v1") == RESULTS
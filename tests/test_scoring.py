@@ -0,0 +1,63 @@
+"""Tests for compiling the scoring formula into the index."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeematch_core.catalog import attach_product_features, build_catalog_index
+from coffeematch_core.schemas import UserPreferences
+from coffeematch_core.scoring import (
+    SCORE_COMPONENTS,
+    SCORING_CONFIG_PATH,
+    attach_score_components,
+    column_weights,
+    component_row,
+    parse_scoring_config,
+    score_components,
+)
+from coffeematch_core.synthetic import make_synthetic_products
+
+
+CONFIG = parse_scoring_config({"column": [
+    {"name": "value", "source": "price_per_oz", "normalize": "min_max_inverted",
+     "weight": "price_weight"},
+    {"name": "sentiment", "source": "sentiment_score", "weight": "sentiment_weight"},
+]})
+OTHER_CONFIG = parse_scoring_config({"column": [
+    {"name": "popularity", "source": "heart_percentage", "normalize": "percent",
+     "weight": "popularity_weight"},
+]})
+
+
+@pytest.fixture
+def index():
+    return build_catalog_index(make_synthetic_products(200))
+
+
+def test_default_config_is_found_from_any_directory():
+    assert SCORING_CONFIG_PATH.is_absolute()
+    assert SCORING_CONFIG_PATH.exists()
+
+
+def test_feature_attached_after_compiling_is_picked_up(index):
+    assert SCORE_COMPONENTS not in index.columns
+    score_components(index, CONFIG)
+    assert list(index.categories[SCORE_COMPONENTS]) == ["value"]
+
+    keys = index.categories["product_key"]
+    attach_product_features(index, pd.DataFrame({
+        "product_key": keys, "sentiment_score": np.linspace(0, 1, len(keys))}))
+
+    assert score_components(index, CONFIG).shape == (2, index.n_rows)
+    np.testing.assert_allclose(component_row(index, "sentiment"),
+                               index.product_columns["sentiment_score"][index.columns["product_key"]])
+
+
+def test_index_compiled_from_another_config(index):
+    attach_score_components(index, OTHER_CONFIG)
+    prefs = UserPreferences(popularity_weight=0.7)
+
+    np.testing.assert_array_equal(column_weights(index, CONFIG, prefs), [0.0])
+    assert score_components(index, CONFIG).shape == (1, index.n_rows)
+    assert component_row(index, "popularity") is None
+    np.testing.assert_array_equal(column_weights(index, CONFIG, prefs), [prefs.price_weight])
@@ -0,0 +1,86 @@
+"""Tests for the processed-data column contracts."""
+
+import pandas as pd
+import pytest
+
+from coffeematch_core.synthetic import make_synthetic_products
+from coffeematch_core.validation import SchemaValidationError, validate_products, validate_reviews
+
+
+def rules(report):
+    """(column, rule) -> count of a report's violations."""
+    return {(v.column, v.rule): v.count for v in report.violations}
+
+
+@pytest.fixture
+def products():
+    return make_synthetic_products(20)
+
+
+@pytest.fixture
+def reviews():
+    return pd.DataFrame({
+        "product_name": ["Coffee 0", "Coffee 1", "Coffee 2"],
+        "sentiment": ["liked", "disliked", "liked"],
+        "brewing_method": ["Espresso", None, "Pour Over"],
+        "review_text": ["Great", "Flat", None],
+        "date": ["06/30/2025", "04/16/2025", "01/02/2024"],
+        "tasting_notes": ["Berry, Chocolate", None, "Citrus"],
+    })
+
+
+def test_clean_frames_pass(products, reviews):
+    for report in (validate_products(products), validate_reviews(reviews)):
+        assert report.ok
+        assert "OK" in report.summary()
+        report.raise_if_invalid()
+
+
+def test_product_violations_are_counted_per_rule(products):
+    products.loc[[1, 4], "price_per_oz"] = 0.0
+    products.loc[2, "heart_percentage"] = 120.0
+    products.loc[3, "roaster"] = None
+    products = pd.concat([products, products.iloc[[0]]], ignore_index=True)
+
+    report = validate_products(products)
+
+    assert rules(report) == {
+        ("price_per_oz", "> 0"): 2,
+        ("heart_percentage", "<= 100"): 1,
+        ("roaster", "not_null"): 1,
+        ("product_key+size", "unique"): 1,
+    }
+    price = next(v for v in report.violations if v.column == "price_per_oz")
+    assert price.sample_rows == [1, 4]
+    with pytest.raises(SchemaValidationError, match="price_per_oz"):
+        report.raise_if_invalid()
+
+
+def test_review_violations(reviews):
+    reviews.loc[0, "sentiment"] = "meh"
+    reviews.loc[1, "date"] = "2025-04-16"
+
+    assert rules(validate_reviews(reviews)) == {
+        ("sentiment", "allowed_values"): 1,
+        ("date", "date %m/%d/%Y"): 1,
+    }
+
+
+def test_stray_string_in_numeric_column_is_reported(products):
+    products["size_oz"] = products["size_oz"].astype(object)
+    products.loc[3, "size_oz"] = "12oz"
+    products["hearts"] = products["hearts"].astype(object)
+    products.loc[5, "hearts"] = -1
+
+    report = validate_products(products)
+
+    assert rules(report) == {
+        ("size_oz", "dtype=float"): len(products),
+        ("hearts", "dtype=int"): len(products),
+        ("hearts", ">= 0"): 1,
+    }
+
+
+def test_missing_column(products):
+    report = validate_products(products.drop(columns=["url"]))
+    assert rules(report) == {("url", "missing_column"): len(products)}